@@ -1,5 +1,8 @@
 from chatterbot.logic import LogicAdapter
 from chatterbot import filters
+from retrieval import TrigramIndex
+import copy
+import threading
 
 
 class BestMatchWithConfidence(LogicAdapter):
@@ -15,15 +18,81 @@ class BestMatchWithConfidence(LogicAdapter):
         an audience.
         Defaults to None
     :type excluded_words: list
+
+    :param retrieval_top_k:
+        The amount of candidate statements retrieved by the trigram index, which
+        are the only ones compared with the input statement (instead of every
+        statement in the storage).
+        Defaults to 20
+    :type retrieval_top_k: int
     """
 
     def __init__(self, chatbot, **kwargs):
         super().__init__(chatbot, **kwargs)
 
         self.excluded_words = kwargs.get('excluded_words')
+        self.retrieval_top_k = kwargs.get('retrieval_top_k', 20)
+        self.retrieval_lock = threading.Lock()
+        self.retrieval_index = None
+        self.retrieval_statements = {}
+
+    def search(self, input_statement):
+        """
+        Search for the closest matches to the input among the candidates retrieved
+        by the trigram index. Like the search algorithms of the chatbot, matches are
+        yielded in order of increasing confidence.
+        """
+        index, statements = self.get_retrieval_index()
+        candidates = []
+        for text, _ in index.search(input_statement.text, self.retrieval_top_k):
+            # the indexed statements are shared between requests, so each one scores its own copy
+            statement = copy.copy(statements[text])
+            statement.confidence = self.search_algorithm.compare_statements(input_statement, statement)
+            candidates.append(statement)
+
+        best_confidence_so_far = 0
+        for statement in sorted(candidates, key=lambda candidate: candidate.confidence, reverse=True):
+            if statement.confidence > best_confidence_so_far:
+                best_confidence_so_far = statement.confidence
+                yield statement
+                if statement.confidence >= 1.0:
+                    break
+
+    def get_retrieval_index(self):
+        """
+        Get the trigram index of the statement texts, built on first use and then
+        kept until rebuild_retrieval_index is called (i.e. after training).
+        """
+        with self.retrieval_lock:
+            if self.retrieval_index is None:
+                statements = {}
+                for statement in self.chatbot.storage.filter(persona_not_startswith='bot:', page_size=1000):
+                    statements.setdefault(statement.text, statement)
+                self.chatbot.logger.info('Built the retrieval index of {} statements'.format(len(statements)))
+                self.retrieval_statements = statements
+                self.retrieval_index = TrigramIndex(statements.keys())
+            return self.retrieval_index, self.retrieval_statements
+
+    def rebuild_retrieval_index(self):
+        """
+        Build the trigram index again out of the storage (for instance, once a
+        training finished).
+        """
+        with self.retrieval_lock:
+            self.retrieval_index = None
+        self.get_retrieval_index()
+
+    def add_to_retrieval_index(self, statement):
+        """
+        Add a single statement to the trigram index (for instance, an input the
+        chat bot learns), without building the index again.
+        """
+        with self.retrieval_lock:
+            if self.retrieval_index is not None and self.retrieval_index.add(statement.text):
+                self.retrieval_statements[statement.text] = statement
 
     def process(self, input_statement, additional_response_selection_parameters=None):
-        search_results = self.search_algorithm.search(input_statement)
+        search_results = self.search(input_statement)
 
         # Use the input statement as the closest match if no other results are found
         closest_match = next(search_results, input_statement)
@@ -123,4 +192,8 @@ class BestMatchWithConfidence(LogicAdapter):
         else:
             response = self.get_default_response(input_statement)
 
+        if not self.chatbot.read_only:
+            # the chat bot learns the input statement once it responded
+            self.add_to_retrieval_index(copy.copy(input_statement))
+
         return response
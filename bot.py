@@ -2,8 +2,18 @@ import string
 import os
 from chatterbot import ChatBot
 from chatterbot.trainers import ChatterBotCorpusTrainer
+from chatterbot.conversation import Statement
 from scrapper import FieldScrapper
 from corpus_creator import CorpusCreator, Field
+from domain_index import DomainIndex
+from field_snapshot import FieldSnapshot
+from manifest import TrainingManifest
+from cache import TTLCache
+from jobs import ReadWriteLock
+import threading
+import time
+import sqlite3
+from contextlib import closing
 import logging
 from db import DB
 from typing import List
@@ -24,9 +34,14 @@ class BotAskResponse:
 class BotTrainResponse:
     """
     Bot response when trained.
+
+    files holds for every corpus file how long it took and how many conversations were trained.
     """
-    def __init__(self, success:bool) -> None:
+    def __init__(self, success:bool, files:dict = None) -> None:
         self.success = success
+        self.files = files
+        if files is None:
+            self.files = {}
 
 class Bot:
     """
@@ -46,34 +61,51 @@ class Bot:
         """
         raise Exception("Unimplemented method")
 
-    def train(self, reload=REFETCH_DOMAINS) -> BotTrainResponse:
+    def train(self, reload=REFETCH_DOMAINS, progress=None) -> BotTrainResponse:
         """
         Training a model based on existing data.
 
         Input 
-        - reload: whether to scrape for fields.
+        - reload:   whether to scrape for fields.
+        - progress: function called with the phase of the training and its progress counters (None to ignore them).
         
         Output 
         - BotTrainResponse containing whether the train succeeded or failed.
         """
         raise Exception("Unimplemented method")
 
+    def stats(self) -> dict:
+        """
+        Runtime statistics of the bot (such as its caches).
+        """
+        return {}
+
 class ChatbotFactory:
     """
     Factory for implementation of chatbots.
     """
-    def create_bot(self, name, datadir, db, confidence_threshold, read_only) -> Bot:
+    def create_bot(self, name, datadir, db, confidence_threshold, read_only, domain_index_location=None, \
+        fields_snapshot_location=None, training_manifest_location=None, database_uri="sqlite:///bot.sqlite3", \
+        ask_cache_max_entries=0) -> Bot:
         """
         create_bot factory method that returns an object implementing bot interface.
 
         Input 
-        - name    : name of the bot for UI
-        - datadir : location of the data required to train the model
+        - name                       : name of the bot for UI
+        - datadir                    : location of the data required to train the model
+        - domain_index_location      : location of the persisted domain index (None to keep it in memory only)
+        - fields_snapshot_location   : location of the persisted scraped fields (None to keep them in memory only)
+        - training_manifest_location : location of the manifest of trained corpus files (None to keep it in memory only)
+        - database_uri               : database of the model
+        - ask_cache_max_entries      : amount of answers cached in read only mode (0 to disable the cache)
         
         Output 
         - Instance of a Bot object
         """
-        return ChatterBotWrapper(name, datadir, db, response_minimum_confidence_score=confidence_threshold, read_only=read_only)
+        return ChatterBotWrapper(name, datadir, db, response_minimum_confidence_score=confidence_threshold, read_only=read_only, \
+            domain_index_location=domain_index_location, fields_snapshot_location=fields_snapshot_location, \
+            training_manifest_location=training_manifest_location, database_uri=database_uri, \
+            ask_cache_max_entries=ask_cache_max_entries)
 
 class ChatterBotWrapper(Bot):
     """
@@ -84,20 +116,73 @@ class ChatterBotWrapper(Bot):
     Configuration 
     - bot_response_retry_count:             how many times to try to get a response from the bot when confidence score is lower the threshold
     - response_minimum_confidence_score:    confidence threshold score
+    - domain_index_location:                where the domain index is persisted (built when training with reload)
+    - fields_snapshot_location:             where the scraped fields are persisted (refreshed when training with reload)
+    - training_manifest_location:           where the hashes of the trained corpus files and conversations are persisted
+    - database_uri:                         database of the ChatterBot model
+    - ask_cache_max_entries:                amount of answers cached by message (only in read only mode, where answers 
+                                            only change with training), 0 to disable the cache
+
+    Training never touches the model which answers: a SQLite model is copied to a staging database, trained there and
+    then swapped in at once, so the bot keeps answering with the previous model in the meanwhile. The model database
+    is replaced as a whole, so it must not be shared with the articles database (swapping is refused in such a case).
+    Questions wait while the model is swapped, and when the bot learns from chat, the statements the served model learned
+    during the training are merged into the trained model before it is swapped in.
     """
+    CORPUS_EXTENTIONS = (".yml", ".yaml")
+    MODEL_TABLES = ("statement", "tag", "tag_association")
+    SQLITE_FILE_PREFIX = "sqlite:///"
+    STAGING_SUFFIX = ".staging"
+
     def __init__(self, name, datadir, db:DB, bot_response_retry_count = 1, response_minimum_confidence_score = 0.1, 
-    logic_adapters = ['best_match.BestMatchWithConfidence'], read_only=True):
+    logic_adapters = ['best_match.BestMatchWithConfidence'], read_only=True, domain_index_location=None, fields_snapshot_location=None,
+    training_manifest_location=None, database_uri="sqlite:///bot.sqlite3", ask_cache_max_entries=0):
 
         self.name = name
-        self.bot = ChatBot(name, logic_adapters = logic_adapters,read_only=read_only)
+        self.logic_adapters = logic_adapters
+        self.read_only = read_only
+        self.database_uri = database_uri
+        self.db = db
+        self.__migrate_legacy_model()
+        self.bot = self.__create_chatbot(database_uri)
         self.trainer = ChatterBotCorpusTrainer(self.bot)
         self.datadir = datadir
         self.bot_response_retry_count = bot_response_retry_count
         self.response_minimum_confidence_score = response_minimum_confidence_score
-        self.fields:List[Field] = []
-        self.db = db
+        self.train_lock = threading.Lock()
+        self.model_lock = ReadWriteLock()      # questions read the model, swapping it writes
+        self.staging_last_statement_id = None  # last statement of the served model copied to the staging model
+        self.ask_cache = TTLCache(ask_cache_max_entries) if read_only and ask_cache_max_entries > 0 else None
+        self.manifest = TrainingManifest(training_manifest_location)
+        self.fields_snapshot_location = fields_snapshot_location
+        self.fields_snapshot = FieldSnapshot.load(fields_snapshot_location)
+        self.fields:List[Field] = self.fields_snapshot.fields if self.fields_snapshot is not None else []
+        self.domain_index_location = domain_index_location
+        self.domain_index = DomainIndex.load(domain_index_location)
+        if self.domain_index is None and len(self.fields) > 0:
+            self.domain_index = self.__build_domain_index(self.fields)
+        if self.domain_index is None:
+            logging.warn("No domain index was found, domains will not be captured until the bot is trained with reload")
+            self.domain_index = DomainIndex()
 
     def ask(self, message) -> BotAskResponse:
+        # The answers of a read only model only change with training, so they are cached by the cleaned message (the
+        # default answer is not cached, since it is also returned when asking fails)
+        if self.ask_cache is None:
+            return self.__ask(message)
+        key = " ".join(self.__prepare_message_for_domain_discovery(message).lower().split())
+        return self.ask_cache.get_or_compute(key, lambda: self.__ask(message), \
+            should_cache=lambda response: response.answer != CANT_FIND_AN_ANSWER_MESSAGE)
+
+    def stats(self) -> dict:
+        return {'ask_cache': self.ask_cache.stats() if self.ask_cache is not None else None}
+
+    def __ask(self, message) -> BotAskResponse:
+        # the model is not swapped while it answers
+        with self.model_lock.read():
+            return self.__ask_model(message)
+
+    def __ask_model(self, message) -> BotAskResponse:
         try:
             counter = self.bot_response_retry_count
             while counter != 0:
@@ -117,13 +202,10 @@ class ChatterBotWrapper(Bot):
                     # This will be used by the user to later on select which domains he would like to
                     # us and get articles from. For example, if the conversation picked up 'computer science' 
                     # as a possible domain, the user can later on select it and the system will search for 
-                    # articles with the 'computer science' as a search key word
+                    # articles with the 'computer science' as a search key word. The domains are captured with
+                    # the index built when training, so asking never scrapes for fields
                     cleanzed_message = self.__prepare_message_for_domain_discovery(message)
-                    captured_domains = []
-                    if len(self.fields) == 0:
-                        self.__repload_fields()
-                    for f in self.fields:
-                        captured_domains.extend([domain.name for domain in f.get_domain(cleanzed_message)])
+                    captured_domains = self.domain_index.match(cleanzed_message)
                     return BotAskResponse(answer=str(response), captured_domains=captured_domains)
             logging.warn("Did not find a match for the message, returning a default answer")
             return BotAskResponse(answer=CANT_FIND_AN_ANSWER_MESSAGE)
@@ -131,44 +213,315 @@ class ChatterBotWrapper(Bot):
             logging.error(f"Failed asking the bot with a message, returning a default answer. Error: {error}")
             return BotAskResponse(answer=CANT_FIND_AN_ANSWER_MESSAGE)
 
-    def train(self, reload=REFETCH_DOMAINS) -> BotTrainResponse:
+    def train(self, reload=REFETCH_DOMAINS, progress=None) -> BotTrainResponse:
         """
         Training the model with the option of scrapping (reload).
+
+        Only the conversations which were added or changed since the last training are ingested (by their hashes in
+        the training manifest). Only one training runs at a time, concurrent trainings fail right away.
         """
+        if progress is None:
+            progress = lambda phase, **counters: None
+        if not self.train_lock.acquire(blocking=False):
+            logging.warn("The model is already being trained, rejecting this training")
+            return BotTrainResponse(success=False)
         logging.info(f"About to train the model. Reload option is {reload}")
+        staging_bot, staging_path = None, None
         try:
             if reload:
+                progress("scraping")
                 self.__reload_corpus()                  # field scraping
-            for file in os.listdir(self.datadir):       # get all corpuses
-                file_path = str(self.datadir + file)
-                self.trainer.train(file_path)           # train them with the bot
+            progress("staging")
+            staging_bot, staging_path = self.__create_staging_bot()
+            staging_trainer = ChatterBotCorpusTrainer(staging_bot)
+            manifest = self.manifest.copy() if staging_path is not None else self.manifest
+            if len(manifest.trained_files()) > 0 and staging_bot.storage.count() == 0:
+                logging.warn("The bot storage is empty, training all the corpus files again")
+                manifest.reset()
+
+            corpus_files = [file for file in sorted(os.listdir(self.datadir)) if file.endswith(self.CORPUS_EXTENTIONS)]
+            for file in manifest.trained_files():      # corpus files which were deleted
+                if file not in corpus_files:
+                    change = manifest.forget(file)
+                    self.__remove_trained_statements(staging_bot, change)
+                    manifest.save()
+            files = {}
+            for file in corpus_files:                   # get all corpuses
+                progress("training", files_done=len(files), files_total=len(corpus_files), file=file)
+                start = time.perf_counter()
+                change = manifest.changes(os.path.join(self.datadir, file))
+                # the statements of edited or removed conversations are removed, otherwise the model keeps answering them
+                self.__remove_trained_statements(staging_bot, change)
+                if len(change.new_conversations) > 0:
+                    trained = self.__train_conversations(staging_bot, staging_trainer, change.categories, change.new_conversations)
+                    for conversation_hash, statements in zip(change.new_hashes, trained):
+                        change.trained(conversation_hash, statements)
+                # a model trained in place saves its manifest after every file, so an interrupted training resumes where
+                # it stopped. A staging manifest is not persisted (the staging model is deleted when the training is
+                # interrupted), so the next training starts again from the served model
+                manifest.record(change)
+                manifest.save()
+                files[file] = {
+                    'seconds': round(time.perf_counter() - start, 3),
+                    'trained_conversations': len(change.new_conversations),
+                    'removed_conversations': change.removed_count
+                }
+                logging.info(f"Trained {len(change.new_conversations)} new conversations of {file} in {files[file]['seconds']} seconds")
+            progress("swapping", files_done=len(files), files_total=len(corpus_files))
+            if staging_path is not None:
+                self.__swap(staging_bot, staging_path, manifest)
+                staging_bot, staging_path = None, None
             logging.info("Model training successful")
-            return BotTrainResponse(success=True)
+            return BotTrainResponse(success=True, files=files)
         except Exception as e:
             logging.error(f"Model training failed. Error: {e}")
             return BotTrainResponse(success=False)
-    
+        finally:
+            if staging_path is not None:
+                self.__dispose_chatbot(staging_bot)
+                self.__safe_delete(staging_path)
+            # the cached answers (and captured domains) may be stale after the model or the fields were swapped
+            if self.ask_cache is not None:
+                self.ask_cache.invalidate()
+            self.__rebuild_retrieval_indexes()
+            self.train_lock.release()
+
+    def __remove_trained_statements(self, bot, change):
+        if change.removed_count == 0:
+            return
+        removed = self.__remove_statements(bot, change.removed_statements)
+        logging.info(f"Removed {removed} statements of {change.removed_count} conversations which are not in {change.filename} anymore")
+        if len(change.removed_statements) == 0:
+            logging.warning(f"The statements of the conversations removed from {change.filename} were trained before they "
+                "were recorded in the manifest, so they stay in the model until it is trained again from scratch")
+
+    def __rebuild_retrieval_indexes(self):
+        # built here, once the training finished, instead of by the first question which follows
+        for adapter in self.bot.logic_adapters:
+            if hasattr(adapter, 'rebuild_retrieval_index'):
+                try:
+                    adapter.rebuild_retrieval_index()
+                except Exception as e:
+                    logging.error(f"Cannot build the retrieval index of the model. Error: {e}")
+
+    def __create_chatbot(self, database_uri):
+        return ChatBot(self.name, logic_adapters=self.logic_adapters, read_only=self.read_only, database_uri=database_uri)
+
+    def __database_path(self):
+        if self.database_uri is None or not self.database_uri.startswith(self.SQLITE_FILE_PREFIX):
+            return None
+        path = self.database_uri[len(self.SQLITE_FILE_PREFIX):]
+        return path if path != "" else None
+
+    def __create_staging_bot(self):
+        path = self.__database_path()
+        if path is None:
+            logging.warn("The model database is not a SQLite file, training the served model in place")
+            return self.bot, None
+        staging_path = path + self.STAGING_SUFFIX
+        self.__safe_delete(staging_path)
+        self.staging_last_statement_id = None
+        if os.path.exists(path):
+            # the backup API copies a consistent database even while it is being read
+            with closing(sqlite3.connect(path)) as source, closing(sqlite3.connect(staging_path)) as staging:
+                source.backup(staging)
+                self.staging_last_statement_id = self.__last_statement_id(staging)
+        return self.__create_chatbot(self.SQLITE_FILE_PREFIX + staging_path), staging_path
+
+    def __swap(self, staging_bot, staging_path, manifest):
+        if self.__shares_database():
+            raise Exception(f"The model database {self.database_uri} is shared with the articles, it cannot be replaced")
+        path = self.__database_path()
+        self.__dispose_chatbot(staging_bot)
+        with self.model_lock.write():
+            # no connection may be left to the replaced file, and its write ahead log must be empty, otherwise it is
+            # replayed over the new file
+            self.__dispose_chatbot(self.bot)
+            self.__checkpoint(path)
+            if not self.read_only:
+                self.__merge_learned_statements(path, staging_path)
+            self.__checkpoint(staging_path)
+            os.replace(staging_path, path)
+            bot = self.__create_chatbot(self.database_uri)
+            self.bot, self.trainer = bot, ChatterBotCorpusTrainer(bot)
+        self.manifest = manifest.copy(self.manifest.location)
+        self.manifest.save()
+        logging.info("Swapped in the trained model")
+
+    def __articles_database_path(self):
+        articles_uri = getattr(self.db, 'database_uri', None)
+        if articles_uri is None or not articles_uri.startswith(self.SQLITE_FILE_PREFIX):
+            return None
+        path = articles_uri[len(self.SQLITE_FILE_PREFIX):]
+        return path if path != "" else None
+
+    def __migrate_legacy_model(self):
+        # the model used to be kept in the articles database, so it is copied once to its own database (instead of
+        # training it again from scratch)
+        path, legacy_path = self.__database_path(), self.__articles_database_path()
+        if path is None or legacy_path is None or os.path.exists(path) or not os.path.exists(legacy_path) or \
+            os.path.abspath(path) == os.path.abspath(legacy_path):
+            return
+        try:
+            with closing(sqlite3.connect(legacy_path)) as legacy:
+                schema = legacy.execute("SELECT type, name, sql FROM sqlite_master WHERE tbl_name IN (?, ?, ?) "
+                    "AND sql IS NOT NULL", self.MODEL_TABLES).fetchall()
+            tables = [name for kind, name, _ in schema if kind == "table"]
+            if "statement" not in tables:
+                return
+            with closing(sqlite3.connect(path)) as model:
+                model.execute("ATTACH DATABASE ? AS legacy", (legacy_path,))
+                with model:
+                    # tables first, then their indexes
+                    for _, _, sql in sorted(schema, key=lambda row: row[0] != "table"):
+                        model.execute(sql)
+                    for table in tables:
+                        model.execute(f"INSERT INTO main.{table} SELECT * FROM legacy.{table}")
+                model.execute("DETACH DATABASE legacy")
+            logging.warning(f"Copied the model of the bot from {legacy_path} to {path}, its tables can be dropped from {legacy_path}")
+        except Exception as e:
+            logging.error(f"Cannot copy the model of the bot from {legacy_path} to {path}. Error: {e}")
+            self.__safe_delete(path)
+
+    def __shares_database(self):
+        articles_uri = getattr(self.db, 'database_uri', None)
+        if articles_uri is None:
+            return False
+        if articles_uri == self.database_uri:
+            return True
+        path = self.__database_path()
+        return path is not None and articles_uri.startswith(self.SQLITE_FILE_PREFIX) and \
+            os.path.abspath(articles_uri[len(self.SQLITE_FILE_PREFIX):]) == os.path.abspath(path)
+
+    def __last_statement_id(self, connection):
+        try:
+            return connection.execute("SELECT MAX(id) FROM statement").fetchone()[0] or 0
+        except sqlite3.Error:
+            return 0    # the model was never trained
+
+    def __merge_learned_statements(self, path, staging_path):
+        if self.staging_last_statement_id is None or not os.path.exists(path):
+            return
+        with closing(sqlite3.connect(staging_path)) as staging:
+            staging.execute("ATTACH DATABASE ? AS served", (path,))
+            columns = [row[1] for row in staging.execute("PRAGMA served.table_info(statement)") if row[1] != "id"]
+            if len(columns) > 0:
+                names = ", ".join(columns)
+                with staging:
+                    merged = staging.execute(f"INSERT INTO statement ({names}) SELECT {names} FROM served.statement "
+                        "WHERE id > ?", (self.staging_last_statement_id,)).rowcount
+                logging.info(f"Merged {merged} statements learned while the model was trained")
+            staging.execute("DETACH DATABASE served")
+
+    def __checkpoint(self, path):
+        if path is None or not os.path.exists(path):
+            return
+        with closing(sqlite3.connect(path)) as connection:
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def __dispose_chatbot(self, bot):
+        try:
+            bot.storage.engine.dispose()
+        except Exception as e:
+            logging.error(f"Cannot close the database of the model. Error: {e}")
+
+    def __safe_delete(self, path):
+        try:
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            logging.error(f"The file:{path} cannot be deleted. Error: {e}")
+
+    def __train_conversations(self, bot, trainer, categories, conversations) -> List[list]:
+        # the same statements ChatterBotCorpusTrainer creates, inserted in bulk. The statements of every conversation are
+        # returned ([text, in_response_to]), so they can be removed once the conversation is edited or removed
+        statements = []
+        trained = []
+        for conversation in conversations:
+            trained.append([])
+            previous_statement_text = None
+            previous_statement_search_text = ''
+            for text in conversation:
+                statement_search_text = bot.storage.tagger.get_text_index_string(text)
+                statement = Statement(
+                    text=text,
+                    search_text=statement_search_text,
+                    in_response_to=previous_statement_text,
+                    search_in_response_to=previous_statement_search_text,
+                    conversation='training'
+                )
+                statement.add_tags(*categories)
+                statement = trainer.get_preprocessed_statement(statement)
+                trained[-1].append([statement.text, statement.in_response_to])
+                previous_statement_text = statement.text
+                previous_statement_search_text = statement_search_text
+                statements.append(statement)
+        bot.storage.create_many(statements)
+        return trained
+
+    def __remove_statements(self, bot, statements) -> int:
+        # every trained conversation created its own statements, so one statement is removed for every removed one
+        # (other conversations may have trained the same text)
+        if len(statements) == 0:
+            return 0
+        statement_model = bot.storage.get_model('statement')
+        session = bot.storage.Session()
+        removed = 0
+        try:
+            for text, in_response_to in statements:
+                record = session.query(statement_model).filter_by(text=text, in_response_to=in_response_to, \
+                    conversation='training').first()
+                if record is not None:
+                    session.delete(record)
+                    removed += 1
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        return removed
+
     def __reload_corpus(self) -> bool:
+        # the fields are scraped and everything derived from them is built aside, and then swapped in at once, so 
+        # requests keep using the previous fields in the meanwhile
         try:
-            self.__repload_fields()
+            fields = self.__repload_fields()
+            if fields is None or len(fields) == 0:
+                return False
+            snapshot = FieldSnapshot(fields)
+            if self.fields_snapshot is not None and snapshot.digest == self.fields_snapshot.digest:
+                logging.info("Scraped fields did not change since the last snapshot")
+                return True
             corpus_creator = CorpusCreator(self.datadir)
-            corpus_creator.create(self.fields)
-            if self.db is not None and len(self.fields) > 0:
-                string_fields = [field.name for field in self.fields]
+            corpus_creator.create(fields)
+            domain_index = self.__build_domain_index(fields)
+            if self.db is not None:
+                string_fields = [field.name for field in fields]
                 self.db.insert_fields(string_fields)
+            if self.fields_snapshot_location is not None:
+                snapshot.save(self.fields_snapshot_location)
+            self.fields, self.domain_index, self.fields_snapshot = fields, domain_index, snapshot
             logging.info("Reloading corpus was successful")
             return True
         except Exception as e:
             logging.error(f"Reloading corpus failed. Error: {e}")
             return False
 
-    def __repload_fields(self) -> None:
+    def __build_domain_index(self, fields) -> DomainIndex:
+        domain_index = DomainIndex.from_fields(fields)
+        if self.domain_index_location is not None:
+            domain_index.save(self.domain_index_location)
+        logging.info(f"Domain index built with {len(domain_index)} domains")
+        return domain_index
+
+    def __repload_fields(self):
         try:
             fieldscrapper = FieldScrapper()
-            self.fields = fieldscrapper.scrape()
+            return fieldscrapper.scrape()
         except Exception as e:
             logging.error(f"Unable to scrape for fields (this means functionality will get impacted). Error: {e}")
-            return False
+            return None
         
     def __prepare_message_for_domain_discovery(self, message):
         # Can be optimized
@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    TTLCache is a thread safe in-memory cache bounded by the amount of entries (least recently used entries are evicted
+    first), where every entry expires after a time to live.
+
+    get_or_compute coalesces concurrent computations of the same key (single flight): the first caller computes the value
+    while the others wait for it, instead of computing it again.
+
+    Configuration
+    - max_entries:    maximum amount of entries in the cache.
+    - ttl_in_seconds: seconds until an entry expires (None for entries which never expire).
+    """
+    def __init__(self, max_entries=256, ttl_in_seconds=None) -> None:
+        self.max_entries = max_entries
+        self.ttl_in_seconds = ttl_in_seconds
+        self.entries = OrderedDict()    # key -> (expiration, value)
+        self.in_flight = {}             # key -> _Flight
+        self.lock = threading.Lock()
+        self.generation = 0             # bumped on invalidation, so values computed before it are not cached
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        """
+        get gets a value from the cache.
+
+        Output
+        - tuple of whether the key was found and its value.
+        """
+        with self.lock:
+            found, value = self.__get(key)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found, value
+
+    def put(self, key, value) -> None:
+        """
+        put adds a value to the cache, evicting the least recently used entry if the cache is full.
+        """
+        with self.lock:
+            self.__put(key, value)
+
+    def get_or_compute(self, key, compute, should_cache=None):
+        """
+        get_or_compute gets a value from the cache, or computes it (once for all the concurrent callers of the same key).
+
+        Input
+        - key:          key of the value.
+        - compute:      function without arguments which computes the value.
+        - should_cache: function which gets the computed value and decides whether to cache it (None to always cache).
+
+        Output
+        - the value.
+        """
+        with self.lock:
+            found, value = self.__get(key)
+            if found:
+                self.hits += 1
+                return value
+            flight = self.in_flight.get(key)
+            is_owner = flight is None
+            if is_owner:
+                self.misses += 1
+                flight = _Flight()
+                self.in_flight[key] = flight
+                generation = self.generation
+            else:
+                self.coalesced += 1
+        if not is_owner:
+            return flight.wait()
+
+        try:
+            value = compute()
+            with self.lock:
+                if generation == self.generation and (should_cache is None or should_cache(value)):
+                    self.__put(key, value)
+            flight.resolve(value)
+            return value
+        except BaseException as e:
+            flight.fail(e)
+            raise
+        finally:
+            with self.lock:
+                if self.in_flight.get(key) is flight:
+                    del self.in_flight[key]
+
+    def invalidate(self) -> None:
+        """
+        invalidate removes all the entries of the cache, values being computed at the same time are not cached either.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.in_flight = {}
+            self.generation += 1
+
+    def stats(self) -> dict:
+        """
+        stats exposes the usage of the cache.
+        """
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl_in_seconds': self.ttl_in_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced
+            }
+
+    def __get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        expiration, value = entry
+        if expiration is not None and expiration < time.monotonic():
+            del self.entries[key]
+            return False, None
+        self.entries.move_to_end(key)
+        return True, value
+
+    def __put(self, key, value):
+        expiration = None if self.ttl_in_seconds is None else time.monotonic() + self.ttl_in_seconds
+        self.entries[key] = (expiration, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+class _Flight:
+    """
+    _Flight is a computation in progress which other callers can wait for.
+    """
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def resolve(self, value):
+        self.value = value
+        self.done.set()
+
+    def fail(self, error):
+        self.error = error
+        self.done.set()
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
@@ -1,27 +1,62 @@
 # Database
 SQLALCHEMY_DATABASE_URI = "sqlite:///db.sqlite3"
+SQLALCHEMY_POOL_SIZE = 5
+SQLALCHEMY_MAX_OVERFLOW = 10
+SQLALCHEMY_POOL_PRE_PING = True
+SQLALCHEMY_SQLITE_WAL = True
+SQLALCHEMY_SQLITE_BUSY_TIMEOUT = 5000 #milliseconds
+DB_WRITE_BEHIND_ENABLED = True #searched articles are buffered and written in bulk in the background
+DB_WRITE_BEHIND_MAX_BATCH = 50 #buffered articles which trigger a write
+DB_WRITE_BEHIND_FLUSH_SECONDS = 1.0 #maximum seconds an article waits in the buffer
+DB_WRITE_BEHIND_MAX_RETRIES = 3 #times a failed batch is written again before writing its articles one by one
 
 # Bot
 BOT_CORPUS_DATA_DIR = "./data/"
 BOT_NAME = "Bot"
 BOT_CONFIDENCE_THRESHOLD = 0.1
 BOT_LEARN_FROM_CHAT = False
+BOT_DOMAIN_INDEX_LOCATION = "./domain_index.json" #built when training with reload, used to capture domains
+BOT_FIELDS_SNAPSHOT_LOCATION = "./fields_snapshot.json" #scraped fields, refreshed with /train?reload=true
+BOT_TRAINING_MANIFEST_LOCATION = "./training_manifest.json" #hashes of the trained corpus, only changes are trained again
+BOT_DATABASE_URI = "sqlite:///bot.sqlite3" #model of the bot, trained in a staging copy and swapped in (never the articles database)
+BOT_TRAIN_JOBS_TTL = 3600 #seconds a finished training can be polled
+BOT_ASK_CACHE_MAX_ENTRIES = 1024 #answers cached by message when the bot does not learn from chat (0 to disable)
 
 # Engine
 ENGINE_MAX_UI_RESULTS = 10
-ENGINE_EXECUTION_MODEL = "priority" #priority / scattergetter
+ENGINE_EXECUTION_MODEL = "priority" #priority / scattergetter / parallel / hedged
+ENGINE_DEADLINE_SECONDS = 60 #per engine deadline in the parallel / hedged execution models
 ENGINE_MAX_PAGES_PROCESS = 10
+ENGINE_DOWNLOAD_CONCURRENCY = 10 #articles downloaded and summarized at the same time
+ENGINE_RESULT_PAGES_TTL = 3600 #seconds the PDF links of a search result page are cached (0 to disable)
+ENGINE_PREFETCH_NEXT_PAGE = True #fetch the next result page while the articles of the current one are processed
+SEARCH_CACHE_ENABLED = True
+SEARCH_CACHE_TTL = 600 #seconds a search result is reused
+SEARCH_CACHE_MAX_ENTRIES = 256
+SEARCH_JOBS_WORKERS = 2 #searches running in the background at the same time
+SEARCH_JOBS_TTL = 600 #seconds a finished search job can be polled
 
 # Backend 
 BACKEND_LOG_LEVEL = "debug"
-BACKEND_PERMISSION_POLICY = "InMemoryPermission" #NoRestrictionsPermission/InMemoryPermission
+BACKEND_PERMISSION_POLICY = "InMemoryPermission" #NoRestrictionsPermission/InMemoryPermission (opt-in: SlidingWindowPermission, DatabasePermission shared by processes)
 BACKEND_PERMISSION_TTL = 60
 BACKEND_TOTAL_SEARCH_ATTEMPTS = 1
 
 #PDF
 PDF_MULTIPROCESSING_ENABLED = True
 PDF_MULTIPROCESSING_PARALLELISM_COUNT = -1 #-1 as available cores
-PDF_ENGINE = "pymu" #pymu/pdf2/pdfmine
+PDF_ENGINE = "adaptive" #adaptive/pymu/pdf2/pdfmine (adaptive tries pymu and falls back to pdfmine)
+PDF_ADAPTIVE_MIN_LETTERS_RATIO = 0.5 #contents with less letters (out of the non blank characters) are garbled
+PDF_PYMUPDF_LAYOUT = True #order the text of pymu by the layout of the page (two columns), instead of the content stream
 PDF_PAGE_READ_STRATEGY = "portion" #all/portion
 PDF_PORTION_BEGINING_COUNT = 33
-PDF_PORTION_ENDING_COUNT = 33
\ No newline at end of file
+PDF_PORTION_ENDING_COUNT = 33
+PDF_SECTION_EXTRACTOR = "segment" #segment/regex
+PDF_INCREMENTAL_EXTRACTION = True #read pages from both ends and stop once all the sections were found (segment only)
+PDF_DOWNLOAD_CONNECT_TIMEOUT = 5 #seconds
+PDF_DOWNLOAD_READ_TIMEOUT = 30 #seconds
+PDF_DOWNLOAD_MAX_MEGABYTES = 50
+PDF_IN_MEMORY = False #keep downloads in memory (shared with the process pool) instead of temporary files. Only used when PDF_STORE_ENABLED is False, the store takes precedence
+PDF_STORE_ENABLED = True #keep downloaded PDFs and extracted texts locally
+PDF_STORE_LOCATION = "./pdf_store/"
+PDF_STORE_MAX_MEGABYTES = 1024
\ No newline at end of file
@@ -1,5 +1,10 @@
+import atexit
 import logging
+import threading
 from sqlalchemy import *
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.pool import QueuePool
 import sqlalchemy
 from article import ArticleSummary
 from typing import List
@@ -11,6 +16,9 @@ class Persistance:
     def insert_article(self, article : ArticleSummary) -> bool:
         """ Insert new articles """
         raise Exception("Unimplemented method")
+    def insert_articles(self, articles : List[ArticleSummary]) -> int:
+        """ Insert new articles in bulk, returns the amount of inserted articles (raises when the batch fails) """
+        raise Exception("Unimplemented method")
     def insert_fields(self, fields) -> bool:
         """ Insert new fields """
         raise Exception("Unimplemented method")
@@ -23,20 +31,27 @@ class Persistance:
     def get_article_by_keywords(self, keywords:List[str], limit) -> ArticleSummary:
         """ Getting article based on searched key words """
         raise Exception("Unimplemented method")
+    def search_articles(self, keywords:List[str], limit) -> List[ArticleSummary]:
+        """ Getting articles ranked by relevance to the searched key words """
+        raise Exception("Unimplemented method")
 
 class MockDB(Persistance):
     def __init__(self, insert_article_response="", insert_fields_response="",\
-        get_fields_response="", get_article_by_url_response="", get_article_by_keywords="response") -> None:
+        get_fields_response="", get_article_by_url_response="", get_article_by_keywords="response",\
+        search_articles_response="response") -> None:
         
         self.insert_article_response = insert_article_response
         self.insert_fields_response = insert_fields_response
         self.get_fields_response = get_fields_response
         self.get_article_by_url_response = get_article_by_url_response
         self.get_article_by_keywords = get_article_by_keywords
+        self.search_articles_response = search_articles_response
         super().__init__()
         
     def insert_article(self, article : ArticleSummary) -> bool:
         return self.insert_article_response
+    def insert_articles(self, articles : List[ArticleSummary]) -> int:
+        return len(articles) if self.insert_article_response else 0
     def insert_fields(self, fields) -> bool:
         return self.insert_fields_response
     def get_fields(self):
@@ -45,31 +60,318 @@ class MockDB(Persistance):
         return self.get_article_by_url_response
     def get_article_by_keywords(self, keywords:List[str], limit) -> ArticleSummary:
         return self.get_article_by_keywords
+    def search_articles(self, keywords:List[str], limit) -> List[ArticleSummary]:
+        return self.search_articles_response
+
+
+class WriteBehindPersistance(Persistance):
+    """
+    WriteBehindPersistance is a Persistance decorator which buffers the inserted articles and writes them in the 
+    background, in bulk, so the callers (such as the search path) never wait for the disk.
+
+    The buffer is written with insert_articles (a single transaction) once it holds max_batch articles or every 
+    flush_interval_in_seconds, whichever comes first, and when the application exits. Articles waiting in the buffer are
+    found by get_article_by_url (so they are not processed again), while searches only find them once they are written.
+    Every other operation goes straight to the decorated Persistance.
+
+    A batch which cannot be written (for instance, while the database is locked) is put back in the buffer and written
+    again on the next flush. Once it failed max_retries times, its articles are written one by one, so only the articles
+    which cannot be written are lost (they are counted as failed).
+
+    Configuration
+    - persistance:                  the Persistance which writes the articles.
+    - max_batch:                    amount of buffered articles which triggers a write.
+    - flush_interval_in_seconds:    maximum seconds an article waits in the buffer (and between retries).
+    - max_retries:                  times a failed batch is written again before writing its articles one by one.
+    """
+    def __init__(self, persistance:Persistance, max_batch=50, flush_interval_in_seconds=1.0, max_retries=3) -> None:
+        self.persistance = persistance
+        self.max_batch = max_batch
+        self.flush_interval_in_seconds = flush_interval_in_seconds
+        self.max_retries = max_retries
+        self.pending = {}   # url -> article, waiting to be written
+        self.writing = {}   # url -> article, being written
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.stopped = False
+        self.batches = 0
+        self.inserted = 0
+        self.retries = 0    # consecutive failures of the buffered batch
+        self.retried = 0
+        self.failed = 0
+        self.writer = threading.Thread(target=self.__write_periodically, name="db-write-behind", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def insert_article(self, article : ArticleSummary) -> bool:
+        """
+        insert_article buffers an article, returns False if it is already buffered.
+        """
+        return self.insert_articles([article]) == 1
+
+    def insert_articles(self, articles : List[ArticleSummary]) -> int:
+        """
+        insert_articles buffers articles, returns the amount of articles which were not already buffered.
+        """
+        buffered = 0
+        with self.condition:
+            for article in articles:
+                if article.url in self.pending or article.url in self.writing:
+                    continue
+                self.pending[article.url] = article
+                buffered += 1
+            # a failed batch is retried after flush_interval_in_seconds, even when the buffer is full
+            if len(self.pending) >= self.max_batch and self.retries == 0:
+                self.condition.notify()
+        return buffered
+
+    def flush(self) -> int:
+        """
+        flush writes the buffered articles right away.
+
+        Output
+        - amount of persisted articles (0 when the batch failed and was put back in the buffer).
+        """
+        with self.flush_lock:
+            with self.condition:
+                self.writing, self.pending = self.pending, {}
+                batch = list(self.writing.values())
+            if len(batch) == 0:
+                return 0
+            try:
+                try:
+                    inserted = self.persistance.insert_articles(batch)
+                except Exception as e:
+                    if self.retries < self.max_retries:
+                        logging.warning(f"Failed writing {len(batch)} buffered articles, retrying later. Error: {e}")
+                        with self.condition:
+                            self.retries += 1
+                            self.retried += 1
+                            self.pending = {**self.writing, **self.pending}
+                        return 0
+                    logging.error(f"Failed writing {len(batch)} buffered articles {self.retries + 1} times, writing them one by one. Error: {e}")
+                    inserted = self.__insert_one_by_one(batch)
+                with self.condition:
+                    self.retries = 0
+                    self.batches += 1
+                    self.inserted += inserted
+                return inserted
+            finally:
+                with self.condition:
+                    self.writing = {}
+
+    def close(self) -> None:
+        """
+        close stops the background writer, after writing the buffered articles.
+        """
+        with self.condition:
+            if self.stopped:
+                return
+            self.stopped = True
+            self.condition.notify()
+        self.writer.join()
+        for _ in range(self.max_retries + 1):
+            self.flush()
+            with self.condition:
+                if len(self.pending) == 0:
+                    return
+
+    def get_stats(self) -> dict:
+        """
+        get_stats exposes the amount of buffered articles, how many were written, how many batches were retried and how
+        many articles could not be written.
+        """
+        with self.condition:
+            return {'pending': len(self.pending) + len(self.writing), 'batches': self.batches, 'inserted': self.inserted,
+                'retried': self.retried, 'failed': self.failed}
+
+    def insert_fields(self, fields) -> bool:
+        return self.persistance.insert_fields(fields)
+    def get_fields(self):
+        return self.persistance.get_fields()
+    def get_article_by_url(self, url) -> ArticleSummary:
+        with self.condition:
+            article = self.pending.get(url) or self.writing.get(url)
+        return article if article is not None else self.persistance.get_article_by_url(url)
+    def get_article_by_keywords(self, keywords:List[str], limit) -> ArticleSummary:
+        return self.persistance.get_article_by_keywords(keywords, limit)
+    def search_articles(self, keywords:List[str], limit) -> List[ArticleSummary]:
+        return self.persistance.search_articles(keywords, limit)
+
+    def __insert_one_by_one(self, batch):
+        inserted = 0
+        for article in batch:
+            try:
+                inserted += self.persistance.insert_articles([article])
+            except Exception as e:
+                logging.error(f"The buffered article with url: {article.url} cannot be written, dropping it. Error: {e}")
+                with self.condition:
+                    self.failed += 1
+        return inserted
+
+    def __write_periodically(self):
+        while True:
+            with self.condition:
+                if not self.stopped and (len(self.pending) < self.max_batch or self.retries > 0):
+                    self.condition.wait(self.flush_interval_in_seconds)
+                if self.stopped:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Failed writing the buffered articles. Error: {e}")
+
+def create_database_engine(database_uri, pool_size=5, max_overflow=10, pool_pre_ping=True, sqlite_wal=True, \
+    sqlite_busy_timeout=5000):
+    """
+    create_database_engine creates a long-lived SQLAlchemy engine with a connection pool.
+
+    For file based SQLite databases, every new connection is switched to WAL mode (readers do not block the writer)
+    and gets a busy timeout, so concurrent writers wait for the lock instead of failing immediately.
+
+    Configuration 
+    - database_uri:         connection string to the database
+    - pool_size:            amount of connections kept open in the pool
+    - max_overflow:         amount of connections allowed on top of pool_size under load
+    - pool_pre_ping:        whether to test a connection before handing it out of the pool
+    - sqlite_wal:           whether to enable the write ahead log journal (SQLite only)
+    - sqlite_busy_timeout:  milliseconds to wait on a locked database (SQLite only)
+    """
+    url = sqlalchemy.engine.url.make_url(database_uri)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(database_uri, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=pool_pre_ping)
+
+    # in memory databases live inside a single connection, so they keep the default (singleton) pool
+    if url.database is None or url.database in ("", ":memory:"):
+        return create_engine(database_uri)
+
+    engine = create_engine(database_uri, poolclass=QueuePool, pool_size=pool_size, max_overflow=max_overflow,
+        pool_pre_ping=pool_pre_ping, connect_args={'check_same_thread': False, 'timeout': sqlite_busy_timeout / 1000})
 
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        if sqlite_wal:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(sqlite_busy_timeout)}")
+        cursor.close()
+
+    return engine
 
 class DB(Persistance):
     """
     ArticleDB is a DAL (Data Access Layer) responsible for the persistency of processed articles.
     """
-    def __init__(self, database_uri = 'sqlite:///db.sqlite3'):
+    FULL_TEXT_TABLE = "articles_fts"
+    FULL_TEXT_COLUMNS = ["title", "keywords", "search_keywords", "summary", "conclusions"]
+    FULL_TEXT_WEIGHTS = [10.0, 5.0, 5.0, 1.0, 1.0]   # bm25 weights, in the same order as FULL_TEXT_COLUMNS
+    def __init__(self, database_uri = 'sqlite:///db.sqlite3', pool_size=5, max_overflow=10, pool_pre_ping=True, \
+        sqlite_wal=True, sqlite_busy_timeout=5000):
         """
         Creating of the ArticleDB class.
 
-        On creation, this entity also checks connection to the database, as well as makes sure that the articles table 
-        exists, if not, it creates it.
+        On creation, this entity builds a single engine (with a connection pool) which is used by all the operations,
+        checks connection to the database, as well as makes sure that the articles table exists, if not, it creates it.
 
         Configuration 
-        - database_uri: connection string to the database
+        - database_uri:         connection string to the database
+        - pool_size:            amount of connections kept open in the pool
+        - max_overflow:         amount of connections allowed on top of pool_size under load
+        - pool_pre_ping:        whether to test a connection before handing it out of the pool
+        - sqlite_wal:           whether to enable the write ahead log journal (SQLite only)
+        - sqlite_busy_timeout:  milliseconds to wait on a locked database (SQLite only)
         """
         self.database_uri = database_uri
+        self.engine = create_database_engine(database_uri, pool_size=pool_size, max_overflow=max_overflow,
+            pool_pre_ping=pool_pre_ping, sqlite_wal=sqlite_wal, sqlite_busy_timeout=sqlite_busy_timeout)
         self.__create_tables()
 
     def __create_tables(self) -> None:
-        engine = create_engine(self.database_uri)
         metadata = MetaData()
         self.article_table = self.__get_article_table(metadata=metadata)
         self.fields_table = self.__get_fields_table(metadata=metadata)
-        metadata.create_all(engine)
+        metadata.create_all(self.engine)
+        self.full_text_search = self.__create_full_text_index()
+
+    def __create_full_text_index(self) -> bool:
+        """
+        Creates (if missing) an SQLite FTS5 index over the searchable columns of the articles table.
+
+        The index is an external content table over the articles table (it keeps no copy of the text, and its rows are
+        the rowids of the articles), and it is kept in sync by triggers, so writers don't need to be aware of it. Indexes
+        of former versions (with their own copy of the text, by url) are replaced. Since the rowids of the articles may
+        change when the database is vacuumed, the index is checked against the articles on startup, and rebuilt when it
+        is out of sync.
+        Returns whether full text search is available.
+        """
+        if self.engine.dialect.name != "sqlite":
+            return False
+        table = self.FULL_TEXT_TABLE
+        columns = ", ".join(self.FULL_TEXT_COLUMNS)
+        new_columns = ", ".join("new." + column for column in self.FULL_TEXT_COLUMNS)
+        old_columns = ", ".join("old." + column for column in self.FULL_TEXT_COLUMNS)
+        try:
+            with self.engine.begin() as connection:
+                definition = connection.execute(text("SELECT sql FROM sqlite_master WHERE type='table' AND name=:name"),
+                    name=table).scalar()
+                if definition is not None and "content=" in definition.replace(" ", ""):
+                    self.__check_full_text_index(connection)
+                    return True
+                if definition is not None:
+                    logging.info("Replacing the full text index for articles by an external content index")
+                    connection.execute(f"DROP TABLE {table}")
+                for trigger in ["insert", "delete", "update"]:
+                    connection.execute(f"DROP TRIGGER IF EXISTS {table}_{trigger}")
+                connection.execute(f"CREATE VIRTUAL TABLE {table} USING fts5({columns}, content='articles', "
+                    "content_rowid='rowid', tokenize='porter unicode61')")
+                connection.execute(f"CREATE TRIGGER {table}_insert AFTER INSERT ON articles BEGIN "
+                    f"INSERT INTO {table}(rowid, {columns}) VALUES (new.rowid, {new_columns}); END")
+                connection.execute(f"CREATE TRIGGER {table}_delete AFTER DELETE ON articles BEGIN "
+                    f"INSERT INTO {table}({table}, rowid, {columns}) VALUES ('delete', old.rowid, {old_columns}); END")
+                connection.execute(f"CREATE TRIGGER {table}_update AFTER UPDATE ON articles BEGIN "
+                    f"INSERT INTO {table}({table}, rowid, {columns}) VALUES ('delete', old.rowid, {old_columns}); "
+                    f"INSERT INTO {table}(rowid, {columns}) VALUES (new.rowid, {new_columns}); END")
+                # index the articles which were persisted before the index existed
+                connection.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+            logging.info("Full text index for articles was created successfully")
+            return True
+        except Exception as e:
+            logging.error(f"Full text index cannot be created, falling back to keyword scans. Error: {e}")
+            return False
+
+    def __check_full_text_index(self, connection) -> None:
+        table = self.FULL_TEXT_TABLE
+        try:
+            connection.execute(f"INSERT INTO {table}({table}, rank) VALUES ('integrity-check', 1)")
+        except Exception as e:
+            logging.warning(f"Full text index for articles is out of sync (for instance, after a vacuum), rebuilding it. Error: {e}")
+            connection.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+    def get_pool_status(self) -> dict:
+        """
+        get_pool_status exposes the state of the connection pool, in order to help sizing it.
+
+        Output
+        - dictionary with the pool size, checked in/out connections and the overflow in use.
+        """
+        pool = self.engine.pool
+        def _stat(name):
+            stat = getattr(pool, name, None)
+            return stat() if callable(stat) else -1
+        return {
+            'pool': type(pool).__name__,
+            'size': _stat('size'),
+            'checked_in': _stat('checkedin'),
+            'checked_out': _stat('checkedout'),
+            'overflow': _stat('overflow'),
+            'status': pool.status()
+        }
+
+    def dispose(self) -> None:
+        """
+        dispose closes all the pooled connections of the engine.
+        """
+        self.engine.dispose()
 
     def __get_article_table(self, metadata = MetaData()) -> Table:
         return Table('articles', metadata,
@@ -99,23 +401,59 @@ class DB(Persistance):
         - article: the article to persist. 
 
         Output
-        - boolean representing whether the article was persisted or not.
+        - boolean representing whether the article was persisted or not (False when its url already exists).
         """
         try:
-            logging.info(f"About to persist article to the db. Article:\n {article.__dict__}")
-            query = insert(self.article_table) 
-            engine = create_engine(self.database_uri)
-            connection = engine.connect()
-            values_list = [article.__dict__]
-            connection.execute(query,values_list)
-            logging.info("Persisting article to the database was successful")
-            return True
-        except sqlalchemy.exc.IntegrityError as ie:
-            logging.error("The article with url: {article} cannot inserted to the database because key already exists. Error: {ie}".format(article=article.url, ie=ie))
-            return False
+            return self.insert_articles([article]) == 1
+        except Exception:
+            return False    # logged by insert_articles
+
+    def insert_articles(self, articles : List[ArticleSummary]) -> int:
+        """
+        insert_articles inserts articles to the database in a single transaction.
+
+        Articles whose url already exists are skipped by the database (ON CONFLICT DO NOTHING, or INSERT OR IGNORE on 
+        SQLite), instead of failing the whole batch. Databases without such a statement skip the existing urls found
+        in the same transaction. Other errors are logged and raised, nothing of the batch is persisted then.
+
+        Input 
+        - articles: the articles to persist (only the first of several articles with the same url is persisted).
+
+        Output
+        - amount of persisted articles.
+        """
+        values_list, seen_urls = [], set()
+        for article in articles:
+            if article.url not in seen_urls:
+                seen_urls.add(article.url)
+                values_list.append(article.__dict__)
+        if len(values_list) == 0:
+            return 0
+        urls = [values['url'] for values in values_list]
+        try:
+            logging.info(f"About to persist {len(values_list)} articles to the db. Urls: {urls}")
+            for values in values_list:
+                logging.debug(f"Article to persist:\n {values}")
+            with self.engine.begin() as connection:
+                dialect = self.engine.dialect.name
+                if dialect == "sqlite":
+                    query = insert(self.article_table).prefix_with("OR IGNORE")
+                elif dialect == "postgresql":
+                    query = postgresql.insert(self.article_table).on_conflict_do_nothing(index_elements=['url'])
+                else:
+                    query = insert(self.article_table)
+                    existing = {row['url'] for row in connection.execute(
+                        select([self.article_table.c.url]).where(self.article_table.c.url.in_(urls)))}
+                    values_list = [values for values in values_list if values['url'] not in existing]
+                    if len(values_list) == 0:
+                        return 0
+                inserted = connection.execute(query, values_list).rowcount
+            logging.info(f"Persisting {inserted} articles to the database was successful, " \
+                f"{len(values_list) - inserted} already existed")
+            return inserted
         except Exception as e:
-            logging.error("The article with url: {article} cannot inserted to the database. Error: {e}".format(article=article.url, e=e))
-            return False
+            logging.error(f"The articles with urls: {urls} cannot be inserted to the database. Error: {e}")
+            raise
 
     def insert_fields(self, fields) -> bool:
         """
@@ -141,9 +479,8 @@ class DB(Persistance):
 
             logging.info(f"About to persist {len(fields_to_insert)} fields to the db.")
             query = insert(self.fields_table) 
-            engine = create_engine(self.database_uri)
-            connection = engine.connect()
-            connection.execute(query,[{"field": field} for field in fields_to_insert])
+            with self.engine.begin() as connection:
+                connection.execute(query,[{"field": field} for field in fields_to_insert])
             logging.info("Persisting fields to the database was successful.")
             return True
         except sqlalchemy.exc.IntegrityError as ie:
@@ -163,10 +500,8 @@ class DB(Persistance):
         """
         try:
             article_exists = select([self.article_table]).where(self.article_table.columns.url == url)
-            engine = create_engine(self.database_uri)
-            connection = engine.connect()
-
-            rows = connection.execute(article_exists).fetchall()
+            with self.engine.connect() as connection:
+                rows = connection.execute(article_exists).fetchall()
 
             if len(rows) == 0:
                 return None
@@ -205,15 +540,50 @@ class DB(Persistance):
 
             matching_articles = matching_articles.limit(limit)
 
-            engine = create_engine(self.database_uri)
-            connection = engine.connect()
-
-            rows = connection.execute(matching_articles).fetchall()
+            with self.engine.connect() as connection:
+                rows = connection.execute(matching_articles).fetchall()
 
             return [self.__convert_row_to_article_summary(row) for row in rows]            
                 
         except Exception as e:
-            logging.error("Database cannot get the article by url: {url}. Error: {e}".format(url=url, e=e))
+            logging.error("Database cannot get the articles by keywords: {keywords}. Error: {e}".format(keywords=keywords, e=e))
+            return None
+
+    def search_articles(self, keywords:List[str], limit = 10) -> List[ArticleSummary]:
+        """
+        search_articles gets the articles which match all the keywords, ranked by relevance (BM25).
+
+        The search runs against the full text index (title, keywords, search keywords, summary and conclusions). 
+        When the index is not available (for instance, the database is not SQLite), it falls back to get_article_by_keywords.
+
+        Input 
+        - keywords: the keywords (string) to search for.
+        - limit:    maximum amount of articles to return.
+
+        Output
+        - List of ArticleSummary objects, None on error.
+        """
+        if not self.full_text_search:
+            return self.get_article_by_keywords(keywords, limit)
+        phrases = ['"{phrase}"'.format(phrase=keyword.replace('"', '""')) for keyword in keywords if keyword.strip() != ""]
+        if len(phrases) == 0:
+            return []
+        try:
+            weights = ", ".join(str(weight) for weight in self.FULL_TEXT_WEIGHTS)
+            columns = ", ".join("articles." + column.name for column in self.article_table.columns)
+            query = text(f"SELECT {columns} FROM {self.FULL_TEXT_TABLE} "
+                f"JOIN articles ON articles.rowid = {self.FULL_TEXT_TABLE}.rowid "
+                f"WHERE {self.FULL_TEXT_TABLE} MATCH :query "
+                f"ORDER BY bm25({self.FULL_TEXT_TABLE}, {weights}) LIMIT :limit")\
+                .columns(*self.article_table.columns)
+
+            with self.engine.connect() as connection:
+                rows = connection.execute(query, query=" AND ".join(phrases), limit=limit).fetchall()
+
+            return [self.__convert_row_to_article_summary(row) for row in rows]
+
+        except Exception as e:
+            logging.error("Database cannot search articles by keywords: {keywords}. Error: {e}".format(keywords=keywords, e=e))
             return None
 
     def __convert_row_to_article_summary(self, row):
@@ -237,9 +607,8 @@ class DB(Persistance):
         """
         try:
             article_exists = select([self.fields_table])
-            engine = create_engine(self.database_uri)
-            connection = engine.connect()
-            return connection.execute(article_exists).fetchall()
+            with self.engine.connect() as connection:
+                return connection.execute(article_exists).fetchall()
 
         except Exception as e:
             logging.error(f"Database cannot get all fields. Error: {e}")
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import re
+from typing import List
+from scrapper import Domain, Field
+
+class DomainIndex:
+    """
+    DomainIndex is an immutable index of the domains of the fields, built once (when training) and persisted, used to
+    capture the domains mentioned in a message.
+
+    Every domain name is normalized (lower cased, punctuation removed) and mapped to its hierarchy paths (field, domain,
+    subdomains... down to the domain itself). The names are also kept in a token trie, so all the domains mentioned in a
+    message (including multi-word ones, i.e. "computer science") are found in a single pass over its tokens.
+    """
+    VERSION = 1
+    END = ""    # key of the trie nodes which complete a domain name (tokens are never empty)
+    NON_WORD = re.compile(r'[\W_]+')
+
+    def __init__(self, paths:dict=None, names:dict=None) -> None:
+        """
+        Configuration
+        - paths: dictionary of normalized domain name to a list of hierarchy paths (lists of names).
+        - names: dictionary of normalized domain name to its name as captured (defaults to the normalized name).
+        """
+        self.paths = {name: [list(path) for path in name_paths] for name, name_paths in (paths or {}).items()}
+        self.names = dict(names or {})
+        self.trie = {}
+        for name in self.paths:
+            node = self.trie
+            for token in name.split(" "):
+                node = node.setdefault(token, {})
+            node[self.END] = name
+
+    @classmethod
+    def normalize(cls, text) -> str:
+        """
+        normalize normalizes a name or a message into lower cased words separated by a single space.
+        """
+        return " ".join(cls.NON_WORD.sub(" ", str(text).lower()).split())
+
+    @classmethod
+    def from_fields(cls, fields:List[Field]):
+        """
+        from_fields builds the index out of the scraped fields, walking their hierarchy once.
+        """
+        paths = {}
+        names = {}
+        def _index(domain:Domain, path):
+            path = path + [domain.name]
+            name = cls.normalize(domain.name)
+            if name != "":
+                names.setdefault(name, domain.name)
+                if path not in paths.setdefault(name, []):
+                    paths[name].append(path)
+            for subdomain in domain.subdomains:
+                _index(subdomain, path)
+        for field in fields:
+            for domain in field.domains:
+                _index(domain, [field.name])
+        return cls(paths, names)
+
+    def match(self, message) -> List[str]:
+        """
+        match finds the domains mentioned in a message, preferring the longest name at every position
+        (i.e. "computer science" rather than "computer").
+
+        Output
+        - names of the domains found, in the order they are mentioned and without duplicates.
+        """
+        tokens = self.normalize(message).split(" ")
+        found = []
+        i = 0
+        while i < len(tokens):
+            node = self.trie
+            longest = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if self.END in node:
+                    longest = (node[self.END], j)
+            if longest is None:
+                i += 1
+                continue
+            name, i = longest
+            captured = self.names.get(name, name)
+            if captured not in found:
+                found.append(captured)
+        return found
+
+    def hierarchy(self, name) -> List[List[str]]:
+        """
+        hierarchy gets the hierarchy paths of a domain (empty if the domain is unknown).
+        """
+        return [list(path) for path in self.paths.get(self.normalize(name), [])]
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def save(self, location) -> bool:
+        """
+        save persists the index into a JSON file (written to a temporary file and swapped, so readers never see a half
+        written index).
+        """
+        try:
+            temporary_location = location + ".tmp"
+            with open(temporary_location, 'w', encoding='utf-8') as file:
+                json.dump({'version': self.VERSION, 'paths': self.paths, 'names': self.names}, file)
+            os.replace(temporary_location, location)
+            return True
+        except Exception as e:
+            logging.error(f"Cannot save the domain index to {location}. Error: {e}")
+            return False
+
+    @classmethod
+    def load(cls, location):
+        """
+        load loads a persisted index.
+
+        Output
+        - the DomainIndex, None if it does not exist or cannot be read.
+        """
+        try:
+            if location is None or not os.path.exists(location):
+                return None
+            with open(location, 'r', encoding='utf-8') as file:
+                index = json.load(file)
+            if index.get('version') != cls.VERSION:
+                logging.warn(f"Domain index version {index.get('version')} is not supported")
+                return None
+            return cls(index['paths'], index['names'])
+        except Exception as e:
+            logging.error(f"Cannot load the domain index from {location}. Error: {e}")
+            return None
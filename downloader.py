@@ -0,0 +1,150 @@
+import io
+import logging
+import os
+import tempfile
+import requests
+from requests.adapters import HTTPAdapter
+
+class PDFDownloader:
+    """
+    PDFDownloader is a class responsible to download PDF files over HTTP.
+
+    All the downloads share a single session (connections are pooled and kept alive), and the body is streamed in chunks
+    to a unique temporary file, so memory stays flat and concurrent downloads never write to the same file (or into memory,
+    for callers which parse the file right away). A download is
+    aborted as soon as it is clear that it is not a PDF (by its Content-Type or its first bytes) or that it is too big.
+
+    Configuration
+    - connect_timeout: seconds to wait for the connection to the server.
+    - read_timeout:    seconds to wait between bytes received from the server.
+    - max_bytes:       maximum size of a downloaded file.
+    - pool_size:       amount of connections kept alive per host.
+    - directory:       where to save downloaded files (None for the temporary directory of the system).
+    """
+    CHUNK_SIZE = 64 * 1024
+    PDF_MAGIC = b"%PDF-"
+    PDF_MAGIC_SEARCH_BYTES = 1024    # the PDF header is allowed to appear within the first 1024 bytes
+    NOT_PDF_CONTENT_TYPES = ["text/", "image/", "audio/", "video/", "application/json", "application/javascript"]
+    USER_AGENT = "Mozilla/5.0 (compatible; OAR/1.0)"
+
+    def __init__(self, connect_timeout=5, read_timeout=30, max_bytes=50 * 1024 * 1024, pool_size=10, directory=None) -> None:
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': self.USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get_text(self, url) -> str:
+        """
+        get_text gets the content of a page (for instance, search results) through the shared session.
+        """
+        response = self.session.get(url, timeout=(self.connect_timeout, self.read_timeout))
+        response.raise_for_status()
+        return response.text
+
+    def download(self, url):
+        """
+        download downloads a PDF file into a unique temporary file.
+
+        Input
+        - url: a url of a PDF file.
+
+        Output
+        - tuple of whether to continue processing this url and the local filename (None if the download failed).
+          Urls which are not found or are not PDF files should not be processed further.
+        """
+        return self.__download(url, in_memory=False)
+
+    def download_bytes(self, url):
+        """
+        download_bytes downloads a PDF file into memory (nothing is written to the disk).
+
+        Input
+        - url: a url of a PDF file.
+
+        Output
+        - tuple of whether to continue processing this url and the content of the file (None if the download failed).
+        """
+        return self.__download(url, in_memory=True)
+
+    def __download(self, url, in_memory):
+        if not str(url).lower().strip().startswith("http"):
+            return (False, None)
+        filename = None
+        try:
+            with self.session.get(url, stream=True, timeout=(self.connect_timeout, self.read_timeout)) as response:
+                if response.status_code == 404:
+                    logging.error(f"The file from url {url} is not found")
+                    return (False, None)
+                response.raise_for_status()
+
+                content_type = response.headers.get('Content-Type', '').lower()
+                if any(content_type.startswith(not_pdf) for not_pdf in self.NOT_PDF_CONTENT_TYPES):
+                    logging.error(f"The file from url {url} is not a PDF (Content-Type: {content_type})")
+                    return (False, None)
+                content_length = response.headers.get('Content-Length')
+                if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+                    logging.error(f"The file from url {url} is too big ({content_length} bytes)")
+                    return (False, None)
+
+                if in_memory:
+                    buffer = io.BytesIO()
+                    if not self.__stream(url, response, buffer):
+                        return (False, None)
+                    return (True, buffer.getvalue())
+
+                handle, filename = tempfile.mkstemp(prefix="tmp_", suffix=".pdf", dir=self.directory)
+                with os.fdopen(handle, 'wb') as file:
+                    if not self.__stream(url, response, file):
+                        self.__delete(filename)
+                        return (False, None)
+                return (True, filename)
+        except requests.exceptions.HTTPError as http_error:
+            logging.error(f"HTTP Error downloading the file {filename} from url {url}. Error : {http_error}")
+            self.__delete(filename)
+            return (True, None)
+        except Exception as e:
+            logging.error(f"Error downloading the file {filename} from url {url}. Error : {e}")
+            self.__delete(filename)
+            return (True, None)
+
+    def __stream(self, url, response, file) -> bool:
+        downloaded = 0
+        header = b""
+        for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+            if not chunk:
+                continue
+            if len(header) < self.PDF_MAGIC_SEARCH_BYTES:
+                header += chunk[:self.PDF_MAGIC_SEARCH_BYTES - len(header)]
+                if len(header) >= self.PDF_MAGIC_SEARCH_BYTES and self.PDF_MAGIC not in header:
+                    logging.error(f"The file from url {url} is not a PDF (missing PDF header)")
+                    return False
+            downloaded += len(chunk)
+            if downloaded > self.max_bytes:
+                logging.error(f"The file from url {url} is bigger than {self.max_bytes} bytes")
+                return False
+            file.write(chunk)
+        if self.PDF_MAGIC not in header:
+            logging.error(f"The file from url {url} is not a PDF (missing PDF header)")
+            return False
+        return True
+
+    def __delete(self, filename):
+        try:
+            if filename is not None and os.path.exists(filename):
+                os.remove(filename)
+        except Exception as e:
+            logging.error(f"The file:{filename} cannot be deleted. Error: {e}")
+
+    def __getstate__(self):
+        self_dict = self.__dict__.copy()
+        del self_dict['session']
+        return self_dict
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.session = requests.Session()
@@ -1,8 +1,13 @@
-from pdf import PDF
+from pdf import PDF, PDFSummary
+from cache import TTLCache
 from article import ArticleSummary
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
 from db import DB, Persistance 
-from typing import List
+from typing import Iterator, List
+import queue
 
 class SearchResults:
     """
@@ -10,10 +15,37 @@ class SearchResults:
 
     Configuration
     - max_search_results: limit on the amount of search results
+
+    The search can be cancelled (for instance, when an engine is abandoned after its deadline), engines should check 
+    is_cancelled and stop starting new work. A child search is cancelled on its own (for instance, a single engine) or
+    along with its parent.
     """
-    def __init__(self, max_search_results=10) -> None:
+    def __init__(self, max_search_results=10, parent=None) -> None:
         self.max_search_results = max_search_results
+        self.cancel_event = threading.Event()
+        self.parent = parent
+
+    def child(self):
+        """ A search with the same configuration, which can be cancelled without cancelling this one """
+        return SearchResults(self.max_search_results, parent=self)
+
+    def cancel(self) -> None:
+        """ Signals the engines to stop working on this search """
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        """ Whether the search (or its parent) was cancelled """
+        return self.cancel_event.is_set() or (self.parent is not None and self.parent.is_cancelled())
         
+def normalize_keywords(keywords) -> tuple:
+    """
+    normalize_keywords normalizes a list of keywords so equivalent searches can be told apart from different ones
+    (case, whitespace, order and duplicates are ignored).
+    """
+    normalized = set(" ".join(str(keyword).lower().split()) for keyword in keywords)
+    normalized.discard("")
+    return tuple(sorted(normalized))
+
 class ResearchQueryEngine:
     """
     ResearchQueryEngine is an interface for engines. 
@@ -31,17 +63,28 @@ class ResearchQueryEngine:
         """
         raise Exception("Unimplemented search method")
 
+    def search_iter(self, keywords, search_params:SearchResults) -> Iterator[ArticleSummary]:
+        """
+        search_iter searches engines for results, yielding every result as soon as it is ready. Closing the generator
+        stops the search.
+
+        Engines which cannot produce results one by one yield the results of search.
+        """
+        yield from self.search(keywords, search_params)
+
 class QueryEngineFactory:
     """
     QueryEngineFactory is a class responsible to create engines to be used for the search queries. 
     """    
-    def __init__(self, db:DB, max_pages_processed:int, pdf:PDF = PDF()) -> None:
+    def __init__(self, db:DB, max_pages_processed:int, pdf:PDF = PDF(), download_concurrency:int = 10) -> None:
         self.db = db                                    # injection of the persistance layer 
                                                         # for operations such as saving the 
                                                         # article inside the db
         self.max_pages_processed = max_pages_processed  # stating how many pages to process
         self.pdf = pdf                                  # injection of the PDF operations, 
                                                         # such as summarize
+        self.download_concurrency = download_concurrency # how many articles are downloaded and
+                                                        # summarized concurrently
     
     def engines(self) -> List[ResearchQueryEngine]:
         """
@@ -50,21 +93,34 @@ class QueryEngineFactory:
         Output 
         - List classes that implement ResearchQueryEngine 
         """
-        return [HistoricalQueryEngine(self.db),GoogleScholarQueryEngine(self.db, self.max_pages_processed, self.pdf)]
+        return [HistoricalQueryEngine(self.db),GoogleScholarQueryEngine(self.db, self.max_pages_processed, self.pdf, \
+            self.download_concurrency)]
 
 class QueryEngineController(ResearchQueryEngine):
     """
     QueryEngineController is a class responsible to orchestrate the search flow (i.e. calling engines)
     """
-    def __init__(self, db:Persistance, execution_type:None, max_pages_processed = 10, pdf:PDF = PDF()) -> None:
+    def __init__(self, db:Persistance, execution_type:None, max_pages_processed = 10, pdf:PDF = PDF(), \
+        download_concurrency = 10, engine_deadline_seconds = 60) -> None:
         """
         Creates an instance of the QueryEngineController object.
+
+        Configuration 
+        - execution_type:           how to call the engines: scattergetter / priority (one after another),
+                                    parallel (all at once) or hedged (all at once, historical results win if sufficient)
+        - engine_deadline_seconds:  how long to wait for an engine in the parallel and hedged execution models
         """
-        self.engines = QueryEngineFactory(db, max_pages_processed, pdf).engines()
+        self.engines = QueryEngineFactory(db, max_pages_processed, pdf, download_concurrency).engines()
+        self.engine_deadline_seconds = engine_deadline_seconds
+        self.execution_type = execution_type
         if execution_type is None or execution_type == "scattergetter":
             self.article_search = self.__scattergetter
         elif execution_type == "priority":
             self.article_search = self.__priority_search
+        elif execution_type == "parallel":
+            self.article_search = self.__parallel_search
+        elif execution_type == "hedged":
+            self.article_search = self.__hedged_search
         else:
             self.article_search = self.__scattergetter
 
@@ -85,6 +141,69 @@ class QueryEngineController(ResearchQueryEngine):
             [results.append(article) for article in engine.search(keywords, search_params)]
         return results
 
+    def __parallel_search(self, keywords, search_params:SearchResults):
+        executor = ThreadPoolExecutor(max_workers=len(self.engines), thread_name_prefix="engine")
+        engine_params = [search_params.child() for _ in self.engines]
+        futures = [executor.submit(engine.search, keywords, params) for engine, params in zip(self.engines, engine_params)]
+        deadline = time.monotonic() + self.engine_deadline_seconds
+        try:
+            results = []
+            for engine, future in zip(self.engines, futures):
+                results.extend(self.__wait_for_engine(engine, future, deadline))
+            return self.__merge(results, search_params.max_search_results)
+        finally:
+            # Engines which missed the deadline are abandoned (the search of the caller is left as is)
+            for params in engine_params:
+                params.cancel()
+            executor.shutdown(wait=False)
+
+    def __hedged_search(self, keywords, search_params:SearchResults):
+        executor = ThreadPoolExecutor(max_workers=len(self.engines), thread_name_prefix="engine")
+        engine_params = [search_params.child() for _ in self.engines]
+        futures = [executor.submit(engine.search, keywords, params) for engine, params in zip(self.engines, engine_params)]
+        deadline = time.monotonic() + self.engine_deadline_seconds
+        try:
+            results = []
+            historical = [(engine, future) for engine, future in zip(self.engines, futures) \
+                if isinstance(engine, HistoricalQueryEngine)]
+            for engine, future in historical:
+                results.extend(self.__wait_for_engine(engine, future, deadline))
+
+            # The historical results are sufficient, so there is no point waiting for the slower engines
+            if len(self.__merge(results, search_params.max_search_results)) >= search_params.max_search_results:
+                logging.info(f"Historical engines gathered enough ({len(results)}) articles, abandoning the rest")
+                return self.__merge(results, search_params.max_search_results)
+
+            for engine, future in zip(self.engines, futures):
+                if not isinstance(engine, HistoricalQueryEngine):
+                    results.extend(self.__wait_for_engine(engine, future, deadline))
+            return self.__merge(results, search_params.max_search_results)
+        finally:
+            for params in engine_params:
+                params.cancel()
+            executor.shutdown(wait=False)
+
+    def __wait_for_engine(self, engine, future, deadline):
+        try:
+            articles = future.result(timeout=max(0, deadline - time.monotonic()))
+            return articles if articles is not None else []
+        except TimeoutError:
+            logging.warning(f"Engine {type(engine).__name__} missed the deadline of {self.engine_deadline_seconds} seconds")
+            return []
+        except Exception as e:
+            logging.error(f"Engine {type(engine).__name__} failed while searching. Error: {e}")
+            return []
+
+    def __merge(self, articles, max_search_results):
+        merged = []
+        urls = set()
+        for article in articles:
+            if article.url in urls:
+                continue
+            urls.add(article.url)
+            merged.append(article)
+        return merged[:max_search_results]
+
     def search(self, keywords, search_params:SearchResults) -> List[ArticleSummary]:
         """
         search performs the search based on the keywords and search configuration provided. This function is the brain of the 
@@ -102,6 +221,129 @@ class QueryEngineController(ResearchQueryEngine):
         logging.info("Found {result_count} search results for search query".format(result_count=len(results)))
         return results
 
+    def search_iter(self, keywords, search_params:SearchResults) -> Iterator[ArticleSummary]:
+        """
+        search_iter performs the search like search, but yields every article as soon as an engine produces it (for 
+        instance, historical articles right away and Google Scholar articles as each PDF is summarized).
+
+        The priority and scattergetter execution models stream the engines one after another. The parallel and hedged
+        execution models stream all the engines at once, and stop (abandoning the slower engines) as soon as enough
+        articles were yielded, which is what hedging on the historical results amounts to when streaming.
+        """
+        logging.info("Streaming search results for keywords {keywords} from engines".format(keywords=keywords))
+        if self.execution_type in ["parallel", "hedged"]:
+            articles = self.__parallel_search_iter(keywords, search_params)
+        else:
+            articles = self.__sequential_search_iter(keywords, search_params)
+        yielded = 0
+        try:
+            for article in articles:
+                yielded += 1
+                yield article
+        finally:
+            articles.close()
+            logging.info("Streamed {result_count} search results for search query".format(result_count=yielded))
+
+    def __sequential_search_iter(self, keywords, search_params:SearchResults):
+        limited = self.execution_type == "priority"
+        urls = set()
+        for engine in self.engines:
+            for article in engine.search_iter(keywords, search_params):
+                if article.url in urls:
+                    continue
+                urls.add(article.url)
+                yield article
+                if limited and len(urls) >= search_params.max_search_results:
+                    logging.info(f"Gathered enough ({len(urls)}) articles to query")
+                    return
+
+    def __parallel_search_iter(self, keywords, search_params:SearchResults):
+        articles = queue.Queue()
+        def produce(engine, params):
+            try:
+                for article in engine.search_iter(keywords, params):
+                    if params.is_cancelled():
+                        break
+                    articles.put((engine, article))
+            except Exception as e:
+                logging.error(f"Engine {type(engine).__name__} failed while searching. Error: {e}")
+            finally:
+                articles.put((engine, None))
+
+        executor = ThreadPoolExecutor(max_workers=len(self.engines), thread_name_prefix="engine")
+        engine_params = [search_params.child() for _ in self.engines]
+        for engine, params in zip(self.engines, engine_params):
+            executor.submit(produce, engine, params)
+        deadline = time.monotonic() + self.engine_deadline_seconds
+        running = len(self.engines)
+        urls = set()
+        try:
+            while running > 0 and len(urls) < search_params.max_search_results:
+                try:
+                    engine, article = articles.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    logging.warning(f"{running} engines missed the deadline of {self.engine_deadline_seconds} seconds")
+                    break
+                if article is None:
+                    running -= 1
+                elif article.url not in urls:
+                    urls.add(article.url)
+                    yield article
+        finally:
+            # Engines still running are abandoned (the search of the caller is left as is)
+            for params in engine_params:
+                params.cancel()
+            executor.shutdown(wait=False)
+
+class CachedQueryEngine(ResearchQueryEngine):
+    """
+    CachedQueryEngine is an `~engines.ResearchQueryEngine` which caches the results of another engine (i.e. the
+    QueryEngineController) for a while.
+
+    Searches are keyed by the normalized set of keywords (case, whitespace, order and duplicates are ignored) and the
+    maximum amount of results. Concurrent identical searches share a single computation, and searches without results
+    are not cached (they are usually transient failures, such as the engines being blocked).
+    """
+    def __init__(self, engine:ResearchQueryEngine, cache:TTLCache) -> None:
+        self.engine = engine
+        self.cache = cache
+
+    def search(self, keywords, search_params:SearchResults) -> List[ArticleSummary]:
+        key = self.cache_key(keywords, search_params)
+        results = self.cache.get_or_compute(key, lambda: self.engine.search(keywords, search_params),
+            should_cache=lambda results: results is not None and len(results) > 0)
+        # callers get their own list, so the cached one is never modified
+        return list(results) if results is not None else []
+
+    def search_iter(self, keywords, search_params:SearchResults) -> Iterator[ArticleSummary]:
+        """
+        search_iter yields the cached results, or streams the results of the engine and caches them once the stream 
+        is complete (streams closed early are not cached).
+        """
+        key = self.cache_key(keywords, search_params)
+        found, results = self.cache.get(key)
+        if found:
+            yield from list(results)
+            return
+        articles = []
+        for article in self.engine.search_iter(keywords, search_params):
+            articles.append(article)
+            yield article
+        if len(articles) > 0:
+            self.cache.put(key, articles)
+
+    def cache_key(self, keywords, search_params:SearchResults) -> tuple:
+        """
+        cache_key builds the cache key of a search: the sorted normalized keywords and the maximum amount of results.
+        """
+        return (normalize_keywords(keywords), search_params.max_search_results)
+
+    def stats(self) -> dict:
+        """
+        stats exposes the usage of the cache.
+        """
+        return self.cache.stats()
+
 class GoogleScholarQueryEngine(ResearchQueryEngine):
     """
     GoogleScholarQueryEngine is an `~engines.ResearchQueryEngine` implementation of Google Scholar API.
@@ -109,64 +351,125 @@ class GoogleScholarQueryEngine(ResearchQueryEngine):
 
     GS_URL = "https://scholar.google.com/scholar?hl=en&as_sdt=0%2C5&q="
 
-    def __init__(self, db:DB, max_pages_processed:int, pdf:PDF = PDF()):
+    def __init__(self, db:DB, max_pages_processed:int, pdf:PDF = PDF(), download_concurrency:int = 10):
+        """
+        Creates an instance of the GoogleScholarQueryEngine object.
+
+        Configuration 
+        - max_pages_processed:  maximum amount of pages to read per article.
+        - download_concurrency: maximum amount of articles downloaded and summarized at the same time.
+        """
         self.pdf = pdf
         self.db = db
         self.max_pages_processed = max_pages_processed
+        self.download_concurrency = max(1, download_concurrency)
 
     def _compose_gs_url(self,keywords,extra_params,extra_search_param):
         query_params = '+'.join(keyword.replace(" ", '+') for keyword in keywords+extra_params).replace(" ", '')
         return self.GS_URL + query_params + extra_search_param
 
     def search(self, keywords, search_results:SearchResults) -> List[ArticleSummary]:
-        article_summaries = []
+        return list(self.search_iter(keywords, search_results))
+
+    def search_iter(self, keywords, search_results:SearchResults) -> Iterator[ArticleSummary]:
+        article_summaries = 0
+        processed_urls = set()
+        cancelled = threading.Event()
+        # The download stage runs on a thread pool (downloads are IO bound), while the parse stage of every 
+        # article is handed to the PDF process pool by the PDF engine
+        executor = ThreadPoolExecutor(max_workers=self.download_concurrency, thread_name_prefix="gs-article")
         i=0
         
-        # Query google until max results is reached
-        while search_results.max_search_results > len(article_summaries):
-            next_page="&start={i}".format(i=i)
-            logging.info("Searching for results in page: {page}".format(page = int(i/10)))
-            # Compose the page scrapping with pagination in mind
-            url = self._compose_gs_url(keywords, ["filetype%3Apdf"], next_page)
-            # Fetch for PDF URLs from the google scholar result
-            urls_to_fetch = self.pdf.fetch_urls(url)
-            if len(urls_to_fetch) == 0:
-                logging.info(f"Search engine returned no results for query {url}")
-                break
-            # Process each article separately 
-            for pdf_url_info in urls_to_fetch:
-
-                if search_results.max_search_results - len(article_summaries) <= 0:
+        try:
+            # Query google until max results is reached
+            while search_results.max_search_results > article_summaries and not search_results.is_cancelled():
+                next_page="&start={i}".format(i=i)
+                logging.info("Searching for results in page: {page}".format(page = int(i/10)))
+                # Compose the page scrapping with pagination in mind
+                url = self._compose_gs_url(keywords, ["filetype%3Apdf"], next_page)
+                # Fetch for PDF URLs from the google scholar result
+                urls_to_fetch = self.pdf.fetch_urls(url)
+                if len(urls_to_fetch) == 0:
+                    logging.info(f"Search engine returned no results for query {url}")
                     break
+                # The next page is fetched while the articles of this one are processed, unless this page can
+                # already complete the results
+                if search_results.max_search_results - article_summaries > len(urls_to_fetch):
+                    self.pdf.prefetch_urls(self._compose_gs_url(keywords, ["filetype%3Apdf"], "&start={i}".format(i=i+10)))
 
-                # Only process the article if its a new one (i.e. not present in db)
-                article_from_db = self.db.get_article_by_url(pdf_url_info[0])
-                if article_from_db is not None:
-                    article_summaries.append(article_from_db)
-                    continue
+                # Process the articles of the page concurrently (the same PDF can appear under several results)
+                futures = []
+                for pdf_url_info in urls_to_fetch:
+                    if pdf_url_info[0] in processed_urls:
+                        continue
+                    processed_urls.add(pdf_url_info[0])
+                    futures.append(executor.submit(self.__process_article, pdf_url_info, keywords, cancelled, search_results))
 
-                # Summarize PDF while extracting relevant information from it (like abstract, keywords)
-                summarized_pdf = self.pdf.summarize(pdf_url_info[0], max_pages_processed = self.max_pages_processed )
-                if summarized_pdf is None:
-                    logging.warn("Ignoring this url {url} because it is not found.".format(url=pdf_url_info[0]))
-                    continue
-                
-                # Compose an article summary which will be inserted into the db
-                article_summary = ArticleSummary(
-                        origin="googlescholar",
-                        search_keywords = ",".join(keywords),
-                        keywords = summarized_pdf.keywords,
-                        title = pdf_url_info[1],
-                        authors = pdf_url_info[2],
-                        summary = summarized_pdf.summary,
-                        future_work = summarized_pdf.future_work,
-                        conclusions = summarized_pdf.conclusions,
-                        url = pdf_url_info[0]
-                    )
-                article_summaries.append(article_summary)
-                self.db.insert_article(article_summary)
-            i = i + 10
-        return article_summaries
+                # Collect the articles as they complete, until max results is reached
+                for future in as_completed(futures):
+                    result = future.result()
+                    if result is None:
+                        continue
+                    article_summary, is_new = result
+                    article_summaries += 1
+                    if is_new:
+                        self.db.insert_article(article_summary)
+                    yield article_summary
+                    if search_results.max_search_results - article_summaries <= 0:
+                        break
+                i = i + 10
+        finally:
+            # Cancel the remaining in-flight work, running articles will stop before their next stage
+            cancelled.set()
+            executor.shutdown(wait=False)
+
+    def __process_article(self, pdf_url_info, keywords, cancelled:threading.Event, search_results:SearchResults):
+        def _is_cancelled():
+            return cancelled.is_set() or search_results.is_cancelled()
+        try:
+            if _is_cancelled():
+                return None
+
+            # Only process the article if its a new one (i.e. not present in db)
+            article_from_db = self.db.get_article_by_url(pdf_url_info[0])
+            if article_from_db is not None:
+                return (article_from_db, False)
+
+            # Download stage
+            cont, filename = self.pdf.download(pdf_url_info[0])
+            if not cont:
+                logging.warn("Ignoring this url {url} because it is not found.".format(url=pdf_url_info[0]))
+                return None
+            if _is_cancelled():
+                if filename is not None:
+                    self.pdf.delete(filename)
+                return None
+
+            # Parse stage: summarize PDF while extracting relevant information from it (like abstract, keywords)
+            if filename is None:
+                summarized_pdf = PDFSummary()
+            else:
+                # the file (or the shared memory of an in memory download) is released even when parsing fails
+                try:
+                    summarized_pdf = self.pdf.summarize_file(filename, max_pages_processed = self.max_pages_processed)
+                finally:
+                    self.pdf.delete(filename)
+
+            # Compose an article summary which will be inserted into the db
+            return (ArticleSummary(
+                    origin="googlescholar",
+                    search_keywords = ",".join(keywords),
+                    keywords = summarized_pdf.keywords,
+                    title = pdf_url_info[1],
+                    authors = pdf_url_info[2],
+                    summary = summarized_pdf.summary,
+                    future_work = summarized_pdf.future_work,
+                    conclusions = summarized_pdf.conclusions,
+                    url = pdf_url_info[0]
+                ), True)
+        except Exception as e:
+            logging.error("Failed processing the article {url}. Error: {e}".format(url=pdf_url_info[0], e=e))
+            return None
 
 class HistoricalQueryEngine(ResearchQueryEngine):
     """
@@ -177,9 +480,10 @@ class HistoricalQueryEngine(ResearchQueryEngine):
 
     def search(self, keywords, search_results:SearchResults) -> List[ArticleSummary]:
         """
-        Perform a db search for related historical articles based of the input keywords
+        Perform a db search for related historical articles based of the input keywords, ranked by relevance
         """
-        return self.db.get_article_by_keywords(keywords, search_results.max_search_results)
+        articles = self.db.search_articles(keywords, search_results.max_search_results)
+        return articles if articles is not None else []
 
 class MockEngine(ResearchQueryEngine):
     """
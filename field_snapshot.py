@@ -0,0 +1,73 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import List
+from scrapper import Domain, Field
+
+class FieldSnapshot:
+    """
+    FieldSnapshot is a versioned snapshot of the scraped fields (and their hierarchy of domains), persisted as a compact
+    JSON file so the fields are loaded in milliseconds instead of scraped from Wikipedia.
+
+    The digest is the hash of the content of the fields, so a refreshed snapshot can tell whether anything changed.
+    Every domain is kept as a [name, [subdomains...]] pair.
+    """
+    VERSION = 1
+
+    def __init__(self, fields:List[Field], created_at=None) -> None:
+        self.fields = fields
+        self.created_at = created_at if created_at is not None else time.time()
+        self.tree = [[field.name, [self.__domain_to_tree(domain) for domain in field.domains]] for field in fields]
+        self.digest = hashlib.sha256(json.dumps(self.tree, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+    def save(self, location) -> bool:
+        """
+        save persists the snapshot (written to a temporary file and swapped, so readers never see a half written file).
+        """
+        try:
+            temporary_location = location + ".tmp"
+            with open(temporary_location, 'w', encoding='utf-8') as file:
+                json.dump({'version': self.VERSION, 'digest': self.digest, 'created_at': self.created_at, \
+                    'fields': self.tree}, file, separators=(',', ':'))
+            os.replace(temporary_location, location)
+            return True
+        except Exception as e:
+            logging.error(f"Cannot save the fields snapshot to {location}. Error: {e}")
+            return False
+
+    @classmethod
+    def load(cls, location):
+        """
+        load loads a persisted snapshot.
+
+        Output
+        - the FieldSnapshot, None if it does not exist, cannot be read or its content does not match its digest.
+        """
+        try:
+            if location is None or not os.path.exists(location):
+                return None
+            with open(location, 'r', encoding='utf-8') as file:
+                content = json.load(file)
+            if content.get('version') != cls.VERSION:
+                logging.warn(f"Fields snapshot version {content.get('version')} is not supported")
+                return None
+            fields = [Field(name, [cls.__tree_to_domain(domain) for domain in domains]) for name, domains in content['fields']]
+            snapshot = cls(fields, content.get('created_at'))
+            if snapshot.digest != content.get('digest'):
+                logging.error(f"Fields snapshot {location} is corrupted (its content does not match its digest)")
+                return None
+            return snapshot
+        except Exception as e:
+            logging.error(f"Cannot load the fields snapshot from {location}. Error: {e}")
+            return None
+
+    @classmethod
+    def __domain_to_tree(cls, domain:Domain):
+        return [domain.name, [cls.__domain_to_tree(subdomain) for subdomain in domain.subdomains]]
+
+    @classmethod
+    def __tree_to_domain(cls, tree) -> Domain:
+        name, subdomains = tree
+        return Domain(name, [cls.__tree_to_domain(subdomain) for subdomain in subdomains])
@@ -0,0 +1,285 @@
+import atexit
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class SharedProcessPool:
+    """
+    SharedProcessPool is a process pool which is started on its first use (and not when it is created), so creating
+    objects which might use it (such as default arguments) never forks idle processes.
+
+    Configuration
+    - processes:   amount of processes of the pool.
+    - initializer: function called once in every process of the pool.
+    """
+    def __init__(self, processes, initializer=None) -> None:
+        self.processes = processes
+        self.initializer = initializer
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """
+        get gets the process pool, starting it if needed.
+        """
+        with self.lock:
+            if self.pool is None:
+                logging.info(f"Starting a pool of {self.processes} worker processes")
+                self.pool = Pool(self.processes, initializer=self.initializer)
+            return self.pool
+
+    def is_started(self) -> bool:
+        """
+        is_started checks whether the processes of the pool were started.
+        """
+        return self.pool is not None
+
+    def close(self) -> None:
+        """
+        close stops the processes of the pool (it is started again on the next use).
+        """
+        with self.lock:
+            if self.pool is not None:
+                self.pool.terminate()
+                self.pool.join()
+                self.pool = None
+
+class ReadWriteLock:
+    """
+    ReadWriteLock lets many readers hold it at the same time, or a single writer. Waiting writers go first (new readers
+    wait for them), so a steady flow of readers never starves a writer.
+    """
+    def __init__(self) -> None:
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        """
+        read holds the lock as a reader, within a with block.
+        """
+        with self.condition:
+            while self.writer or self.waiting_writers > 0:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if self.readers == 0:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """
+        write holds the lock as the single writer, within a with block (once the running readers are done).
+        """
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers > 0:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer = False
+                self.condition.notify_all()
+
+_shared_pools = {}
+_shared_pools_lock = threading.Lock()
+
+def shared_process_pool(processes, initializer=None) -> SharedProcessPool:
+    """
+    shared_process_pool gets the process pool shared by all the callers with the same amount of processes and initializer.
+    """
+    key = (processes, initializer)
+    with _shared_pools_lock:
+        if key not in _shared_pools:
+            _shared_pools[key] = SharedProcessPool(processes, initializer)
+        return _shared_pools[key]
+
+@atexit.register
+def close_shared_process_pools():
+    with _shared_pools_lock:
+        pools = list(_shared_pools.values())
+    for pool in pools:
+        pool.close()
+
+class DuplicateJobException(Exception):
+    """
+    DuplicateJobException is raised when submitting a job which is already running (and duplicates are rejected).
+    """
+    def __init__(self, job) -> None:
+        self.job = job
+        super().__init__(f"Job {job.id} with key {job.key} is already {job.state}")
+
+class Job:
+    """
+    Job is a unit of work running in the background of a JobManager.
+
+    The function of the job gets the job itself, and can report its phase and progress (which are exposed to the users
+    polling the job) with update.
+    """
+    def __init__(self, function, key=None) -> None:
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.function = function
+        self.state = QUEUED
+        self.phase = QUEUED
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def update(self, phase=None, **progress) -> None:
+        """
+        update reports the phase of the job and its progress counters.
+        """
+        if phase is not None:
+            self.phase = phase
+        self.progress.update(progress)
+
+    def wait(self, timeout=None) -> bool:
+        """
+        wait waits until the job is finished, returns whether it is finished.
+        """
+        return self.done.wait(timeout)
+
+    def is_finished(self) -> bool:
+        return self.state in [DONE, FAILED]
+
+    def to_dict(self) -> dict:
+        """
+        to_dict exposes the status of the job (without its result).
+        """
+        now = time.time()
+        return {
+            'id': self.id,
+            'state': self.state,
+            'phase': self.phase,
+            'progress': dict(self.progress),
+            'error': None if self.error is None else str(self.error),
+            'queued_seconds': ((self.started_at or now) - self.created_at),
+            'running_seconds': None if self.started_at is None else ((self.finished_at or now) - self.started_at)
+        }
+
+    def run(self) -> None:
+        self.state = RUNNING
+        self.phase = RUNNING
+        self.started_at = time.time()
+        try:
+            self.result = self.function(self)
+            self.state = DONE
+        except Exception as e:
+            logging.error(f"Job {self.id} failed. Error: {e}")
+            self.error = e
+            self.state = FAILED
+        finally:
+            self.phase = self.state
+            self.finished_at = time.time()
+            self.done.set()
+
+class JobManager:
+    """
+    JobManager runs jobs in background threads, so requests can enqueue work and poll for its status instead of
+    blocking on it.
+
+    Jobs with the same key which are not finished are shared (submitting the same work twice returns the first job).
+    Finished jobs are kept for a while so their result can be polled, and then forgotten.
+
+    Configuration
+    - max_workers:      amount of jobs running at the same time.
+    - ttl_in_seconds:   seconds a finished job is kept.
+    - max_jobs:         maximum amount of jobs kept (the oldest finished jobs are forgotten first).
+    """
+    def __init__(self, max_workers=2, ttl_in_seconds=600, max_jobs=1000) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.ttl_in_seconds = ttl_in_seconds
+        self.max_jobs = max_jobs
+        self.jobs = {}          # id -> Job
+        self.active_keys = {}   # key -> Job
+        self.lock = threading.Lock()
+
+    def submit(self, function, key=None, reject_duplicate=False) -> Job:
+        """
+        submit enqueues a job.
+
+        Input
+        - function:         function of the job, it gets the Job and returns its result.
+        - key:              identifies the work of the job (None for jobs which are never shared).
+        - reject_duplicate: whether to raise DuplicateJobException instead of sharing a job with the same key.
+
+        Output
+        - the Job (an existing one when a job with the same key is not finished).
+        """
+        with self.lock:
+            self.__forget_expired()
+            if key is not None and key in self.active_keys:
+                if reject_duplicate:
+                    raise DuplicateJobException(self.active_keys[key])
+                return self.active_keys[key]
+            job = Job(function, key)
+            self.jobs[job.id] = job
+            if key is not None:
+                self.active_keys[key] = job
+        self.executor.submit(self.__run, job)
+        return job
+
+    def get(self, job_id):
+        """
+        get gets a job by its id, None if it does not exist (or was forgotten).
+        """
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def active(self):
+        """
+        active gets the jobs which are not finished.
+        """
+        with self.lock:
+            return [job for job in self.jobs.values() if not job.is_finished()]
+
+    def stats(self) -> dict:
+        """
+        stats exposes the amount of jobs per state.
+        """
+        with self.lock:
+            states = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self.jobs.values():
+                states[job.state] += 1
+            return states
+
+    def shutdown(self, wait=True) -> None:
+        self.executor.shutdown(wait=wait)
+
+    def __run(self, job):
+        try:
+            job.run()
+        finally:
+            with self.lock:
+                if job.key is not None and self.active_keys.get(job.key) is job:
+                    del self.active_keys[job.key]
+
+    def __forget_expired(self):
+        now = time.time()
+        finished = sorted([job for job in self.jobs.values() if job.is_finished()], key=lambda job: job.finished_at)
+        for job in finished:
+            if now - job.finished_at > self.ttl_in_seconds or len(self.jobs) > self.max_jobs:
+                del self.jobs[job.id]
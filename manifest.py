@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+from typing import List
+import yaml
+
+class CorpusChange:
+    """
+    CorpusChange is a DTO (Data Transfer Object) describing what changed in a corpus file since it was last trained.
+
+    - filename:             name of the corpus file.
+    - digest:               content hash of the file.
+    - categories:           categories of the corpus.
+    - new_conversations:    conversations which were not trained yet.
+    - conversation_hashes:  hashes of all the conversations of the file (recorded once the file is trained).
+    - removed_count:        amount of trained conversations which are not in the file anymore.
+    - new_hashes:           hashes of the new conversations (in the same order).
+    - statements:           statements ([text, in_response_to]) trained for every conversation, by its hash.
+    - removed_statements:   statements trained for the conversations which are not in the file anymore (only known for
+                            conversations trained since the statements are recorded in the manifest).
+    """
+    def __init__(self, filename, digest, categories, new_conversations, conversation_hashes, removed_count=0, \
+        new_hashes=None, statements=None, removed_statements=None) -> None:
+        self.filename = filename
+        self.digest = digest
+        self.categories = categories
+        self.new_conversations = new_conversations
+        self.conversation_hashes = conversation_hashes
+        self.removed_count = removed_count
+        self.new_hashes = new_hashes if new_hashes is not None else []
+        self.statements = statements if statements is not None else {}
+        self.removed_statements = removed_statements if removed_statements is not None else []
+
+    def trained(self, conversation_hash, statements) -> None:
+        """
+        trained records the statements which were trained for a new conversation, so they can be removed from the model
+        once the conversation is edited or removed.
+        """
+        self.statements[conversation_hash] = [list(statement) for statement in statements]
+
+class TrainingManifest:
+    """
+    TrainingManifest records which corpus files (and which of their conversations) were already trained, by their content
+    hash, so training only ingests the conversations which were added or changed since.
+
+    Configuration
+    - location: where the manifest is persisted (None to keep it in memory only).
+    """
+    VERSION = 1
+
+    def __init__(self, location=None) -> None:
+        self.location = location
+        self.files = {}     # filename -> {'digest', 'conversations': [hashes], 'statements': {hash: [[text, in_response_to]]}}
+        self.__load()
+
+    def changes(self, corpus_path) -> CorpusChange:
+        """
+        changes finds the conversations of a corpus file which were not trained yet.
+
+        Output
+        - CorpusChange of the file (without new conversations when the file did not change).
+        """
+        filename = os.path.basename(corpus_path)
+        digest = self.hash_file(corpus_path)
+        entry = self.files.get(filename)
+        statements = dict(entry.get('statements', {})) if entry is not None else {}
+        if entry is not None and entry['digest'] == digest:
+            return CorpusChange(filename, digest, [], [], entry['conversations'], statements=statements)
+
+        with open(corpus_path, 'r', encoding='utf-8') as file:
+            corpus = yaml.safe_load(file) or {}
+        categories = corpus.get('categories', [])
+        trained = set(entry['conversations']) if entry is not None else set()
+        new_conversations = []
+        new_hashes = []
+        conversation_hashes = []
+        for conversation in corpus.get('conversations', []):
+            conversation_hash = self.hash_conversation(categories, conversation)
+            if conversation_hash not in trained and conversation_hash not in conversation_hashes:
+                new_conversations.append(conversation)
+                new_hashes.append(conversation_hash)
+            conversation_hashes.append(conversation_hash)
+        removed = trained - set(conversation_hashes)
+        removed_statements = []
+        for conversation_hash in removed:
+            removed_statements.extend(statements.pop(conversation_hash, []))
+        return CorpusChange(filename, digest, categories, new_conversations, conversation_hashes, len(removed), \
+            new_hashes, statements, removed_statements)
+
+    def record(self, change:CorpusChange) -> None:
+        """
+        record marks the conversations of a corpus file as trained.
+        """
+        self.files[change.filename] = {'digest': change.digest, 'conversations': list(change.conversation_hashes), \
+            'statements': {conversation_hash: change.statements[conversation_hash] \
+                for conversation_hash in change.conversation_hashes if conversation_hash in change.statements}}
+
+    def forget(self, filename) -> CorpusChange:
+        """
+        forget removes a corpus file which is not in the corpus anymore.
+
+        Output
+        - CorpusChange of the file, with all its conversations removed.
+        """
+        entry = self.files.pop(filename)
+        statements = entry.get('statements', {})
+        removed_statements = [statement for conversation_hash in entry['conversations'] \
+            for statement in statements.get(conversation_hash, [])]
+        return CorpusChange(filename, entry['digest'], [], [], [], len(set(entry['conversations'])), \
+            removed_statements=removed_statements)
+
+    def copy(self, location=None):
+        """
+        copy copies the manifest (for instance, to train a staging model), persisted to another location.
+        """
+        manifest = TrainingManifest()
+        manifest.location = location
+        manifest.files = {filename: {'digest': entry['digest'], 'conversations': list(entry['conversations']), \
+            'statements': dict(entry.get('statements', {}))} for filename, entry in self.files.items()}
+        return manifest
+
+    def trained_files(self) -> List[str]:
+        return list(self.files.keys())
+
+    def reset(self) -> None:
+        """
+        reset forgets everything which was trained (for instance, when the trained storage was emptied).
+        """
+        self.files = {}
+
+    def save(self) -> bool:
+        """
+        save persists the manifest (written to a temporary file and swapped, so a crash never leaves it half written).
+        """
+        if self.location is None:
+            return True
+        try:
+            temporary_location = self.location + ".tmp"
+            with open(temporary_location, 'w', encoding='utf-8') as file:
+                json.dump({'version': self.VERSION, 'files': self.files}, file)
+            os.replace(temporary_location, self.location)
+            return True
+        except Exception as e:
+            logging.error(f"Cannot save the training manifest to {self.location}. Error: {e}")
+            return False
+
+    def hash_file(self, path) -> str:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as file:
+            sha.update(file.read())
+        return sha.hexdigest()
+
+    def hash_conversation(self, categories, conversation) -> str:
+        return hashlib.sha256(json.dumps([categories, conversation], ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def __load(self):
+        try:
+            if self.location is None or not os.path.exists(self.location):
+                return
+            with open(self.location, 'r', encoding='utf-8') as file:
+                content = json.load(file)
+            if content.get('version') != self.VERSION:
+                logging.warn(f"Training manifest version {content.get('version')} is not supported, training everything")
+                return
+            self.files = content['files']
+        except Exception as e:
+            logging.error(f"Cannot load the training manifest, training everything. Error: {e}")
+            self.files = {}
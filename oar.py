@@ -1,10 +1,15 @@
 import logging
 from  bot import ChatbotFactory
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from engines.engine import QueryEngineController, SearchResults
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, stream_with_context, json
+from engines.engine import QueryEngineController, CachedQueryEngine, SearchResults, normalize_keywords
 from logs import initialize_logger
-from db import DB
-from pdf import PDF, PDFMuPDFEngine, PDFMinerEngine, PDFReadStrategyAll, PDFReadStrategyPortion, PYPDF2Engine
+from db import DB, WriteBehindPersistance
+from pdf import PDF, AdaptivePDFEngine, PDFMuPDFEngine, PDFMinerEngine, PDFReadStrategyAll, PDFReadStrategyPortion, PYPDF2Engine
+from pdf_store import PDFStore
+from cache import TTLCache
+from jobs import JobManager, DuplicateJobException, DONE
+from downloader import PDFDownloader
+from sections import RegexSectionExtractor, SectionExtractor
 from permission import PermissionFactory, PermissionErrorException, PermissionResponse
 from multiprocessing import cpu_count
 
@@ -37,35 +42,77 @@ def create_app():
     app.config.from_pyfile('config.py')
     logger = initialize_logger(loginfo=__get_log_level_from_config(\
         app.config['BACKEND_LOG_LEVEL']))
-    db = DB(app.config['SQLALCHEMY_DATABASE_URI'])
+    db = DB(app.config['SQLALCHEMY_DATABASE_URI'],
+        pool_size=app.config['SQLALCHEMY_POOL_SIZE'],
+        max_overflow=app.config['SQLALCHEMY_MAX_OVERFLOW'],
+        pool_pre_ping=app.config['SQLALCHEMY_POOL_PRE_PING'],
+        sqlite_wal=app.config['SQLALCHEMY_SQLITE_WAL'],
+        sqlite_busy_timeout=app.config['SQLALCHEMY_SQLITE_BUSY_TIMEOUT'])
+    articles_db = db
+    if app.config['DB_WRITE_BEHIND_ENABLED']:
+        articles_db = WriteBehindPersistance(db, max_batch=app.config['DB_WRITE_BEHIND_MAX_BATCH'],
+            flush_interval_in_seconds=app.config['DB_WRITE_BEHIND_FLUSH_SECONDS'], max_retries=app.config['DB_WRITE_BEHIND_MAX_RETRIES'])
 
     parallelism = app.config['PDF_MULTIPROCESSING_PARALLELISM_COUNT']
     if parallelism <= 0:
         parallelism = cpu_count()
     
+    strategy = app.config['PDF_PAGE_READ_STRATEGY'].strip().lower()
+    if strategy == "portion":
+        strategy = PDFReadStrategyPortion(app.config['PDF_PORTION_BEGINING_COUNT'], app.config['PDF_PORTION_ENDING_COUNT'])
+    else:
+        strategy = PDFReadStrategyAll()
+
+    if app.config['PDF_SECTION_EXTRACTOR'].strip().lower() == "regex":
+        section_extractor = RegexSectionExtractor()
+    else:
+        section_extractor = SectionExtractor()
+
     engine = app.config['PDF_ENGINE'].strip().lower()
-    if engine == "pymu":
-        engine = PDFMuPDFEngine()
+    if engine == "adaptive":
+        engine = AdaptivePDFEngine([PDFMuPDFEngine(app.config['PDF_PYMUPDF_LAYOUT']), PDFMinerEngine()], section_extractor=section_extractor,
+            min_letters_ratio=app.config['PDF_ADAPTIVE_MIN_LETTERS_RATIO'])
+    elif engine == "pymu":
+        engine = PDFMuPDFEngine(app.config['PDF_PYMUPDF_LAYOUT'])
     elif engine == "pdf2":
         engine = PYPDF2Engine()
     else:
         engine = PDFMinerEngine()
 
-    strategy = app.config['PDF_PAGE_READ_STRATEGY'].strip().lower()
-    if strategy == "portion":
-        strategy = PDFReadStrategyPortion(app.config['PDF_PORTION_BEGINING_COUNT'], app.config['PDF_PORTION_ENDING_COUNT'])
-    else:
-        strategy = PDFReadStrategyAll()
+    store = None
+    if app.config['PDF_STORE_ENABLED']:
+        store = PDFStore(app.config['PDF_STORE_LOCATION'], app.config['PDF_STORE_MAX_MEGABYTES'] * 1024 * 1024)
+        if app.config['PDF_IN_MEMORY']:
+            logging.warning("PDF_IN_MEMORY is ignored because PDF_STORE_ENABLED is True: downloads are kept in the store")
+
+    downloader = PDFDownloader(
+        connect_timeout=app.config['PDF_DOWNLOAD_CONNECT_TIMEOUT'],
+        read_timeout=app.config['PDF_DOWNLOAD_READ_TIMEOUT'],
+        max_bytes=app.config['PDF_DOWNLOAD_MAX_MEGABYTES'] * 1024 * 1024,
+        pool_size=app.config['ENGINE_DOWNLOAD_CONCURRENCY'])
 
-    pdf = PDF(processes_per_search=parallelism, multiprocessing=app.config['PDF_MULTIPROCESSING_ENABLED'], engine=engine, strategy=strategy)
+    pdf = PDF(processes_per_search=parallelism, multiprocessing=app.config['PDF_MULTIPROCESSING_ENABLED'], engine=engine, strategy=strategy, \
+        store=store, downloader=downloader, section_extractor=section_extractor, \
+        result_pages_ttl_in_seconds=app.config['ENGINE_RESULT_PAGES_TTL'], prefetch_result_pages=app.config['ENGINE_PREFETCH_NEXT_PAGE'], \
+        incremental=app.config['PDF_INCREMENTAL_EXTRACTION'], in_memory=app.config['PDF_IN_MEMORY'])
     bot = ChatbotFactory().create_bot(app.config['BOT_NAME'], \
-        app.config['BOT_CORPUS_DATA_DIR'], db, app.config['BOT_CONFIDENCE_THRESHOLD'], not app.config['BOT_LEARN_FROM_CHAT'])
-    query_controller = QueryEngineController(db, app.config['ENGINE_EXECUTION_MODEL'],app.config['ENGINE_MAX_PAGES_PROCESS'], pdf)
+        app.config['BOT_CORPUS_DATA_DIR'], db, app.config['BOT_CONFIDENCE_THRESHOLD'], not app.config['BOT_LEARN_FROM_CHAT'], \
+        app.config['BOT_DOMAIN_INDEX_LOCATION'], app.config['BOT_FIELDS_SNAPSHOT_LOCATION'], app.config['BOT_TRAINING_MANIFEST_LOCATION'], \
+        app.config['BOT_DATABASE_URI'], app.config['BOT_ASK_CACHE_MAX_ENTRIES'])
+    query_controller = QueryEngineController(articles_db, app.config['ENGINE_EXECUTION_MODEL'],app.config['ENGINE_MAX_PAGES_PROCESS'], pdf,
+        app.config['ENGINE_DOWNLOAD_CONCURRENCY'], app.config['ENGINE_DEADLINE_SECONDS'])
+    search_cache = None
+    if app.config['SEARCH_CACHE_ENABLED']:
+        search_cache = TTLCache(app.config['SEARCH_CACHE_MAX_ENTRIES'], app.config['SEARCH_CACHE_TTL'])
+        query_controller = CachedQueryEngine(query_controller, search_cache)
     max_results = app.config['ENGINE_MAX_UI_RESULTS']
+    search_jobs = JobManager(app.config['SEARCH_JOBS_WORKERS'], app.config['SEARCH_JOBS_TTL'])
+    train_jobs = JobManager(max_workers=1, ttl_in_seconds=app.config['BOT_TRAIN_JOBS_TTL'])
     permissions = PermissionFactory().create(
         app.config['BACKEND_PERMISSION_POLICY'], 
         app.config['BACKEND_PERMISSION_TTL'], 
-        app.config['BACKEND_TOTAL_SEARCH_ATTEMPTS'])
+        app.config['BACKEND_TOTAL_SEARCH_ATTEMPTS'],
+        database_uri=app.config['SQLALCHEMY_DATABASE_URI'])
 
     # Endpoint for getting fields
     @app.route("/fields")
@@ -80,6 +127,27 @@ def create_app():
             logger.error(f"Error while getting fields' content. Error: {e}")
             return jsonify({'status':'ERROR'})
 
+    # Endpoint for getting runtime statistics
+    @app.route("/stats")
+    def stats():
+        """
+        GET endpoint to get runtime statistics (such as the database connection pool usage)
+        """
+        try:
+            logger.debug("Received a request for runtime statistics")
+            return jsonify({
+                'db_pool': db.get_pool_status(),
+                'db_write_behind': articles_db.get_stats() if articles_db is not db else None,
+                'search_cache': search_cache.stats() if search_cache is not None else None,
+                'search_jobs': search_jobs.stats(),
+                'train_jobs': train_jobs.stats(),
+                'bot': bot.stats(),
+                'pdf_engine': pdf.engine.stats()
+            })
+        except Exception as e:
+            logger.error(f"Error while getting runtime statistics. Error: {e}")
+            return jsonify({'error':True})
+
     # Endpoint for getting webpage
     @app.route("/")
     def home():
@@ -109,13 +177,26 @@ def create_app():
     @app.route("/train")
     def train():
         """
-        GET endpoint to train the model
+        GET endpoint to start training the model in the background.
+
+        With `reload=true` the fields are scraped again before training. Returns the id of the job to poll with 
+        GET /train/status/<job_id>. Only one training runs at a time, and the bot keeps answering with the current model
+        until the trained one is swapped in.
         """
         try:
             logger.debug("Received a request for bot training")
             __check_permission(permissions.can_train, request.access_route[-1])
-            train_result = bot.train()
-            return jsonify({'status':train_result.success, 'error':False})
+            reload = request.args.get('reload', 'false').strip().lower() == 'true'
+            def run_training(job):
+                train_result = bot.train(reload=reload, progress=job.update)
+                if not train_result.success:
+                    raise Exception("model training failed")
+                return train_result.files
+            job = train_jobs.submit(run_training, key="train", reject_duplicate=True)
+            return jsonify({'status':"training", 'job_id':job.id, 'job':job.to_dict(), 'error':False})
+        except DuplicateJobException as d:
+            logger.warn(f"Rejected a training while another one is running. Error: {d}")
+            return jsonify({'status':"training already running", 'job_id':d.job.id, 'job':d.job.to_dict(), 'error':True})
         except PermissionErrorException as p:
             logger.error(f"Error while searching with the keywords the user wants. Error: {p}")
             return jsonify({'status':"train limit reached", 'error':True})
@@ -123,6 +204,25 @@ def create_app():
             logger.error(f"Error while training the bot. Error: {e}")
             return jsonify({'error':True})
 
+    # Endpoint for polling a training
+    @app.route("/train/status/<job_id>")
+    def train_status(job_id):
+        """
+        GET endpoint for the phase, progress and timings of a training, with the timings of every corpus file once done.
+        """
+        try:
+            job = train_jobs.get(job_id)
+            if job is None:
+                return jsonify({'error':True, 'status':"job not found"})
+            return jsonify({
+                'error':False,
+                'job':job.to_dict(),
+                'files':job.result if job.state == DONE else {}
+            })
+        except Exception as e:
+            logger.error(f"Error while getting the training job {job_id}. Error: {e}")
+            return jsonify({'error':True})
+
     # Endpoint for communicating with the chatbot
     @app.route("/ask", methods=['POST'])
     def ask():
@@ -191,6 +291,88 @@ def create_app():
             logger.error(f"Error while searching with the keywords the user wants. Error: {e}")
             return jsonify({'error':True})
 
+    # Endpoint for performing a search, streaming the articles as they are ready
+    @app.route("/search/stream", methods=['POST'])
+    def search_stream():
+        """
+        POST endpoint for article searching, streaming the results as NDJSON (one JSON object per line).
+
+        Every article is sent as soon as it is ready as {"article": {...}}, and the stream ends with
+        {"done": true, "count": <articles sent>, "had_error": <bool>}.
+        """
+        keywords = []
+        try:
+            logger.debug("Received a request for a streaming search response.")
+            __check_permission(permissions.can_search, request.access_route[-1])
+            keywords = request.form.getlist("keywords[]")
+        except PermissionErrorException as p:
+            logger.error(f"Error while searching with the keywords the user wants. Error: {p}")
+            return Response(json.dumps({'done':True, 'count':0, 'had_error':False, 'original_message': keywords}) + "\n",
+                mimetype="application/x-ndjson")
+
+        def stream_articles():
+            count = 0
+            had_error = False
+            try:
+                for article in query_controller.search_iter(keywords, SearchResults(max_search_results=max_results)):
+                    count += 1
+                    yield json.dumps({'article': article.__dict__}) + "\n"
+            except Exception as e:
+                logger.error(f"Error while streaming the search with the keywords the user wants. Error: {e}")
+                had_error = True
+            yield json.dumps({'done':True, 'count':count, 'had_error':had_error, 'original_message': keywords}) + "\n"
+
+        return Response(stream_with_context(stream_articles()), mimetype="application/x-ndjson")
+
+    # Endpoint for starting a search in the background
+    @app.route("/search/jobs", methods=['POST'])
+    def search_job():
+        """
+        POST endpoint for starting an article search in the background.
+
+        Returns the id of the job to poll with GET /search/jobs/<job_id>. The same search (the same keywords in any order)
+        which is still running is not started again, its job is returned instead.
+        """
+        keywords = []
+        try:
+            logger.debug("Received a request for a search job.")
+            __check_permission(permissions.can_search, request.access_route[-1])
+            keywords = request.form.getlist("keywords[]")
+            def run_search(job):
+                job.update("searching")
+                articles_summaries = __execute_query(keywords)
+                job.update(articles=len(articles_summaries))
+                return articles_summaries
+            job = search_jobs.submit(run_search, key=(normalize_keywords(keywords), max_results))
+            return jsonify({'error':False, 'job_id':job.id, 'job':job.to_dict(), 'original_message': keywords})
+        except PermissionErrorException as p:
+            logger.error(f"Error while searching with the keywords the user wants. Error: {p}")
+            return jsonify({'error':False, 'job_id':None, 'job':None, 'original_message': keywords})
+        except Exception as e:
+            logger.error(f"Error while starting a search job. Error: {e}")
+            return jsonify({'error':True})
+
+    # Endpoint for polling a search running in the background
+    @app.route("/search/jobs/<job_id>")
+    def search_job_status(job_id):
+        """
+        GET endpoint for the status of a search job, with its articles once it is done.
+        """
+        try:
+            job = search_jobs.get(job_id)
+            if job is None:
+                return jsonify({'error':True, 'status':"job not found"})
+            articles_summaries = job.result if job.state == DONE and job.result is not None else []
+            return jsonify({
+                'error':False,
+                'job':job.to_dict(),
+                'has_articles': len(articles_summaries) > 0,
+                'articles':[article.__dict__ for article in articles_summaries]
+            })
+        except Exception as e:
+            logger.error(f"Error while getting the search job {job_id}. Error: {e}")
+            return jsonify({'error':True})
+
     def __execute_query(keywords):
         query_result = query_controller.search(keywords, search_params=SearchResults(max_search_results=max_results))
         return query_result
@@ -4,10 +4,6 @@ import os
 from datetime import datetime
 from fileinput import filename
 from struct import pack
-from urllib.error import HTTPError
-import requests
-from bs4 import BeautifulSoup
-import urllib.request
 from pdfminer.pdfinterp import PDFResourceManager,PDFPageInterpreter
 from pdfminer.layout import LAParams
 from pdfminer.converter import TextConverter
@@ -15,36 +11,77 @@ from pdfminer.pdfpage import PDFPage
 from io import StringIO
 import re
 import logging 
-from multiprocessing import Pool, cpu_count, pool
+import bisect
+import threading
+import time
+from multiprocessing import cpu_count
 from PyPDF2 import PdfFileReader
 import fitz
 from typing import List 
-import json
+from pdf_store import PDFStore
+from pdf_buffer import PDFBuffer, start_shared_memory_tracker
+from downloader import PDFDownloader
+from jobs import shared_process_pool
+from cache import TTLCache
+from result_page import ResultPageParser, SoupResultPageParser
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from sections import SectionExtractor, SUMMARY, KEYWORDS, CONCLUSIONS, FUTURE_WORK, SECTIONS, NOT_APPLICABLE
 
 class PDFReadStrategy:
      def pick_pages(self, pages):
           raise Exception("Unimplemented Exception")
+     def name(self):
+          raise Exception("Unimplemented Exception")
 
 class PDFReadStrategyAll:
      def pick_pages(self, pages):
           return pages
 
+     def name(self):
+          return "all"
+
 class PDFReadStrategyPortion:
      def __init__(self, start=33, end=33) -> None:
          self.start = start
          self.end = end
 
+     def name(self):
+          return f"portion-{self.start}-{self.end}"
+
      def pick_pages(self, pages):
           start = ceil(len(pages) * self.start / 100)
           end = ceil(len(pages) * self.end / 100)
           return pages[:start] + pages[end*-1:]
 
+class PDFPageReader:
+     """
+     PDFPageReader reads the text of the pages of an open PDF file, one page at a time.
+
+     - page_count:  amount of pages of the file.
+     - read_page:   function which gets a page index and returns its text.
+     - close:       function which closes the file.
+     """
+     def __init__(self, page_count, read_page, close) -> None:
+          self.page_count = page_count
+          self.read_page = read_page
+          self.close = close
+
 class PDFEngine:
      """
      Abstraction of a PDF Mining Engine that gets PDF file and return its content
      """
      def get_pdf_content(self,filename, max_pages_processed, pool, multiprocessing, strategy):
           raise Exception ("Unimplemented method")
+     def open_pages(self, filename) -> PDFPageReader:
+          """ Opening a PDF file in order to read its pages lazily """
+          raise Exception ("Unimplemented method")
+     def read_content(self, read):
+          """ Reading the content of a file with a function which gets an engine (composite engines pick the engines) """
+          return read(self)
+     def stats(self) -> dict:
+          """ Runtime statistics of the engine """
+          return {}
 
 class PYPDF2Engine(PDFEngine):
      """
@@ -53,20 +90,18 @@ class PYPDF2Engine(PDFEngine):
      def get_pdf_content(self,filename, max_pages_processed, pool, multiprocessing, strategy):
           try:
                # Opening the PDF files as a byte of streams and feed it to the reader
-               pdfFileObj = open(filename,'rb')
+               pdfFileObj = open_pdf_file(filename)
                pdfFile = PdfFileReader(pdfFileObj)
                # Create page/index page for paralllel processing
-               index_page_pair = [(index, filename) for index in range(min(pdfFile.getNumPages(), max_pages_processed))]
+               source = worker_source(filename) if multiprocessing else filename
+               index_page_pair = [(index, source) for index in range(min(pdfFile.getNumPages(), max_pages_processed))]
                index_page_pair = strategy.pick_pages(index_page_pair)
                merged_output = StringIO()
 
                # In case of multi processing, create a process per page and get its content
                if multiprocessing:
-                    res = pool.starmap(get_pdf2_page, index_page_pair)
-                    def getKey(item):
-                         return item[1]
-                    sorted(res, key=getKey)
-                    [merged_output.write(part[0]) for part in res]
+                    res = pool.starmap(get_pdf2_pages, chunk_pages(index_page_pair, pool_size(pool)))
+                    [merged_output.write(text) for _, text in merge_chunks(res)]
                else: # In case we want to use a single thread, read every page synchroniously 
                     for index, filename in index_page_pair:
                          merged_output.write(pdfFile.getPage(index).extractText())
@@ -78,92 +113,63 @@ class PYPDF2Engine(PDFEngine):
                logging.error("Cannot convert PDF: {filename} into text. Error: {e}".format(filename=filename, e=e))
                return None
 
+     def open_pages(self, filename) -> PDFPageReader:
+          pdfFile, close = _open_pdf2_document(filename)
+          return PDFPageReader(pdfFile.getNumPages(), lambda index: pdfFile.getPage(index).extractText(), close)
+
 class PDFMuPDFEngine(PDFEngine):
+     """
+      PDFMuPDFEngine implementation of the PDFEngine interface
 
+      Configuration
+      - layout: whether to order the text of every page by its layout (blocks in reading order, including two column
+                pages, separated by blank lines), instead of the order of the content stream.
+     """
      ENCODING = "UTF-8"
 
-     def SortBlocks(blocks):
-          sblocks = []
-          for b in blocks:
-               x0 = str(int(b["bbox"][0]+0.99999)).rjust(4,"0") # x coord in pixels
-               y0 = str(int(b["bbox"][1]+0.99999)).rjust(4,"0") # y coord in pixels
-               sortkey = y0 + x0                                # = "yx"
-               sblocks.append([sortkey, b])
-          sblocks.sort()
-          return [b[1] for b in sblocks] # return sorted list of blocks
-
-     def SortLines(lines):
-          slines = []
-          for l in lines:
-               y0 = str(int(l["bbox"][1] + 0.99999)).rjust(4,"0")
-               slines.append([y0, l])
-          slines.sort()
-          return [l[1] for l in slines]
-
-     def SortSpans(spans):
-          sspans = []
-          for s in spans:
-               x0 = str(int(s["bbox"][0] + 0.99999)).rjust(4,"0")
-               sspans.append([x0, s])
-          sspans.sort()
-          return [s[1] for s in sspans]
-
+     def __init__(self, layout=True) -> None:
+          self.layout = layout
 
      def get_pdf_content(self,filename, max_pages_processed, pool, multiprocessing, strategy):
           try:
-               pdfPages = fitz.open(filename)
-               pair = [(index, filename) for index in range(min(len(pdfPages), max_pages_processed))]
-               index_page_pair = strategy.pick_pages(pair)
-               merged_output = StringIO()
-
-               if multiprocessing:
-                    res = pool.starmap(get_pymupdf_page, index_page_pair)
-                    def getKey(item):
-                         return item[1]
-                    sorted(res, key=getKey)
-                    [merged_output.write(part[0].getvalue()) for part in res]
-
-               else:
-                    for index, filename in index_page_pair:
-                         page_text = pdfPages[index].get_text("json")
-                         pgdict = json.loads(page_text)                    # create a dict out of it
-                         blocks = self.SortBlocks(pgdict["blocks"])        # now re-arrange ... blocks
-                         for b in blocks:
-                              lines = self.SortLines(b["lines"])            # ... lines
-                              for l in lines:
-                                   spans = self.SortSpans(l["spans"])        # ... spans
-                                   for s in spans:
-                                        # ensure that spans are separated by at least 1 blank
-                                        # (should make sense in most cases)
-                                        if pg_text.endswith(" ") or s["text"].startswith(" "):
-                                             pg_text += s["text"]
-                                        else:
-                                             pg_text += " " + s["text"]
-                                   pg_text += "\n"                      # separate lines by newline
-
-                         pg_text = pg_text.encode("UTF-8", "ignore")
-                         merged_output.write(pg_text)
-               
-               return merged_output.getvalue()
+               pdfPages, close = _open_pymupdf_document(filename)
+               try:
+                    source = worker_source(filename) if multiprocessing else filename
+                    pair = [(index, source) for index in range(min(len(pdfPages), max_pages_processed))]
+                    index_page_pair = strategy.pick_pages(pair)
+                    merged_output = StringIO()
+
+                    if multiprocessing:
+                         chunks = [(indexes, filename, self.layout) for indexes, filename in chunk_pages(index_page_pair, pool_size(pool))]
+                         res = pool.starmap(get_pymupdf_pages, chunks)
+                         [merged_output.write(text) for _, text in merge_chunks(res)]
+                    else:
+                         for index, filename in index_page_pair:
+                              merged_output.write(get_pymupdf_page_text(pdfPages[index], self.layout))
+                    return merged_output.getvalue()
+               finally:
+                    close()
           except Exception as e:
                logging.error("Cannot convert PDF: {filename} into text. Error: {e}".format(filename=filename, e=e))
                return None
 
+     def open_pages(self, filename) -> PDFPageReader:
+          document, close = _open_pymupdf_document(filename)
+          return PDFPageReader(len(document), lambda index: get_pymupdf_page_text(document[index], self.layout), close)
+
 class PDFMinerEngine(PDFEngine):
      def get_pdf_content(self,filename, max_pages_processed, pool, multiprocessing, strategy):
           try:
-               pdfFile = open(filename,'rb')
+               pdfFile = open_pdf_file(filename)
                pages = list(PDFPage.get_pages(pdfFile,pagenos=set(),maxpages=0,password='',caching=True,check_extractable=True))
-               index_page_pair = [(index, filename) for index in range(min(len(pages), max_pages_processed))]
+               source = worker_source(filename) if multiprocessing else filename
+               index_page_pair = [(index, source) for index in range(min(len(pages), max_pages_processed))]
                index_page_pair = strategy.pick_pages(index_page_pair)
                merged_output = StringIO()
 
                if multiprocessing:
-                    res = pool.starmap(get_pdf_page, index_page_pair)
-                    def getKey(item):
-                         return item[1]
-                    sorted(res, key=getKey)
-                    [merged_output.write(part[0].getvalue()) for part in res]
+                    res = pool.starmap(get_pdf_pages, chunk_pages(index_page_pair, pool_size(pool)))
+                    [merged_output.write(text) for _, text in merge_chunks(res)]
 
                else:
                     resource_manager = PDFResourceManager(caching=True)
@@ -178,63 +184,164 @@ class PDFMinerEngine(PDFEngine):
                logging.error("Cannot convert PDF: {filename} into text. Error: {e}".format(filename=filename, e=e))
                return None
 
+     def open_pages(self, filename) -> PDFPageReader:
+          pages, close = _open_pdfminer_document(filename)
+          resource_manager = PDFResourceManager(caching=True)
+          laParams = LAParams()
+          def read_page(index):
+               output_text = StringIO()
+               interpreter = PDFPageInterpreter(resource_manager, TextConverter(resource_manager,output_text,laparams=laParams))
+               interpreter.process_page(pages[index])
+               return output_text.getvalue()
+          return PDFPageReader(len(pages), read_page, close)
+
+
+
+
+class AdaptivePDFEngine(PDFEngine):
+     """
+     AdaptivePDFEngine is a composite PDF engine which tries its engines in order (the fastest first), and falls back to 
+     the next engine only when the content is empty, garbled (mostly symbols, unknown glyphs or unmapped characters) 
+     or none of the sections can be extracted out of it.
+
+     The latency and the outcome of every engine are recorded in histograms, in order to weigh the cost of every engine
+     against how often it succeeds.
+
+     Configuration
+     - engines:              the engines to try, in order (None for PyMuPDF and then PDFMiner).
+     - section_extractor:    extracts the sections to check the content (None for SectionExtractor).
+     - min_letters_ratio:    minimum ratio of letters out of the non blank characters of a valid content.
+     """
+     LATENCY_BUCKETS_MS = [10, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+     SUCCESS = "success"
+     EMPTY = "empty"
+     GARBLED = "garbled"
+     NO_SECTIONS = "no_sections"
+     UNMAPPED_CHARACTERS = re.compile(r'\(cid:\d+\)|\ufffd')
+
+     def __init__(self, engines:List[PDFEngine]=None, section_extractor=None, min_letters_ratio=0.5) -> None:
+          self.engines = engines if engines is not None else [PDFMuPDFEngine(), PDFMinerEngine()]
+          self.section_extractor = section_extractor if section_extractor is not None else SectionExtractor()
+          self.min_letters_ratio = min_letters_ratio
+          self.lock = threading.Lock()
+          self.engine_stats = {type(engine).__name__: self.__empty_stats() for engine in self.engines}
 
+     def get_pdf_content(self,filename, max_pages_processed, pool, multiprocessing, strategy):
+          return self.read_content(lambda engine: engine.get_pdf_content(filename, max_pages_processed, pool, multiprocessing, strategy))
+
+     def open_pages(self, filename) -> PDFPageReader:
+          return self.engines[0].open_pages(filename)
+
+     def read_content(self, read):
+          fallback = None
+          for engine in self.engines:
+               start = time.perf_counter()
+               content = read(engine)
+               outcome = self.judge(content)
+               self.__record(type(engine).__name__, (time.perf_counter() - start) * 1000, outcome)
+               if outcome == self.SUCCESS:
+                    return content
+               logging.info(f"The content of {type(engine).__name__} is {outcome}, falling back to the next engine")
+               if fallback is None and outcome != self.EMPTY:
+                    fallback = content
+          return fallback
+
+     def judge(self, content) -> str:
+          """
+          judge checks the quality of a content.
 
+          Output
+          - success, or why the content is not valid (empty, garbled or no_sections).
+          """
+          if content is None or content.strip() == "":
+               return self.EMPTY
+          characters = [character for character in content if not character.isspace()]
+          unmapped = sum(len(match) for match in self.UNMAPPED_CHARACTERS.findall(content))
+          letters = sum(1 for character in characters if character.isalpha())
+          if (letters - unmapped) < self.min_letters_ratio * len(characters):
+               return self.GARBLED
+          sections = self.section_extractor.extract(content)
+          if all(sections[section] == NOT_APPLICABLE for section in SECTIONS):
+               return self.NO_SECTIONS
+          return self.SUCCESS
+
+     def stats(self) -> dict:
+          """
+          stats exposes for every engine the amount of contents per outcome and the histogram of its latency (the 
+          amount of reads under every bucket of milliseconds, the last one being unbounded).
+          """
+          with self.lock:
+               return {name: {'outcomes': dict(stats['outcomes']), 'latency_ms': dict(stats['latency_ms']), \
+                    'total_ms': stats['total_ms']} for name, stats in self.engine_stats.items()}
+
+     def __empty_stats(self):
+          buckets = {str(bucket): 0 for bucket in self.LATENCY_BUCKETS_MS}
+          buckets['inf'] = 0
+          return {'outcomes': {self.SUCCESS: 0, self.EMPTY: 0, self.GARBLED: 0, self.NO_SECTIONS: 0}, \
+               'latency_ms': buckets, 'total_ms': 0.0}
+
+     def __record(self, name, elapsed_ms, outcome):
+          bucket = next((str(bucket) for bucket in self.LATENCY_BUCKETS_MS if elapsed_ms <= bucket), 'inf')
+          with self.lock:
+               stats = self.engine_stats[name]
+               stats['outcomes'][outcome] += 1
+               stats['latency_ms'][bucket] += 1
+               stats['total_ms'] += elapsed_ms
 
 class PDF:
      """
      PDF is a class responsible to download and read PDF files (mainly for the articles).
      """
-     ABSTRACT_REGEX = [
-          (r'[A][Bb][Ss][Tt][Rr][Aa][Cc][Tt][ \n]{1,}(.+?)(?=\n\n|Keywords)', re.DOTALL),
-          (r'[A][Bb][Ss][Tt][Rr][Aa][Cc][Tt](.+?)(?=\n ?\n ?Key ?W?w?ords?)', re.DOTALL),
-          (r'[A][Bb][Ss][Tt][Rr][Aa][Cc][Tt][ \n]?(.+?)(?=\n\n)', re.DOTALL)
-          ]
-
-     KEYWORDS_REGEX = [
-               (r'[K][Ee][Yy][ ]?[ ]?[Ww][Oo][Rr][Dd][Ss]? ?:? +(.+?)(?=\n +\n)', re.DOTALL),
-               (r'[K][Ee][Yy][ ]?[ ]?[Ww][Oo][Rr][Dd][Ss]?[:]?.*?\n{0,}(.+?)(?=\n\n)', re.DOTALL),
-               (r'[I][Nn][Dd][Ee][Xx][ ][Tt][Ee][Rr][Mm][Ss]?(.*?)(?=\n\n)', re.DOTALL)
-               ]   
-
-     CONCLUSION_REGEX = [
-          (r'[C][Oo][Nn][Cc][Ll][Uu][Ss][Ii][Oo][Nn][Ss]?.*?\n{1,2}?(.+?)(?=\n ?\n ?\n?(\w+) {0,}\n)', re.DOTALL),
-          (r'[Cc][Oo][Nn][Cc][Ll][Uu][Ss][Ii][Oo][Nn][Ss]?.*?\n{1,}(.+?)(?=\n ?\n ?\n?|\w+ {0,}\n)', re.DOTALL),
-          (r'[Cc][Oo][Nn][Cc][Ll][Uu][Ss][Ii][Oo][Nn][Ss]?.*?[ \n]{4,}(.+?)(?=\n ?\n ?\n?(\w+) {0,}\n)', re.DOTALL),
-          (r'[Cc][Oo][Nn][Cc][Ll][Uu][Ss][Ii][Oo][Nn][Ss]?.*?\n{1,}(.+?)(?=\n ?\n ?\n?)', re.DOTALL)
-          ]
-          
-     FUTURE_WORK_REGEX = [
-          (r'[Ff][Uu][Tt][Uu][Rr][Ee][ ][Ww][Oo][Rr][Kk][ \n]{1,}(.+?)(?=\n\n)', re.DOTALL),
-          (r'[F][Uu][Tt][Uu][Rr][Ee][ ][Dd][Ii][Rr][Ee][Cc][Tt][Ii][Oo][Nn][Ss].+?\n{2,}(.+?)(?=\n\n(\w+)\n)', re.DOTALL),
-          (r'[F][Uu][Tt][Uu][Rr][Ee][ ][Ss][Cc][Oo][Pp][Ee](.+?)\n{2,}(.?)(?=\n\n(\w+ )\n|CONCLUSION)', re.DOTALL),
-          (r'[Ff][Uu][Tt][Uu][Rr][Ee]\n?\n?[Rr][Ee][Ss][Ee][Aa][Rr][Cc][Hh](.*?){1,}(.+?)(?=\n\n\w+\n)', re.DOTALL),
-          (r'[Ff][Uu][Tt][Uu][Rr][Ee][ ][Ss][Tt][Uu][Dd][Ii][Ee][Ss].*?\n{1,2}?(.+?)(?=\n ?\n ?\n?(\w+) {0,}\n)', re.DOTALL)
-          ]
-
      DEFAULT = "N/A"
 
-     def __init__(self, processes_per_search=cpu_count(), multiprocessing:bool=False, engine=PDFMinerEngine(), strategy:PDFReadStrategy=PDFReadStrategyAll()) -> None:
+     def __init__(self, processes_per_search=cpu_count(), multiprocessing:bool=False, engine=PDFMinerEngine(), strategy:PDFReadStrategy=PDFReadStrategyAll(), \
+          store:PDFStore=None, downloader:PDFDownloader=None, section_extractor=None, result_parser:ResultPageParser=None, \
+          result_pages_ttl_in_seconds=3600, prefetch_result_pages=True, incremental:bool=False, in_memory:bool=False) -> None:
           """
           Creating of the PDF class.
 
           Configuration 
-          - processes_per_search:  sets the amount of parallelism (processes) when processing PDF files.
+          - processes_per_search:  sets the amount of parallelism (processes) when processing PDF files. The processes are
+                                   shared by all the PDF instances, and only started on the first multiprocessing read.
+          - store:                 local store of downloaded PDFs and extracted texts (None to always download).
+          - downloader:            downloads the PDF files and the search result pages (None for the default one).
+          - section_extractor:     extracts the sections (abstract, keywords...) out of the text (None for SectionExtractor).
+          - result_parser:         extracts the PDF links out of the search result pages (None for SoupResultPageParser).
+          - result_pages_ttl_in_seconds: seconds the PDF links of a result page are cached (0 to disable the cache).
+          - prefetch_result_pages: whether prefetch_urls fetches pages in the background (into the cache).
+          - incremental:           whether to read the pages from both ends of the file, one at a time, and stop once the
+                                   section extractor found all the sections (instead of reading all the pages first).
+          - in_memory:             whether downloads are kept in memory (shared with the process pool) instead of temporary
+                                   files. Downloads which go to the store are always saved as files.
           """
           self.processes_per_search = processes_per_search
-          self.pool = Pool(self.processes_per_search)
           self.multiprocessing = multiprocessing
           self.engine = engine
           self.strategy = strategy
-
-     def __request_url_as_string(self, url):
-          return requests.get(url).text
+          self.store = store
+          self.downloader = downloader if downloader is not None else PDFDownloader()
+          self.section_extractor = section_extractor if section_extractor is not None else SectionExtractor()
+          self.result_parser = result_parser if result_parser is not None else SoupResultPageParser()
+          self.result_pages = TTLCache(max_entries=256, ttl_in_seconds=result_pages_ttl_in_seconds) \
+               if result_pages_ttl_in_seconds > 0 else None
+          self.prefetch_result_pages = prefetch_result_pages and self.result_pages is not None
+          self.prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-page-prefetch")
+          self.incremental = incremental
+          self.in_memory = in_memory
+
+     @property
+     def pool(self):
+          """
+          pool is the process pool shared by all the PDF instances with the same parallelism, started on its first use.
+          """
+          start_shared_memory_tracker()
+          return shared_process_pool(self.processes_per_search, init_pdf_worker).get()
 
      def summarize(self,pdf_url, should_download=True, max_pages_processed = 20):
           """
           summarize the pdf via URL.
           
-          The function first downloads the file, saves it locally and then processes it in parallel (based on the amount of cores available on the machine).
+          The function first downloads the file, saves it locally (or keeps it in memory) and then processes it in parallel (based on the amount of cores available on the machine).
 
           Input 
           - pdf_url: a url containing the PDF file to summarize.
@@ -246,27 +353,126 @@ class PDF:
           
           # download the PDF locally so it could be processed later on
           if should_download:
-               cont, filename=self.__download_file(pdf_url)
+               cont, filename=self.download(pdf_url)
                if not cont:
                     return None
                if filename is None:
                     return PDFSummary()
           
-          # call the PDF engine to convert the PDF to a text file
-          content=self.engine.get_pdf_content(filename, max_pages_processed, self.pool, self.multiprocessing, self.strategy)
-          if should_download:
-               self.__safe_delete_file(filename)
+          try:
+               return self.summarize_file(filename, max_pages_processed)
+          finally:
+               if should_download:
+                    self.delete(filename)
+
+     def download(self, pdf_url):
+          """
+          download downloads the pdf via URL into a unique local file.
+
+          When a store is configured, PDFs already in the store are not downloaded again, and new downloads are moved 
+          into the store. Stored PDFs are pinned (not evicted) until they are deleted. Otherwise, in memory downloads are kept in a PDFBuffer instead of a local file.
+
+          Input 
+          - pdf_url: a url containing the PDF file to download.
+
+          Output
+          - tuple of whether to continue processing this url and the local filename or PDFBuffer (None if the download
+            failed).
+          """
+          if self.store is not None:
+               stored_filename = self.store.get_file(pdf_url, pin=True)
+               if stored_filename is not None:
+                    logging.info(f"The file of {pdf_url} is served from the store.")
+                    return (True, stored_filename)
+          elif self.in_memory:
+               cont, data = self.downloader.download_bytes(pdf_url)
+               return (cont, PDFBuffer(data, pdf_url) if data is not None else None)
+
+          cont, filename = self.downloader.download(pdf_url)
+          if self.store is not None and filename is not None:
+               try:
+                    filename = self.store.put_file(pdf_url, filename, pin=True)
+               except Exception as e:
+                    logging.error(f"The file of {pdf_url} cannot be saved in the store. Error: {e}")
+          return (cont, filename)
+
+     def summarize_file(self, filename, max_pages_processed = 20):
+          """
+          summarize_file summarizes a local pdf file.
+
+          The PDF engine converts the file into text (using the process pool when multiprocessing is enabled), and then the
+          regular expressions extract the relevant sections out of it.
+
+          Input 
+          - filename:            the local PDF file (or PDFBuffer) to summarize.
+          - max_pages_processed: maximum amount of pages to read.
+
+          Output
+          - PDFSummary with the summary information.
+          """
+          content = self.__get_content(filename, max_pages_processed)
           if content is None:
                return PDFSummary()
 
-          # Execute regular expressions on the text to match for expressions (such as abstract, keywords)
+          # Extract the relevant sections (such as abstract, keywords) out of the text
+          sections = self.section_extractor.extract(content)
           return PDFSummary(
-               conclusions = self.__get_text(content,self.CONCLUSION_REGEX),
-               keywords=self.__get_text(content,self.KEYWORDS_REGEX),
-               summary = self.__get_text(content, self.ABSTRACT_REGEX),
-               future_work = self.__get_text(content,self.FUTURE_WORK_REGEX)
+               conclusions = sections[CONCLUSIONS],
+               keywords=sections[KEYWORDS],
+               summary = sections[SUMMARY],
+               future_work = sections[FUTURE_WORK]
                )
 
+     def delete(self, filename):
+          """
+          delete removes a downloaded file, errors are logged and ignored. Files kept by the store are not removed (they
+          are only unpinned, so the store may evict them), and in memory downloads only release their shared memory.
+          """
+          if isinstance(filename, PDFBuffer):
+               filename.close()
+               return
+          if self.store is not None and self.store.owns(filename):
+               self.store.release(filename)
+               return
+          self.__safe_delete_file(filename)
+
+     def __get_content(self, filename, max_pages_processed):
+          digest = self.store.digest_of(filename) if self.store is not None and isinstance(filename, str) else None
+          text_key = "{engine}.{strategy}.{pages}".format(engine=type(self.engine).__name__, strategy=self.strategy.name(), \
+               pages=max_pages_processed)
+          if self.incremental:
+               # the pages which were read depend on the sections found by the extractor
+               text_key += ".incremental.{extractor}".format(extractor=type(self.section_extractor).__name__)
+          if digest is not None:
+               content = self.store.get_text(digest, text_key)
+               if content is not None:
+                    return content
+
+          if self.incremental:
+               content = self.__get_content_incrementally(filename, max_pages_processed)
+          else:
+               # call the PDF engine to convert the PDF to a text file
+               pool = self.pool if self.multiprocessing else None
+               content=self.engine.get_pdf_content(filename, max_pages_processed, pool, self.multiprocessing, self.strategy)
+          if digest is not None and content is not None:
+               self.store.put_text(digest, text_key, content)
+          return content
+
+     def __get_content_incrementally(self, filename, max_pages_processed):
+          return self.engine.read_content(lambda engine: self.__read_incrementally(engine, filename, max_pages_processed))
+
+     def __read_incrementally(self, engine, filename, max_pages_processed):
+          # the whole file is read by a single process of the pool (files of concurrent searches are read in parallel)
+          source = worker_source(filename) if self.multiprocessing else filename
+          arguments = (engine, self.section_extractor, source, max_pages_processed, self.strategy)
+          result = self.pool.apply(read_pages_incrementally, arguments) if self.multiprocessing \
+               else read_pages_incrementally(*arguments)
+          if result is None:
+               return None
+          content, pages_read, pages_picked = result
+          logging.info(f"Read {pages_read} of {pages_picked} pages of the file:{filename} until all the sections were found")
+          return content
+
      def __safe_delete_file(self,filename):
           try:
                os.remove(filename)
@@ -274,62 +480,44 @@ class PDF:
           except Exception as e:
                logging.error(f"The file:{filename} cannot be deleted. Error: {e}")
 
-     def fetch_urls(self, url, url_fetcher=__request_url_as_string):
+     def fetch_urls(self, url, url_fetcher=None):
           """
           fetch_urls fetches PDF urls based on a given URL.
+
+          The urls of a page are cached (pages without urls are not), so paging through the same search again, or 
+          fetching a page which was prefetched, does not request the page again.
           
           Input 
           - url:         a url containing the PDF links.
-          - url_fetcher: a function responsible for getting the content of the url page.
+          - url_fetcher: a function which gets a url and returns the content of its page (None for the downloader, 
+                         pages fetched by other functions are not cached).
 
           Output
-          - List containing the PDF URLs.
+          - List containing the PDF URLs (tuples of url, title and authors).
           """
-          try:
-               response = url_fetcher(self, url)
-               soup = BeautifulSoup(response, 'html.parser')
-               list_of_urls = []
-               for link in soup.find_all('a', href=True):
-                    if ".pdf" in link['href'] and link['href'].startswith("http"):
-                         pdf_url=self.__get_url_from_page(link)
-                         authors=self.__get_authors_from_page(link)
-                         title=self.__get_title_from_page(link)
-                         list_of_urls.append((pdf_url,title,authors))
-               distinct_url_list= list(set(list_of_urls))
-               logging.info("Fetched: {e} urls".format(e=len(distinct_url_list)))
-               return distinct_url_list
-          except Exception as e:
-               logging.error("Error while fetching URLs. Error: {e}".format(e=e))
-               return []
+          if url_fetcher is not None or self.result_pages is None:
+               return self.__fetch_urls(url, url_fetcher or self.downloader.get_text)
+          urls = self.result_pages.get_or_compute(url, lambda: self.__fetch_urls(url, self.downloader.get_text), \
+               should_cache=lambda urls: len(urls) > 0)
+          return list(urls)
 
-     
-     def __get_url_from_page(self, link):
-          try:
-               return link['href']
-          except Exception as e:
-               logging.error("Error while fetching URL. Error: e".format(e=e))
-               return ""
-
-     def __get_authors_from_page(self, link):
-          try:
-               return link.parent.parent.parent.parent.find_all("div", {"class":"gs_a"})[0].text.split("\xa0")[0]
-          except Exception as e:
-               logging.error("Error while fetching authors. Error: e".format(e=e))
-               return ""
+     def prefetch_urls(self, url) -> None:
+          """
+          prefetch_urls fetches the PDF urls of a page in the background (for instance, the next page of a search while
+          the current one is processed), so a later fetch_urls of the page is answered from the cache.
+          """
+          if self.prefetch_result_pages:
+               self.prefetch_executor.submit(self.fetch_urls, url)
 
-     def __get_title_from_page(self, link):
+     def __fetch_urls(self, url, url_fetcher):
           try:
-               return link.parent.parent.parent.parent.find_all("h3", {"class":"gs_rt"})[0].find_all("a")[0].text
+               response = url_fetcher(url)
+               list_of_urls = self.result_parser.parse(response)
+               logging.info("Fetched: {e} urls".format(e=len(list_of_urls)))
+               return list_of_urls
           except Exception as e:
-               logging.error("Error while fetching title. Error: e".format(e=e))
-               return ""
-
-     def __get_text(self, text,regex_flags_pairs):
-          for regex, flags in regex_flags_pairs:
-               res = re.search(regex, text, flags)
-               if res is not None and len(res.groups()) > 0:
-                    return res.group(1).replace("/\n","\n")
-          return self.DEFAULT
+               logging.error("Error while fetching URLs. Error: {e}".format(e=e))
+               return []
 
      def _get_pdf_content(self,filename, max_pages_processed):
           try:
@@ -339,11 +527,8 @@ class PDF:
                merged_output = StringIO()
 
                if self.multiprocessing:
-                    res = self.pool.starmap(get_pdf_page, index_page_pair)
-                    def getKey(item):
-                         return item[1]
-                    sorted(res, key=getKey)
-                    [merged_output.write(part[0].getvalue()) for part in res]
+                    res = self.pool.starmap(get_pdf_pages, chunk_pages(index_page_pair, pool_size(self.pool)))
+                    [merged_output.write(text) for _, text in merge_chunks(res)]
 
                else:
                     resource_manager = PDFResourceManager(caching=True)
@@ -358,34 +543,6 @@ class PDF:
                logging.error("Cannot convert PDF: {filename} into text. Error: {e}".format(filename=filename, e=e))
                return None
 
-     def __download_file(self,download_url,filename="tmp_{epoch}.pdf".format(epoch=str(int(float(datetime.now().timestamp()))))):
-          try:
-               if not str(download_url).lower().strip().startswith("http"):
-                    return (False, None)
-               response = urllib.request.urlopen(download_url)
-               file = open(filename, 'wb')
-               file.write(response.read())
-               file.close()
-               return (True, filename)
-          except HTTPError as http_error:
-               logging.error("HTTP Error downloading the file {filename} from url {url}. Error : {e}"\
-                    .format(e = http_error, filename = filename, url = download_url))
-               if http_error.code == "404":
-                    return (False,None)
-               return (True,None)
-          except Exception as e:
-               logging.error("Error downloading the file {filename} from url {url}. Error : {e}"\
-                    .format(e = e, filename = filename, url = download_url))
-               return (True, None) 
-
-     def __getstate__(self):
-        self_dict = self.__dict__.copy()
-        del self_dict['pool']
-        return self_dict
-
-     def __setstate__(self, state):
-        self.__dict__.update(state)
-
 class PDFSummary:
      """
      PDFSummary is a DTO (Data Transfer Object) containing information about the content of the PDF.
@@ -404,29 +561,263 @@ class PDFSummary:
                    self.future_work == __o.future_work and self.conclusions == __o.conclusions
          return False
 
-def get_pdf_page(index, filename):
-     logging.info("processing page {index} of file {filename}".format(index=index,filename=filename))
-     pdfFile = open(filename,'rb')
+WORKER_DOCUMENTS_CACHE_SIZE = 2
+_worker_documents = OrderedDict()
+
+def init_pdf_worker():
+     """
+     init_pdf_worker initializes a process of the PDF pool with an empty cache of open documents.
+
+     Every worker keeps the last documents it opened, so the chunks of the same document which land on the same worker
+     don't open and parse it again.
+     """
+     global _worker_documents
+     _worker_documents = OrderedDict()
+
+def _get_worker_document(kind, filename, opener):
+     if isinstance(filename, str):
+          stat = os.stat(filename)
+          key = (kind, os.path.abspath(filename), stat.st_mtime, stat.st_size)
+     else:
+          key = (kind, filename.key)
+     if key in _worker_documents:
+          _worker_documents.move_to_end(key)
+          return _worker_documents[key][0]
+     while len(_worker_documents) >= WORKER_DOCUMENTS_CACHE_SIZE:
+          # the least recently used document is closed
+          _, (_, closer) = _worker_documents.popitem(last=False)
+          closer()
+     document, closer = opener(filename)
+     _worker_documents[key] = (document, closer)
+     return document
+
+def _open_pdfminer_document(filename):
+     pdfFile = open_pdf_file(filename)
      pages = list(PDFPage.get_pages(pdfFile,pagenos=set(),maxpages=0,password='',caching=True,check_extractable=True))
+     return pages, pdfFile.close
+
+def _open_pdf2_document(filename):
+     pdfFileObj = open_pdf_file(filename)
+     return PdfFileReader(pdfFileObj), pdfFileObj.close
+
+def _open_pymupdf_document(filename):
+     if isinstance(filename, str):
+          document = fitz.open(filename)
+          return document, document.close
+     # the document is parsed in place, so the view is released only once the document is closed
+     view, release = filename.open_view()
+     try:
+          try:
+               document = fitz.open(stream=view, filetype="pdf")
+          except (TypeError, ValueError):
+               # PyMuPDF versions which don't read memoryviews
+               document = fitz.open(stream=bytes(view), filetype="pdf")
+     except Exception:
+          release()
+          raise
+     def close():
+          document.close()
+          release()
+     return document, close
+
+def open_pdf_file(source):
+     """
+     open_pdf_file opens a PDF as a binary file object, out of a local file or a PDF in memory (PDFBuffer and its shared
+     handle).
+     """
+     if isinstance(source, str):
+          return open(source,'rb')
+     return source.open_stream()
+
+def worker_source(source):
+     """
+     worker_source gets what is sent to the processes of the pool to read a PDF: the filename of a local file, or the
+     shared memory handle of a PDFBuffer (so the processes attach to the bytes instead of receiving them).
+     """
+     return source.share() if isinstance(source, PDFBuffer) else source
+
+def pool_size(pool) -> int:
+     """
+     pool_size gets the amount of processes of a pool.
+     """
+     return getattr(pool, "_processes", None) or cpu_count()
+
+def chunk_pages(index_page_pair, chunks):
+     """
+     chunk_pages groups (index, filename) pairs into at most `chunks` consecutive ranges of pages.
+
+     Output
+     - List of (indexes, filename) pairs, one per chunk.
+     """
+     if len(index_page_pair) == 0:
+          return []
+     chunk_size = ceil(len(index_page_pair) / max(1, chunks))
+     return [([index for index, _ in index_page_pair[start:start + chunk_size]], index_page_pair[start][1]) \
+          for start in range(0, len(index_page_pair), chunk_size)]
+
+def merge_chunks(chunks_results):
+     """
+     merge_chunks flattens the (index, text) results of the chunks into a single list sorted by page index.
+     """
+     return sorted([page for chunk in chunks_results for page in chunk], key=lambda page: page[0])
+
+def get_pdf_pages(indexes, filename):
+     logging.info("processing pages {indexes} of file {filename}".format(indexes=indexes,filename=filename))
+     pages = _get_worker_document("pdfminer", filename, _open_pdfminer_document)
      resource_manager = PDFResourceManager(caching=True)
-     output_text = StringIO()
      laParams = LAParams()
-     text_converter = TextConverter(resource_manager,output_text,laparams=laParams)
-     interpreter = PDFPageInterpreter(resource_manager,text_converter)
-     interpreter.process_page(pages[index])
-     pdfFile.close()
-     return output_text, index
-
-def get_pdf2_page(index, filename):
-     logging.info("processing page {index} of file {filename}".format(index=index,filename=filename))
-     pdfFileObj = open(filename,'rb')
-     pdfFile = PdfFileReader(pdfFileObj)
-     output_text = pdfFile.getPage(index).extractText()
-     pdfFileObj.close()
-     return output_text, index
-
-def get_pymupdf_page(index, filename):
-     logging.info("processing page {index} of file {filename}".format(index=index,filename=filename))
-     pages = fitz.open(filename)
-     text = pages[index].get_text("text")
-     return text
\ No newline at end of file
+     results = []
+     for index in indexes:
+          output_text = StringIO()
+          text_converter = TextConverter(resource_manager,output_text,laparams=laParams)
+          interpreter = PDFPageInterpreter(resource_manager,text_converter)
+          interpreter.process_page(pages[index])
+          results.append((index, output_text.getvalue()))
+     return results
+
+def get_pdf2_pages(indexes, filename):
+     logging.info("processing pages {indexes} of file {filename}".format(indexes=indexes,filename=filename))
+     pdfFile = _get_worker_document("pdf2", filename, _open_pdf2_document)
+     return [(index, pdfFile.getPage(index).extractText()) for index in indexes]
+
+def get_pymupdf_pages(indexes, filename, layout=False):
+     logging.info("processing pages {indexes} of file {filename}".format(indexes=indexes,filename=filename))
+     pages = _get_worker_document("pymupdf", filename, _open_pymupdf_document)
+     return [(index, get_pymupdf_page_text(pages[index], layout)) for index in indexes]
+
+# text without images (which the layout does not need, and which are expensive to extract)
+PYMUPDF_LAYOUT_FLAGS = fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE
+
+def get_pymupdf_page_text(page, layout) -> str:
+     """
+     get_pymupdf_page_text gets the text of a PyMuPDF page, ordered by its layout or in the order of the content stream.
+     """
+     if not layout:
+          return page.get_text("text")
+     return layout_page_text(page.get_text("dict", flags=PYMUPDF_LAYOUT_FLAGS))
+
+def layout_page_text(page_dict) -> str:
+     """
+     layout_page_text orders the text blocks of a page (as extracted by PyMuPDF "dict" or "rawdict") in reading order.
+
+     Blocks which span the middle of the page (such as titles) split it into bands. Within a band, when blocks of the
+     left and the right halves overlap vertically, the page is read as two columns: first the left column and then the 
+     right one. Otherwise the blocks are read from top to bottom (and left to right). Lines are ordered from top to 
+     bottom, spans from left to right, and blocks are separated by blank lines (as paragraphs).
+     """
+     blocks = [block for block in page_dict.get("blocks", []) if block.get("type", 0) == 0 and len(block.get("lines", [])) > 0]
+     middle = page_dict.get("width", 0) / 2
+     spanning, left, right = [], [], []
+     for block in blocks:
+          x0, _, x1, _ = block["bbox"]
+          if x1 <= middle:
+               left.append(block)
+          elif x0 >= middle:
+               right.append(block)
+          else:
+               spanning.append(block)
+
+     ordered = []
+     by_position = lambda block: (block["bbox"][1], block["bbox"][0])
+     left.sort(key=by_position)
+     right.sort(key=by_position)
+     band_start = float("-inf")
+     for band_end_block in sorted(spanning, key=by_position) + [None]:
+          band_end = band_end_block["bbox"][1] if band_end_block is not None else float("inf")
+          band_left = [block for block in left if band_start <= block["bbox"][1] < band_end]
+          band_right = [block for block in right if band_start <= block["bbox"][1] < band_end]
+          if _overlap_vertically(band_left, band_right):
+               ordered.extend(band_left)
+               ordered.extend(band_right)
+          else:
+               ordered.extend(sorted(band_left + band_right, key=by_position))
+          if band_end_block is not None:
+               ordered.append(band_end_block)
+               band_start = band_end
+
+     paragraphs = []
+     for block in ordered:
+          lines = []
+          for line in sorted(block["lines"], key=lambda line: (line["bbox"][1], line["bbox"][0])):
+               parts = []
+               for span in sorted(line["spans"], key=lambda span: span["bbox"][0]):
+                    text = span["text"] if "text" in span else "".join(char["c"] for char in span.get("chars", []))
+                    # ensure that spans are separated by at least 1 blank
+                    if len(parts) > 0 and not parts[-1].endswith(" ") and not text.startswith(" "):
+                         parts.append(" ")
+                    parts.append(text)
+               lines.append("".join(parts))
+          paragraphs.append("\n".join(lines))
+     return "\n\n".join(paragraphs) + "\n\n" if len(paragraphs) > 0 else ""
+
+def _overlap_vertically(left, right):
+     if len(left) == 0 or len(right) == 0:
+          return False
+     left_top, left_bottom = min(block["bbox"][1] for block in left), max(block["bbox"][3] for block in left)
+     right_top, right_bottom = min(block["bbox"][1] for block in right), max(block["bbox"][3] for block in right)
+     return left_top < right_bottom and right_top < left_bottom
+
+HEADING_OVERLAP = 64   # characters of the pages around a page which are looked for headings split between them
+
+def alternate_pages(index_page_pair):
+     """
+     alternate_pages orders pages from both ends towards the middle (first, last, second, one before last...), since
+     the abstract and keywords are usually in the first pages, and the conclusions and future work in the last ones.
+     """
+     ordered = []
+     front, back = 0, len(index_page_pair) - 1
+     while front <= back:
+          ordered.append(index_page_pair[front])
+          if front != back:
+               ordered.append(index_page_pair[back])
+          front, back = front + 1, back - 1
+     return ordered
+
+def read_pages_incrementally(engine:PDFEngine, section_extractor, filename, max_pages_processed, strategy):
+     """
+     read_pages_incrementally reads the pages picked by the strategy from both ends of the file, one page at a time,
+     and stops as soon as the section extractor finds that the rest of the pages cannot change the sections.
+
+     Output
+     - tuple of the text of the pages which were read (in the order of the pages), the amount of pages which were read
+       and the amount of pages picked by the strategy, None if the file cannot be read.
+     """
+     try:
+          reader = engine.open_pages(filename)
+     except Exception as e:
+          logging.error("Cannot convert PDF: {filename} into text. Error: {e}".format(filename=filename, e=e))
+          return None
+     try:
+          index_page_pair = strategy.pick_pages([(index, filename) for index in range(min(reader.page_count, max_pages_processed))])
+          unread = set(index for index, _ in index_page_pair)
+          texts = {}
+          read = []           # indexes of the pages which were read, in the order of the pages
+          headings = set()    # sections whose headings might be in the pages which were read
+          for index, _ in alternate_pages(index_page_pair):
+               text = reader.read_page(index)
+               texts[index] = text
+               unread.discard(index)
+               position = bisect.bisect(read, index)
+               read.insert(position, index)
+               # only the new page is looked for headings (along with the ends of the pages around it, where a heading
+               # may be split), and the whole text is only checked once the headings of all the sections were seen
+               before = texts[read[position - 1]][-HEADING_OVERLAP:] if position > 0 else ""
+               after = texts[read[position + 1]][:HEADING_OVERLAP] if position + 1 < len(read) else ""
+               headings.update(section_extractor.find_heading_sections(before + text + after))
+               if len(headings) < len(SECTIONS):
+                    continue
+               content = "".join(texts[page] for page in read)
+               # the pages which were not read yet belong after all the front pages which were read
+               gap = None
+               if len(unread) > 0:
+                    first_unread = min(unread)
+                    gap = sum(len(texts[page]) for page in read if page < first_unread)
+               if section_extractor.is_complete(content, gap):
+                    break
+          content = "".join(texts[page] for page in read)
+          return content, len(texts), len(index_page_pair)
+     except Exception as e:
+          logging.error("Cannot convert PDF: {filename} into text. Error: {e}".format(filename=filename, e=e))
+          return None
+     finally:
+          reader.close()
@@ -0,0 +1,179 @@
+import io
+import logging
+import os
+import uuid
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError: # python 3.7
+    shared_memory = None
+
+def start_shared_memory_tracker():
+    """
+    start_shared_memory_tracker starts the resource tracker of this process before a process pool is started, so the
+    processes of the pool share it: segments they attach to are then tracked once, and released by their owner only
+    (otherwise every process tracks them on its own, and reports them as leaked when it exits).
+    """
+    if shared_memory is not None and os.name == "posix":
+        resource_tracker.ensure_running()
+
+class PDFBuffer:
+    """
+    PDFBuffer is a PDF file kept in memory (for instance, a download), which the PDF engines read instead of a local file.
+
+    The engines of the current process parse the bytes in place. For the processes of the pool, the bytes are copied once
+    into a shared memory segment, and the processes attach to the segment by its name and parse it in place (they stay
+    attached as long as they keep the document open), so the file is never written to the disk and the bytes are not
+    sent with every chunk of pages. When shared memory is not available (python 3.7), the bytes are sent to the
+    processes instead.
+
+    Input
+    - data:  the content of the PDF file.
+    - label: describes the file in the logs (for instance, its url).
+    """
+    def __init__(self, data:bytes, label="memory") -> None:
+        self.data = data
+        self.label = label
+        self.key = uuid.uuid4().hex
+        self.segment = None
+
+    def open_view(self):
+        """
+        open_view gets a memoryview over the bytes and the function which releases it.
+        """
+        view = memoryview(self.data)
+        return view, view.release
+
+    def open_stream(self):
+        """
+        open_stream gets a binary file object over the bytes (without copying them).
+        """
+        return MemoryViewReader(*self.open_view())
+
+    def share(self):
+        """
+        share gets the handle of the buffer which is sent to the processes of the pool. The shared memory segment is
+        created on the first call, and it is kept until the buffer is closed.
+        """
+        if shared_memory is None:
+            return self
+        if self.segment is None:
+            self.segment = shared_memory.SharedMemory(create=True, size=max(1, len(self.data)))
+            self.segment.buf[:len(self.data)] = self.data
+        return SharedPDFBuffer(self.segment.name, len(self.data), self.label)
+
+    def close(self):
+        """
+        close releases the shared memory segment of the buffer, errors are logged and ignored.
+        """
+        if self.segment is None:
+            return
+        try:
+            self.segment.close()
+            self.segment.unlink()
+        except Exception as e:
+            logging.error(f"The shared memory of {self.label} cannot be released. Error: {e}")
+        self.segment = None
+
+    def __len__(self):
+        return len(self.data)
+
+    def __str__(self):
+        return self.label
+
+    def __getstate__(self):
+        self_dict = self.__dict__.copy()
+        self_dict['segment'] = None
+        return self_dict
+
+class SharedPDFBuffer:
+    """
+    SharedPDFBuffer is the handle of a PDFBuffer in shared memory, as sent to the processes of the pool.
+    """
+    def __init__(self, name, size, label) -> None:
+        self.name = name
+        self.size = size
+        self.label = label
+        self.key = name
+
+    def open_view(self):
+        """
+        open_view attaches to the shared memory segment, and gets a memoryview over its bytes and the function which
+        releases the view and detaches from the segment. The owner of the buffer may unlink the segment meanwhile, its
+        memory is only freed once every process detached from it.
+        """
+        segment = shared_memory.SharedMemory(name=self.name)
+        view = segment.buf[:self.size]
+        def release():
+            view.release()
+            segment.close()
+        return view, release
+
+    def open_stream(self):
+        """
+        open_stream gets a binary file object over the shared memory segment (without copying it), which stays attached
+        until the file object is closed.
+        """
+        return MemoryViewReader(*self.open_view())
+
+    def __len__(self):
+        return self.size
+
+    def __str__(self):
+        return self.label
+
+class MemoryViewReader(io.RawIOBase):
+    """
+    MemoryViewReader is a read only binary file object over a memoryview (only the bytes which are read are copied).
+
+    Input
+    - view:    the bytes to read.
+    - release: called once the file object is closed (for instance, to detach from shared memory).
+    """
+    def __init__(self, view, release=None) -> None:
+        super().__init__()
+        self.view = view
+        self.release = release
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size=-1) -> bytes:
+        end = len(self.view) if size is None or size < 0 else min(len(self.view), self.position + size)
+        data = bytes(self.view[self.position:end]) if end > self.position else b""
+        self.position = max(self.position, end)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = len(self.view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position: {position}")
+        self.position = position
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self) -> None:
+        if not self.closed and self.release is not None:
+            self.release()
+        super().close()
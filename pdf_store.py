@@ -0,0 +1,267 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import List
+
+class PDFStore:
+    """
+    PDFStore is a local content-addressed store of downloaded PDF files and their extracted text.
+
+    Every PDF is saved under the hash of its content, and urls point to those hashes (different urls serving the same
+    file share one copy). The text extracted by each PDF engine is saved next to the PDF, so summarization (for instance,
+    after changing the regular expressions) can be replayed without touching the network or the PDF engines.
+
+    The store is bounded in size, and when the limit is exceeded the least recently used PDFs (with their texts) are
+    evicted. PDFs which are pinned (while they are being read) are never evicted. The state is kept in an index file
+    inside the store location.
+
+    Configuration
+    - location:  directory of the store.
+    - max_bytes: maximum size of the store (PDFs and texts).
+    """
+    INDEX_FILE = "index.json"
+    INDEX_VERSION = 1
+    BLOBS_DIRECTORY = "blobs"
+    TEXTS_DIRECTORY = "texts"
+    PDF_EXTENTION = ".pdf"
+    TEXT_EXTENTION = ".txt"
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, location, max_bytes=1024 * 1024 * 1024) -> None:
+        self.location = location
+        self.max_bytes = max_bytes
+        self.blobs_location = os.path.join(location, self.BLOBS_DIRECTORY)
+        self.texts_location = os.path.join(location, self.TEXTS_DIRECTORY)
+        os.makedirs(self.blobs_location, exist_ok=True)
+        os.makedirs(self.texts_location, exist_ok=True)
+        self.lock = threading.RLock()
+        self.urls = {}      # url -> digest
+        self.entries = {}   # digest -> {'size', 'last_access', 'texts': {key -> size}}
+        self.pins = {}      # digest -> amount of readers, not evicted while pinned
+        self.__load_index()
+
+    def get_file(self, url, pin=False):
+        """
+        get_file gets the stored PDF of a url.
+
+        Input
+        - url: the url the PDF was downloaded from.
+        - pin: whether to pin the PDF until it is released (so it is not evicted while it is read).
+
+        Output
+        - path to the stored PDF, None if the url is not in the store.
+        """
+        with self.lock:
+            digest = self.urls.get(url)
+            if digest is None or not os.path.exists(self.__blob_path(digest)):
+                return None
+            self.__touch(digest)
+            if pin:
+                self.pins[digest] = self.pins.get(digest, 0) + 1
+            return self.__blob_path(digest)
+
+    def put_file(self, url, filename, pin=False):
+        """
+        put_file moves a downloaded PDF into the store.
+
+        Input
+        - url:      the url the PDF was downloaded from.
+        - filename: the downloaded PDF, it is moved (or deleted in case the content is already stored).
+        - pin:      whether to pin the PDF until it is released (so it is not evicted while it is read).
+
+        Output
+        - path to the stored PDF.
+        """
+        digest = self.hash_file(filename)
+        with self.lock:
+            blob_path = self.__blob_path(digest)
+            if digest in self.entries and os.path.exists(blob_path):
+                os.remove(filename)
+            else:
+                shutil.move(filename, blob_path)
+                self.entries[digest] = {'size': os.path.getsize(blob_path), 'last_access': time.time(), 'texts': {}}
+            self.urls[url] = digest
+            self.__touch(digest)
+            if pin:
+                self.pins[digest] = self.pins.get(digest, 0) + 1
+            self.__evict(keep=digest)
+            self.__save_index()
+            return blob_path
+
+    def release(self, filename) -> None:
+        """
+        release unpins a stored PDF which was pinned by get_file or put_file, once it is not read anymore.
+        """
+        digest = self.digest_of(filename)
+        if digest is None:
+            return
+        with self.lock:
+            if self.pins.get(digest, 0) <= 1:
+                self.pins.pop(digest, None)
+                # the store may have exceeded its size while the PDF was pinned
+                if self.__evict():
+                    self.__save_index()
+            else:
+                self.pins[digest] -= 1
+
+    def owns(self, filename) -> bool:
+        """
+        owns checks whether a file is a PDF managed by the store (such files must not be deleted by the caller).
+        """
+        return self.digest_of(filename) is not None
+
+    def digest_of(self, filename):
+        """
+        digest_of gets the content hash of a PDF managed by the store, None if the file is not managed by the store.
+        """
+        if filename is None:
+            return None
+        directory, name = os.path.split(os.path.abspath(filename))
+        if directory != os.path.abspath(self.blobs_location) or not name.endswith(self.PDF_EXTENTION):
+            return None
+        digest = name[:-len(self.PDF_EXTENTION)]
+        with self.lock:
+            return digest if digest in self.entries else None
+
+    def get_text(self, digest, key):
+        """
+        get_text gets the text extracted from a stored PDF.
+
+        Input
+        - digest: content hash of the PDF.
+        - key:    identifies how the text was extracted (engine, pages strategy...).
+
+        Output
+        - the text, None if it is not in the store.
+        """
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None or key not in entry['texts']:
+                return None
+            self.__touch(digest)
+        try:
+            with open(self.__text_path(digest, key), 'r', encoding='utf-8') as file:
+                return file.read()
+        except Exception as e:
+            logging.error(f"Cannot read the stored text of {digest} ({key}). Error: {e}")
+            return None
+
+    def put_text(self, digest, key, text) -> bool:
+        """
+        put_text saves the text extracted from a stored PDF.
+
+        Input
+        - digest: content hash of the PDF.
+        - key:    identifies how the text was extracted (engine, pages strategy...).
+        - text:   the extracted text.
+
+        Output
+        - whether the text was stored.
+        """
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                return False
+            path = self.__text_path(digest, key)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(text)
+            entry['texts'][key] = os.path.getsize(path)
+            self.__touch(digest)
+            self.__evict(keep=digest)
+            self.__save_index()
+            return True
+
+    def stored_urls(self) -> List[str]:
+        """
+        stored_urls gets all the urls in the store, for example to replay their summarization offline.
+        """
+        with self.lock:
+            return list(self.urls.keys())
+
+    def size(self) -> int:
+        """
+        size gets the total size (in bytes) of the PDFs and texts in the store.
+        """
+        with self.lock:
+            return sum(self.__entry_size(entry) for entry in self.entries.values())
+
+    def hash_file(self, filename) -> str:
+        """
+        hash_file computes the content hash of a file.
+        """
+        sha = hashlib.sha256()
+        with open(filename, 'rb') as file:
+            for chunk in iter(lambda: file.read(self.HASH_CHUNK_SIZE), b""):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def __touch(self, digest):
+        self.entries[digest]['last_access'] = time.time()
+
+    def __entry_size(self, entry):
+        return entry['size'] + sum(entry['texts'].values())
+
+    def __evict(self, keep=None) -> bool:
+        total = sum(self.__entry_size(entry) for entry in self.entries.values())
+        if total <= self.max_bytes:
+            return False
+        evicted = False
+        for digest, entry in sorted(self.entries.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if digest == keep or digest in self.pins:
+                continue
+            total -= self.__entry_size(entry)
+            self.__remove_entry(digest)
+            evicted = True
+            logging.info(f"Evicted {digest} from the PDF store")
+        return evicted
+
+    def __remove_entry(self, digest):
+        entry = self.entries.pop(digest)
+        paths = [self.__blob_path(digest)] + [self.__text_path(digest, key) for key in entry['texts']]
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logging.error(f"Cannot delete {path} from the PDF store. Error: {e}")
+        self.urls = {url: url_digest for url, url_digest in self.urls.items() if url_digest != digest}
+
+    def __blob_path(self, digest):
+        return os.path.join(self.blobs_location, digest + self.PDF_EXTENTION)
+
+    def __text_path(self, digest, key):
+        return os.path.join(self.texts_location, digest + "." + re.sub(r'[^A-Za-z0-9_\-]', '_', key) + self.TEXT_EXTENTION)
+
+    def __index_path(self):
+        return os.path.join(self.location, self.INDEX_FILE)
+
+    def __load_index(self):
+        try:
+            if not os.path.exists(self.__index_path()):
+                return
+            with open(self.__index_path(), 'r', encoding='utf-8') as file:
+                index = json.load(file)
+            if index.get('version') != self.INDEX_VERSION:
+                logging.warn(f"PDF store index version {index.get('version')} is not supported, starting empty")
+                return
+            self.urls = index['urls']
+            self.entries = index['entries']
+        except Exception as e:
+            logging.error(f"Cannot load the PDF store index, starting empty. Error: {e}")
+            self.urls = {}
+            self.entries = {}
+
+    def __save_index(self):
+        # write to a temporary file and swap, so a crash never leaves a half written index
+        temporary_path = self.__index_path() + ".tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump({'version': self.INDEX_VERSION, 'urls': self.urls, 'entries': self.entries}, file)
+        os.replace(temporary_path, self.__index_path())
@@ -1,6 +1,12 @@
 import datetime
 import importlib
+import inspect
 import logging
+import math
+import threading
+import time
+from cache import TTLCache
+from permission_store import CounterStore, DatabaseCounterStore
 
 class PermissionResponse:
     """
@@ -31,10 +37,15 @@ class PermissionFactory:
         PermissionFactory creates a new Permission instance based on reflection.
         The name of the permission class is getting injected within the constructor.
     """
-    def create(self, permission_type, ttl_in_seconds, attempts_in_window) -> Permission:
+    def create(self, permission_type, ttl_in_seconds, attempts_in_window, **options) -> Permission:
+        """
+        Options (such as database_uri) are passed only to the permission classes which accept them.
+        """
         try:
             permission_class = getattr(importlib.import_module("permission"), permission_type)
-            return permission_class(ttl_in_seconds, attempts_in_window)
+            parameters = inspect.signature(permission_class).parameters
+            options = {name: value for name, value in options.items() if name in parameters}
+            return permission_class(ttl_in_seconds, attempts_in_window, **options)
         except Exception as e:
             logging.error(f"Unable to create permission class, using default. Error: {e}")
             return NoRestrictionsPermission()
@@ -46,11 +57,14 @@ class NoRestrictionsPermission:
     def __init__(self, ttl_in_seconds=1,attempts_in_window=1) -> None:
         pass
     def can_search(self, id:str) -> PermissionResponse:
-        return PermissionResponse(can_perform=True, ttl=-1, ttl_left=-1, user=id, max_attemps=-1, current_attempts=-1)
+        return PermissionResponse(can_perform=True, ttl=-1, ttl_left=-1, user=id, max_attemps=-1, current_attempts=-1, \
+            operation_name="search")
     def can_ask(self, id:str) -> PermissionResponse:
-        return PermissionResponse(can_perform=True, ttl=-1, ttl_left=-1, user=id, max_attemps=-1, current_attempts=-1)
+        return PermissionResponse(can_perform=True, ttl=-1, ttl_left=-1, user=id, max_attemps=-1, current_attempts=-1, \
+            operation_name="ask")
     def can_train(self, id:str) -> PermissionResponse:
-        return PermissionResponse(can_perform=True, ttl=-1, ttl_left=-1, user=id, max_attemps=-1, current_attempts=-1)
+        return PermissionResponse(can_perform=True, ttl=-1, ttl_left=-1, user=id, max_attemps=-1, current_attempts=-1, \
+            operation_name="train")
 
 class InMemoryPermission:
     """
@@ -129,6 +143,214 @@ class InMemoryPermission:
         
         self.clients[id] = updated_timestamsp
 
+class SlidingWindowPermission:
+    """
+        SlidingWindowPermission is a restrictive implementation of the permission interface, saved in memory, which 
+        scales with the amount of clients.
+
+        Every client holds a sliding window counter (the attempts of the current and of the previous window), so its
+        state and every check are O(1) whatever the amount of attempts. Clients are split between shards, each with its 
+        own lock, so concurrent requests of different clients rarely wait for each other, and a background sweeper 
+        forgets the clients which were idle for two windows (their counters are empty anyway), so memory is bounded 
+        by the active clients.
+
+        As InMemoryPermission, searching consumes an attempt while asking and training only check the attempts left.
+
+        Configuration
+        - ttl_in_seconds:               length of the window.
+        - attempts_in_window:           attempts allowed in a window.
+        - shards:                       amount of shards of the clients.
+        - sweep_interval_in_seconds:    seconds between sweeps of idle clients (None for the length of the window, 0 to
+                                        never sweep in the background).
+    """
+    def __init__(self, ttl_in_seconds=300, attempts_in_window=1, shards=16, sweep_interval_in_seconds=None) -> None:
+        self.ttl_in_seconds = ttl_in_seconds
+        self.attempts_in_window = attempts_in_window
+        self.shards = [_ClientShard() for _ in range(shards)]
+        self.sweep_interval_in_seconds = ttl_in_seconds if sweep_interval_in_seconds is None else sweep_interval_in_seconds
+        self.stopped = threading.Event()
+        if self.sweep_interval_in_seconds > 0:
+            sweeper = threading.Thread(target=self.__sweep_periodically, name="permission-sweeper", daemon=True)
+            sweeper.start()
+
+    def can_search(self, id:str) -> PermissionResponse:
+        return self.__check(id, "search", consume=True)
+
+    def can_ask(self, id:str) -> PermissionResponse:
+        return self.__check(id, "ask", consume=False)
+
+    def can_train(self, id:str) -> PermissionResponse:
+        return self.__check(id, "train", consume=False)
+
+    def sweep(self) -> int:
+        """
+        sweep forgets the clients which were idle for at least two windows.
+
+        Output
+        - amount of forgotten clients.
+        """
+        now = time.monotonic()
+        forgotten = 0
+        for shard in self.shards:
+            with shard.lock:
+                idle = [id for id, window in shard.clients.items() if now - window[0] >= 2 * self.ttl_in_seconds]
+                for id in idle:
+                    del shard.clients[id]
+                forgotten += len(idle)
+        return forgotten
+
+    def clients_count(self) -> int:
+        return sum(len(shard.clients) for shard in self.shards)
+
+    def stop(self) -> None:
+        """
+        stop stops the background sweeper.
+        """
+        self.stopped.set()
+
+    def __check(self, id, operation_name, consume):
+        now = time.monotonic()
+        shard = self.shards[hash(id) % len(self.shards)]
+        with shard.lock:
+            window = shard.clients.get(id)
+            if window is None:
+                window = [now, 0, 0]    # [start of the current window, current attempts, previous attempts]
+            self.__slide(window, now)
+            attempts = self.__estimate(window, now)
+            can_perform = attempts < self.attempts_in_window
+            if can_perform and consume:
+                window[1] += 1
+                attempts = self.__estimate(window, now)
+            if window[1] > 0 or window[2] > 0:
+                shard.clients[id] = window
+            ttl_left = _seconds_until_allowed(self.ttl_in_seconds, self.attempts_in_window, now - window[0], \
+                window[1], window[2])
+        return PermissionResponse(can_perform=can_perform, ttl=self.ttl_in_seconds, ttl_left=ttl_left, user=id, \
+            max_attemps=self.attempts_in_window, current_attempts=math.ceil(attempts), operation_name=operation_name)
+
+    def __slide(self, window, now):
+        elapsed_windows = int((now - window[0]) // self.ttl_in_seconds)
+        if elapsed_windows == 1:
+            window[2] = window[1]
+        elif elapsed_windows > 1:
+            window[2] = 0
+        if elapsed_windows >= 1:
+            window[0] += elapsed_windows * self.ttl_in_seconds
+            window[1] = 0
+
+    def __estimate(self, window, now):
+        # the previous window weighs by how much of it still overlaps the sliding window
+        overlap = 1 - (now - window[0]) / self.ttl_in_seconds
+        return window[2] * overlap + window[1]
+
+    def __sweep_periodically(self):
+        while not self.stopped.wait(self.sweep_interval_in_seconds):
+            try:
+                forgotten = self.sweep()
+                logging.debug(f"Permission sweeper forgot {forgotten} idle clients")
+            except Exception as e:
+                logging.error(f"Failed sweeping idle clients. Error: {e}")
+
+class _ClientShard:
+    """
+        _ClientShard holds part of the clients of SlidingWindowPermission, with its own lock.
+    """
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.clients = {} # id -> [window start, current attempts, previous attempts]
+
+class DatabasePermission:
+    """
+        DatabasePermission is a restrictive implementation of the permission interface, which keeps its counters in a 
+        shared store (the database by default), so all the processes serving the application (for instance, the workers 
+        of gunicorn) share the attempts of every client.
+
+        Attempts are counted in sliding windows (the attempts of the previous window weigh by how much it still overlaps),
+        and searching adds an attempt with a single atomic operation of the store. Asking and training only read the 
+        counters, which are cached for a short while, and expired counters are purged in a batch once in a while (and
+        not on every call).
+
+        Configuration
+        - ttl_in_seconds:               length of the window.
+        - attempts_in_window:           attempts allowed in a window.
+        - database_uri:                 database of the counters (when no store is given).
+        - store:                        CounterStore of the counters (None for the database).
+        - read_cache_in_seconds:        seconds the counters read by asking and training are cached (0 to always read).
+        - purge_interval_in_seconds:    seconds between purges of expired counters (None for the length of the window).
+    """
+    def __init__(self, ttl_in_seconds=300, attempts_in_window=1, database_uri='sqlite:///db.sqlite3', store:CounterStore=None, \
+        read_cache_in_seconds=1, purge_interval_in_seconds=None) -> None:
+        self.ttl_in_seconds = ttl_in_seconds
+        self.attempts_in_window = attempts_in_window
+        self.store = store if store is not None else DatabaseCounterStore(database_uri)
+        self.read_cache = TTLCache(max_entries=10000, ttl_in_seconds=read_cache_in_seconds) if read_cache_in_seconds > 0 else None
+        self.purge_interval_in_seconds = ttl_in_seconds if purge_interval_in_seconds is None else purge_interval_in_seconds
+        self.last_purge = time.time()
+        self.purge_lock = threading.Lock()
+
+    def can_search(self, id:str) -> PermissionResponse:
+        return self.__check(id, "search", consume=True)
+
+    def can_ask(self, id:str) -> PermissionResponse:
+        return self.__check(id, "ask", consume=False)
+
+    def can_train(self, id:str) -> PermissionResponse:
+        return self.__check(id, "train", consume=False)
+
+    def __check(self, id, operation_name, consume):
+        now = time.time()
+        window = int(now // self.ttl_in_seconds)
+        elapsed = now - window * self.ttl_in_seconds
+        try:
+            self.__purge_if_needed(now, window)
+            counters = self.__get_counters(id, window, cached=not consume)
+            current, previous = counters.get(window, 0), counters.get(window - 1, 0)
+            offset = previous * (1 - elapsed / self.ttl_in_seconds)
+            if consume:
+                can_perform = self.store.increment_if_below(id, window, offset, self.attempts_in_window)
+                if can_perform:
+                    current += 1
+                    if self.read_cache is not None:
+                        self.read_cache.put((id, window), {window: current, window - 1: previous})
+            else:
+                can_perform = offset + current < self.attempts_in_window
+        except Exception as e:
+            logging.error(f"Failed checking the permission of {id} to {operation_name}, allowing it. Error: {e}")
+            return PermissionResponse(can_perform=True, ttl=self.ttl_in_seconds, ttl_left=0, user=id, \
+                max_attemps=self.attempts_in_window, current_attempts=-1, operation_name=operation_name)
+        ttl_left = _seconds_until_allowed(self.ttl_in_seconds, self.attempts_in_window, elapsed, current, previous)
+        return PermissionResponse(can_perform=can_perform, ttl=self.ttl_in_seconds, ttl_left=ttl_left, user=id, \
+            max_attemps=self.attempts_in_window, current_attempts=math.ceil(offset + current), operation_name=operation_name)
+
+    def __get_counters(self, id, window, cached):
+        if not cached or self.read_cache is None:
+            return self.store.get(id, [window - 1, window])
+        return self.read_cache.get_or_compute((id, window), lambda: self.store.get(id, [window - 1, window]))
+
+    def __purge_if_needed(self, now, window):
+        if now - self.last_purge < self.purge_interval_in_seconds or not self.purge_lock.acquire(blocking=False):
+            return
+        try:
+            self.last_purge = now
+            purged = self.store.purge(window - 1)
+            logging.debug(f"Purged {purged} expired permission counters")
+        finally:
+            self.purge_lock.release()
+
+def _seconds_until_allowed(ttl_in_seconds, attempts_in_window, elapsed, current, previous):
+    """
+        _seconds_until_allowed calculates the seconds until a sliding window counter allows another attempt (0 when it
+        already does), given the seconds elapsed in the current window and the attempts of the current and previous windows.
+    """
+    if current >= attempts_in_window:
+        # the current window becomes the previous one, and has to overlap little enough
+        wait = (ttl_in_seconds - elapsed) + ttl_in_seconds * (1 - attempts_in_window / current)
+    elif previous * (1 - elapsed / ttl_in_seconds) + current >= attempts_in_window:
+        wait = ttl_in_seconds * (1 - (attempts_in_window - current) / previous) - elapsed
+    else:
+        wait = 0
+    return max(0, math.ceil(wait))
+
 class PermissionErrorException(Exception):
     """
         PermissionErrorException is an Exception extension specifically for permission exception.
@@ -0,0 +1,111 @@
+import threading
+from sqlalchemy import Column, Integer, MetaData, Table, Text, text
+from db import create_database_engine
+
+class CounterStore:
+    """
+    CounterStore is an interface of the storage of the permission counters: amount of attempts of a client in a window
+    (windows are identified by their index since the epoch).
+    """
+    def get(self, client:str, windows) -> dict:
+        """
+        get gets the attempts of a client in the given windows.
+
+        Output
+        - dictionary of window -> attempts (windows without attempts are missing).
+        """
+        raise Exception("Unimplemented method")
+    def increment_if_below(self, client:str, window:int, offset:float, limit:int) -> bool:
+        """
+        increment_if_below atomically adds an attempt to a window of a client, only if the attempts of the window plus
+        the offset are below the limit.
+
+        Output
+        - whether the attempt was added.
+        """
+        raise Exception("Unimplemented method")
+    def purge(self, before_window:int) -> int:
+        """
+        purge removes the counters of all the windows before the given one.
+
+        Output
+        - amount of removed counters.
+        """
+        raise Exception("Unimplemented method")
+
+class InMemoryCounterStore(CounterStore):
+    """
+    InMemoryCounterStore keeps the counters in the memory of the process (counters are not shared between processes).
+    """
+    def __init__(self) -> None:
+        self.counters = {}  # (client, window) -> attempts
+        self.lock = threading.Lock()
+
+    def get(self, client:str, windows) -> dict:
+        with self.lock:
+            return {window: self.counters[(client, window)] for window in windows if (client, window) in self.counters}
+
+    def increment_if_below(self, client:str, window:int, offset:float, limit:int) -> bool:
+        with self.lock:
+            attempts = self.counters.get((client, window), 0)
+            if attempts + offset >= limit:
+                return False
+            self.counters[(client, window)] = attempts + 1
+            return True
+
+    def purge(self, before_window:int) -> int:
+        with self.lock:
+            expired = [key for key in self.counters if key[1] < before_window]
+            for key in expired:
+                del self.counters[key]
+            return len(expired)
+
+class DatabaseCounterStore(CounterStore):
+    """
+    DatabaseCounterStore keeps the counters in a table of the database, so they are shared by all the processes (for
+    instance, the workers of gunicorn) using the same database.
+
+    Attempts are added with a single conditional upsert (INSERT ... ON CONFLICT DO UPDATE ... WHERE), which the database
+    applies atomically, so concurrent processes never add attempts beyond the limit. Supported by SQLite (3.24 and above)
+    and PostgreSQL.
+
+    Configuration
+    - database_uri:         connection string to the database.
+    - pool_size:            amount of connections kept open in the pool.
+    - max_overflow:         amount of connections allowed on top of pool_size under load.
+    - sqlite_busy_timeout:  milliseconds to wait on a locked database (SQLite only).
+    """
+    TABLE = "permission_counters"
+
+    def __init__(self, database_uri='sqlite:///db.sqlite3', pool_size=5, max_overflow=10, sqlite_busy_timeout=5000) -> None:
+        self.engine = create_database_engine(database_uri, pool_size=pool_size, max_overflow=max_overflow, \
+            sqlite_busy_timeout=sqlite_busy_timeout)
+        metadata = MetaData()
+        self.table = Table(self.TABLE, metadata,
+                    Column('client', Text(), primary_key=True),
+                    Column('window_start', Integer(), primary_key=True, autoincrement=False),
+                    Column('attempts', Integer(), nullable=False, default=0))
+        metadata.create_all(self.engine)
+
+    def get(self, client:str, windows) -> dict:
+        windows = list(windows)
+        query = self.table.select().where(self.table.c.client == client).where(self.table.c.window_start.in_(windows))
+        with self.engine.connect() as connection:
+            return {row['window_start']: row['attempts'] for row in connection.execute(query)}
+
+    def increment_if_below(self, client:str, window:int, offset:float, limit:int) -> bool:
+        query = text(f"INSERT INTO {self.TABLE} (client, window_start, attempts) "
+            "SELECT :client, :window, 1 WHERE :offset < :limit "
+            f"ON CONFLICT (client, window_start) DO UPDATE SET attempts = {self.TABLE}.attempts + 1 "
+            f"WHERE {self.TABLE}.attempts + :offset < :limit")
+        with self.engine.begin() as connection:
+            result = connection.execute(query, client=client, window=window, offset=offset, limit=limit)
+            return result.rowcount > 0
+
+    def purge(self, before_window:int) -> int:
+        with self.engine.begin() as connection:
+            result = connection.execute(self.table.delete().where(self.table.c.window_start < before_window))
+            return result.rowcount
+
+    def dispose(self) -> None:
+        self.engine.dispose()
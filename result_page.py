@@ -0,0 +1,73 @@
+import logging
+from typing import List, Tuple
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+
+class ResultPageParser:
+    """
+    ResultPageParser is an interface of the parsers of search result pages (for instance, Google Scholar).
+    """
+    def parse(self, html:str) -> List[Tuple[str, str, str]]:
+        """
+        parse extracts the PDF links of a result page.
+
+        Output
+        - list of distinct (pdf url, title, authors) tuples, in the order of the page.
+        """
+        raise Exception("Unimplemented method")
+
+class SoupResultPageParser(ResultPageParser):
+    """
+    SoupResultPageParser parses Google Scholar result pages with BeautifulSoup.
+
+    Only the result blocks of the page are parsed (the rest of the page is skipped while parsing), and every block is
+    visited once: its title and authors are read a single time and shared by all the PDF links of the block.
+
+    Configuration
+    - features: BeautifulSoup parser backend (None for lxml when it is installed, html.parser otherwise).
+    """
+    RESULT_CLASS = "gs_r"
+    TITLE_CLASS = "gs_rt"
+    AUTHORS_CLASS = "gs_a"
+
+    def __init__(self, features=None) -> None:
+        if features is None:
+            features = "lxml" if builder_registry.lookup("lxml") is not None else "html.parser"
+        self.features = features
+        # the classes are matched by a function, since strainers get them either as a string or as a list
+        self.strainer = SoupStrainer("div", class_=self.__is_result_class)
+
+    def parse(self, html:str) -> List[Tuple[str, str, str]]:
+        soup = BeautifulSoup(html, self.features, parse_only=self.strainer)
+        urls = []
+        for block in soup.find_all("div", class_=self.RESULT_CLASS, recursive=False):
+            title = self.__get_title(block)
+            authors = self.__get_authors(block)
+            for link in block.find_all("a", href=True):
+                if ".pdf" in link['href'] and link['href'].startswith("http"):
+                    urls.append((link['href'], title, authors))
+        return list(dict.fromkeys(urls))
+
+    @classmethod
+    def __is_result_class(cls, value):
+        if value is None:
+            return False
+        classes = value.split() if isinstance(value, str) else value
+        return cls.RESULT_CLASS in classes
+
+    def __get_title(self, block):
+        try:
+            heading = block.find("h3", class_=self.TITLE_CLASS)
+            link = heading.find("a") if heading is not None else None
+            return link.text if link is not None else ""
+        except Exception as e:
+            logging.error(f"Error while fetching title. Error: {e}")
+            return ""
+
+    def __get_authors(self, block):
+        try:
+            authors = block.find("div", class_=self.AUTHORS_CLASS)
+            return authors.text.split("\xa0")[0] if authors is not None else ""
+        except Exception as e:
+            logging.error(f"Error while fetching authors. Error: {e}")
+            return ""
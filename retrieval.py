@@ -0,0 +1,93 @@
+import heapq
+import math
+from typing import List, Tuple
+
+class TrigramIndex:
+    """
+    TrigramIndex is an inverted index of texts by their character trigrams, used to retrieve the texts most similar to a
+    query without comparing the query against every text.
+
+    Texts are scored by the cosine similarity of their trigram sets weighted by idf (trigrams shared by many texts weigh
+    less), and only the texts sharing a trigram with the query are ever touched. Trigrams which appear in most texts do
+    not select candidates when the query has rarer ones, since they would only add the whole index to the candidates.
+
+    Configuration
+    - texts:        the texts to index (duplicates are indexed once).
+    - max_df_ratio: trigrams found in a bigger ratio of the texts are skipped (when the query has others).
+    """
+    def __init__(self, texts, max_df_ratio=0.5) -> None:
+        self.texts = list(dict.fromkeys(text for text in texts if text is not None))
+        self.positions = {text: document for document, text in enumerate(self.texts)}
+        self.max_df_ratio = max_df_ratio
+        self.document_trigrams = [self.trigrams(text) for text in self.texts]
+        postings = {}
+        for document, trigrams in enumerate(self.document_trigrams):
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(document)
+        count = max(1, len(self.texts))
+        self.idf = {trigram: math.log(1 + count / len(documents)) for trigram, documents in postings.items()}
+        self.postings = postings
+        self.norms = [math.sqrt(sum(self.idf[trigram] ** 2 for trigram in trigrams)) or 1.0 for trigrams in self.document_trigrams]
+
+    def add(self, text) -> bool:
+        """
+        add indexes one more text, returns False if it is already indexed.
+
+        The weights of the trigrams which are already indexed are kept as they are (they are only computed again when
+        the index is built again), so adding a text only touches its own trigrams.
+        """
+        if text is None or text in self.positions:
+            return False
+        document = len(self.texts)
+        trigrams = self.trigrams(text)
+        self.texts.append(text)
+        self.positions[text] = document
+        self.document_trigrams.append(trigrams)
+        for trigram in trigrams:
+            documents = self.postings.setdefault(trigram, [])
+            documents.append(document)
+            if trigram not in self.idf:
+                self.idf[trigram] = math.log(1 + len(self.texts) / len(documents))
+        self.norms.append(math.sqrt(sum(self.idf[trigram] ** 2 for trigram in trigrams)) or 1.0)
+        return True
+
+    @staticmethod
+    def trigrams(text) -> set:
+        """
+        trigrams gets the character trigrams of a text (lower cased, with its words padded by spaces).
+        """
+        normalized = " " + " ".join(str(text).lower().split()) + " "
+        return {normalized[i:i + 3] for i in range(len(normalized) - 2)}
+
+    def search(self, query, k=10) -> List[Tuple[str, float]]:
+        """
+        search retrieves the texts most similar to the query.
+
+        Input
+        - query: the text to search for.
+        - k:     maximum amount of texts to retrieve.
+
+        Output
+        - list of (text, score) pairs sorted by decreasing score (between 0 and 1).
+        """
+        query_trigrams = self.trigrams(query)
+        trigrams = [trigram for trigram in query_trigrams if trigram in self.postings]
+        if len(trigrams) == 0:
+            return []
+        max_documents = self.max_df_ratio * len(self.texts)
+        rare = [trigram for trigram in trigrams if len(self.postings[trigram]) <= max_documents]
+        selected = rare if len(rare) > 0 else trigrams
+
+        # the candidates are found by the selected trigrams, and then scored by all of them
+        candidates = set()
+        for trigram in selected:
+            candidates.update(self.postings[trigram])
+        # trigrams which are not in the index weigh as the rarest ones
+        unseen_idf = math.log(1 + max(1, len(self.texts)))
+        query_norm = math.sqrt(sum(self.idf.get(trigram, unseen_idf) ** 2 for trigram in query_trigrams))
+        scores = ((document, sum(self.idf[trigram] ** 2 for trigram in query_trigrams & self.document_trigrams[document]) \
+            / (self.norms[document] * query_norm)) for document in candidates)
+        return [(self.texts[document], score) for document, score in heapq.nlargest(k, scores, key=lambda item: item[1])]
+
+    def __len__(self) -> int:
+        return len(self.texts)
@@ -0,0 +1,233 @@
+import re
+
+SUMMARY = "summary"
+KEYWORDS = "keywords"
+CONCLUSIONS = "conclusions"
+FUTURE_WORK = "future_work"
+SECTIONS = [SUMMARY, KEYWORDS, CONCLUSIONS, FUTURE_WORK]
+NOT_APPLICABLE = "N/A"
+
+class SectionSpan:
+    """
+    SectionSpan is a DTO (Data Transfer Object) locating a section inside a text.
+
+    closed states whether the end of the section was found, or the section runs until the end of the text (and so,
+    more text might still belong to it). heading states whether the section starts at a heading line, or at a mention 
+    inside a sentence (which a heading found in more text would replace).
+    """
+    def __init__(self, start, end, closed, heading=True) -> None:
+        self.start = start
+        self.end = end
+        self.closed = closed
+        self.heading = heading
+
+class SectionExtractor:
+    """
+    SectionExtractor extracts the sections of an article (abstract, keywords, conclusions and future work) from its text.
+
+    The headings of all the sections are found with a single precompiled pattern in one linear pass over the text,
+    preferring headings which stand at the beginning of a line (i.e. "5. Conclusions") over mentions inside sentences.
+    Every section is then sliced from the end of its heading until its own terminator (a paragraph break, a following
+    heading line or the heading of another section).
+    """
+    # a plain alternation of literals lets the regular expression engine skip quickly to the candidate positions,
+    # so it is matched against the lower cased text and the section is told by the first letter of the match
+    HEADINGS = r'abstract|key ?words?|index terms?|conclusions?|future[ \n]+(?:works?|directions?|scope|research|studies)'
+    HEADINGS_LOWER = re.compile(HEADINGS)
+    HEADINGS_IGNORECASE = re.compile(HEADINGS, re.IGNORECASE)
+    HEADING_SECTIONS = {'a': SUMMARY, 'k': KEYWORDS, 'i': KEYWORDS, 'c': CONCLUSIONS, 'f': FUTURE_WORK}
+    CAPITALIZED_SECTIONS = [SUMMARY, KEYWORDS]   # i.e. "Abstract" is a heading while "abstract" is a word
+    LINE_PREFIX = re.compile(r'[ \t\f\d.IVX\-–]*')  # pages of pdfminer start with a form feed
+    HEADING_SEPARATOR = re.compile(r'[ \t:.\-—–]*')
+    BLANK_LINES = re.compile(r'[ \t]*\n(?:[ \t]*\n)*')
+    PARAGRAPH_END = re.compile(r'\n[ \t]*\n')
+    HEADING_LINE_END = re.compile(r'\n[ \t]*\n[ \t]*\n?[ \t]*(?:[\dIVX]+\.?[ \t]*)?\w+[ \t]*\n')
+    MAX_SECTION_LENGTH = 5000
+
+    def extract(self, text) -> dict:
+        """
+        extract extracts the sections out of the text.
+
+        Input
+        - text: the text of the article.
+
+        Output
+        - dictionary of section name (summary, keywords, conclusions, future_work) to its text (N/A when not found).
+        """
+        spans = self.extract_spans(text)
+        sections = {}
+        for section in SECTIONS:
+            span = spans.get(section)
+            content = "" if span is None else text[span.start:span.end].replace("/\n","\n").strip()
+            sections[section] = content if content != "" else NOT_APPLICABLE
+        return sections
+
+    def extract_spans(self, text) -> dict:
+        """
+        extract_spans locates the sections inside the text.
+
+        Input
+        - text: the text of the article.
+
+        Output
+        - dictionary of section name to SectionSpan, sections which were not found are missing.
+        """
+        headings, heading_lines = self.__find_headings(text)
+        starts = sorted(match.start() for match in headings.values())
+        spans = {}
+        for section, match in headings.items():
+            start = self.__body_start(text, match)
+            next_heading = min([heading for heading in starts if heading > start] + [len(text)])
+            limit = min(next_heading, start + self.MAX_SECTION_LENGTH)
+            if section == CONCLUSIONS:
+                # conclusions usually span several paragraphs, until the heading of the next section
+                terminator = self.HEADING_LINE_END.search(text, start, limit)
+                if terminator is not None:
+                    spans[section] = SectionSpan(start, terminator.start(), True, section in heading_lines)
+                    continue
+                if next_heading < len(text) and next_heading == limit:
+                    spans[section] = SectionSpan(start, text.rfind("\n", start, limit) + 1 or limit, True, \
+                        section in heading_lines)
+                    continue
+            terminator = self.PARAGRAPH_END.search(text, start, limit)
+            if terminator is not None:
+                spans[section] = SectionSpan(start, terminator.start(), True, section in heading_lines)
+            else:
+                spans[section] = SectionSpan(start, limit, limit < len(text), section in heading_lines)
+        return spans
+
+    def is_complete(self, text, gap=None) -> bool:
+        """
+        is_complete checks whether more text could not change the sections extracted out of the text, so reading the 
+        rest of an article can be skipped: all the sections start at heading lines, and end before the end of the text 
+        and before the gap (if any).
+
+        Input
+        - text: the text read so far.
+        - gap:  position in the text where the text which was not read yet belongs (None if it belongs at the end).
+        """
+        spans = self.extract_spans(text)
+        for section in SECTIONS:
+            span = spans.get(section)
+            if span is None or not span.closed or not span.heading:
+                return False
+            if gap is not None and span.start < gap <= span.end:
+                return False
+        return True
+
+    def find_heading_sections(self, text) -> set:
+        """
+        find_heading_sections finds the sections whose headings might be in a part of the text (a quick check, so reading
+        an article one page at a time only checks whether it is complete once the headings of all the sections were seen).
+
+        Output
+        - set of section names, which includes every section whose heading is in the text.
+        """
+        return set(self.HEADING_SECTIONS[match.group()[0].lower()] for match in self.HEADINGS_IGNORECASE.finditer(text))
+
+    def __find_headings(self, text):
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            matches = self.HEADINGS_LOWER.finditer(lowered)
+        else:   # some characters change their length when lower cased, so the positions would not match
+            matches = self.HEADINGS_IGNORECASE.finditer(text)
+
+        first_mention = {}
+        first_heading = {}
+        for match in matches:
+            start, end = match.span()
+            section = self.HEADING_SECTIONS[text[start].lower()]
+            if section in first_heading or not self.__is_word(text, start, end):
+                continue
+            if section in self.CAPITALIZED_SECTIONS and not text[start].isupper():
+                continue
+            if section not in first_mention:
+                first_mention[section] = match
+            if self.__is_line_start(text, start):
+                first_heading[section] = match
+                if len(first_heading) == len(SECTIONS):
+                    break
+        first_mention.update(first_heading)
+        return first_mention, set(first_heading)
+
+    def __is_word(self, text, start, end):
+        return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+    def __is_line_start(self, text, position):
+        line_start = text.rfind("\n", max(0, position - 16), position) + 1
+        if line_start == 0 and position > 16:
+            return False
+        return self.LINE_PREFIX.fullmatch(text, line_start, position) is not None
+
+    def __body_start(self, text, match):
+        position = self.HEADING_SEPARATOR.match(text, match.end()).end()
+        blank = self.BLANK_LINES.match(text, position)
+        return blank.end() if blank is not None else position
+
+class RegexSectionExtractor:
+    """
+    RegexSectionExtractor extracts the sections of an article with lists of regular expressions, where each list is tried
+    in order from the beginning of the text until one of them matches.
+    """
+    ABSTRACT_REGEX = [
+        (r'[A][Bb][Ss][Tt][Rr][Aa][Cc][Tt][ \n]{1,}(.+?)(?=\n\n|Keywords)', re.DOTALL),
+        (r'[A][Bb][Ss][Tt][Rr][Aa][Cc][Tt](.+?)(?=\n ?\n ?Key ?W?w?ords?)', re.DOTALL),
+        (r'[A][Bb][Ss][Tt][Rr][Aa][Cc][Tt][ \n]?(.+?)(?=\n\n)', re.DOTALL)
+        ]
+
+    KEYWORDS_REGEX = [
+        (r'[K][Ee][Yy][ ]?[ ]?[Ww][Oo][Rr][Dd][Ss]? ?:? +(.+?)(?=\n +\n)', re.DOTALL),
+        (r'[K][Ee][Yy][ ]?[ ]?[Ww][Oo][Rr][Dd][Ss]?[:]?.*?\n{0,}(.+?)(?=\n\n)', re.DOTALL),
+        (r'[I][Nn][Dd][Ee][Xx][ ][Tt][Ee][Rr][Mm][Ss]?(.*?)(?=\n\n)', re.DOTALL)
+        ]
+
+    CONCLUSION_REGEX = [
+        (r'[C][Oo][Nn][Cc][Ll][Uu][Ss][Ii][Oo][Nn][Ss]?.*?\n{1,2}?(.+?)(?=\n ?\n ?\n?(\w+) {0,}\n)', re.DOTALL),
+        (r'[Cc][Oo][Nn][Cc][Ll][Uu][Ss][Ii][Oo][Nn][Ss]?.*?\n{1,}(.+?)(?=\n ?\n ?\n?|\w+ {0,}\n)', re.DOTALL),
+        (r'[Cc][Oo][Nn][Cc][Ll][Uu][Ss][Ii][Oo][Nn][Ss]?.*?[ \n]{4,}(.+?)(?=\n ?\n ?\n?(\w+) {0,}\n)', re.DOTALL),
+        (r'[Cc][Oo][Nn][Cc][Ll][Uu][Ss][Ii][Oo][Nn][Ss]?.*?\n{1,}(.+?)(?=\n ?\n ?\n?)', re.DOTALL)
+        ]
+
+    FUTURE_WORK_REGEX = [
+        (r'[Ff][Uu][Tt][Uu][Rr][Ee][ ][Ww][Oo][Rr][Kk][ \n]{1,}(.+?)(?=\n\n)', re.DOTALL),
+        (r'[F][Uu][Tt][Uu][Rr][Ee][ ][Dd][Ii][Rr][Ee][Cc][Tt][Ii][Oo][Nn][Ss].+?\n{2,}(.+?)(?=\n\n(\w+)\n)', re.DOTALL),
+        (r'[F][Uu][Tt][Uu][Rr][Ee][ ][Ss][Cc][Oo][Pp][Ee](.+?)\n{2,}(.?)(?=\n\n(\w+ )\n|CONCLUSION)', re.DOTALL),
+        (r'[Ff][Uu][Tt][Uu][Rr][Ee]\n?\n?[Rr][Ee][Ss][Ee][Aa][Rr][Cc][Hh](.*?){1,}(.+?)(?=\n\n\w+\n)', re.DOTALL),
+        (r'[Ff][Uu][Tt][Uu][Rr][Ee][ ][Ss][Tt][Uu][Dd][Ii][Ee][Ss].*?\n{1,2}?(.+?)(?=\n ?\n ?\n?(\w+) {0,}\n)', re.DOTALL)
+        ]
+
+    def extract(self, text) -> dict:
+        """
+        extract extracts the sections out of the text.
+
+        Input
+        - text: the text of the article.
+
+        Output
+        - dictionary of section name (summary, keywords, conclusions, future_work) to its text (N/A when not found).
+        """
+        return {
+            SUMMARY: self.__get_text(text, self.ABSTRACT_REGEX),
+            KEYWORDS: self.__get_text(text, self.KEYWORDS_REGEX),
+            CONCLUSIONS: self.__get_text(text, self.CONCLUSION_REGEX),
+            FUTURE_WORK: self.__get_text(text, self.FUTURE_WORK_REGEX)
+        }
+
+    def is_complete(self, text, gap=None) -> bool:
+        """
+        is_complete is always False, since a match of the regular expressions might change with more text.
+        """
+        return False
+
+    def find_heading_sections(self, text) -> set:
+        """
+        find_heading_sections finds no section, since the text is never complete.
+        """
+        return set()
+
+    def __get_text(self, text,regex_flags_pairs):
+        for regex, flags in regex_flags_pairs:
+            res = re.search(regex, text, flags)
+            if res is not None and len(res.groups()) > 0:
+                return res.group(1).replace("/\n","\n")
+        return NOT_APPLICABLE
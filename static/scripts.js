@@ -131,41 +131,92 @@
         $(".execute-search").html("Searching...")
         $(".execute-search").css("background","#777")
         
-        $.ajax({
-            type: "POST",
-            url: "/search",
-            data: {"keywords":keywords},
-            success: function (response) {
-                $(".no-results").css("display","none")
-                $(".people").css("display","flex")
-                $(".search").css("display","flex")
-                $(".domain-selection-popup").css("visibility","hidden")
-                $(".execute-search").html("Search")
-                $(".execute-search").css("background","#5887ab")
-                $('#customeDomain').val('')
-                $(".domains-list").empty()
-                id = "sr_" + Object.keys(search_results).length
-                addSearchResult(id, "Search result " + Object.keys(search_results).length, [], response.articles)
-                setMainPageActive(true)
-                captured_domains = []
-                $(".execute-search").prop('disabled', false)
-                $('.clearbtn').click()
-                $(".popup-title-domains").html(keywords.join(", "))
-                $("#"+id).click()
-            },
-            error: function (error) {
-                captured_domains = []
-                $(".domains-list").empty()
-                $('#customeDomain').val('')
-                $(".execute-search").html("Search")
-                $(".execute-search").css("background","#5887ab")
-                $(".execute-search").prop('disabled', false)
-                $('.clearbtn').click()
-                setMainPageActive(true)
+        var id = null
+        var articles = []
+        streamSearch(keywords, function (article) {
+            articles.push(article)
+            if (id == null) {
+                // show the search result as soon as its first article arrives
+                id = showSearchResult(keywords, articles)
             }
-        });
+            search_results[id].articles = articles
+            if ($("#popup").css("visibility") == "visible" && $("#"+id).hasClass("focus")) {
+                updatePopupWindow(id, search_results[id].title, search_results[id].domains, articles)
+            }
+        }, function (had_error) {
+            if (id == null && had_error) {
+                searchFailed()
+            } else if (id == null) {
+                id = showSearchResult(keywords, articles)
+            }
+            $(".execute-search").html("Search")
+            $(".execute-search").css("background","#5887ab")
+            $(".execute-search").prop('disabled', false)
+        })
      })
 
+     function streamSearch(keywords, onArticle, onDone) {
+        var body = new URLSearchParams()
+        keywords.forEach(k => body.append("keywords[]", k))
+        fetch("/search/stream", {method: "POST", body: body}).then(function (response) {
+            var reader = response.body.getReader()
+            var decoder = new TextDecoder()
+            var buffer = ""
+            var done = false
+            function read() {
+                return reader.read().then(function (chunk) {
+                    buffer += decoder.decode(chunk.value || new Uint8Array(), {stream: !chunk.done})
+                    var lines = buffer.split("\n")
+                    buffer = chunk.done ? "" : lines.pop()
+                    lines.forEach(function (line) {
+                        if (line.trim() == "") return
+                        var message = JSON.parse(line)
+                        if (message.article != undefined) {
+                            onArticle(message.article)
+                        } else if (message.done) {
+                            done = true
+                            onDone(message.had_error)
+                        }
+                    })
+                    if (chunk.done) {
+                        if (!done) onDone(true)
+                        return
+                    }
+                    return read()
+                })
+            }
+            return read()
+        }).catch(function (error) {
+            onDone(true)
+        })
+     }
+
+     function showSearchResult(keywords, articles) {
+        $(".no-results").css("display","none")
+        $(".people").css("display","flex")
+        $(".search").css("display","flex")
+        $(".domain-selection-popup").css("visibility","hidden")
+        $('#customeDomain').val('')
+        $(".domains-list").empty()
+        var id = "sr_" + Object.keys(search_results).length
+        addSearchResult(id, "Search result " + Object.keys(search_results).length, [], articles)
+        setMainPageActive(true)
+        captured_domains = []
+        $('.clearbtn').click()
+        $(".popup-title-domains").html(keywords.join(", "))
+        $("#"+id).click()
+        return id
+     }
+
+     function searchFailed() {
+        captured_domains = []
+        $(".domains-list").empty()
+        $('#customeDomain').val('')
+        $('.clearbtn').click()
+        $(".domain-selection-popup").css("visibility","hidden")
+        setMainPageActive(true)
+     }
+
      $(".domain-close").on('click', function(){
         $(".domain-selection-popup").css("visibility","hidden")
         setMainPageActive(true)
@@ -0,0 +1,84 @@
+"""
+Benchmark of the PyMuPDF text extraction: the "text" mode (content stream order, as read by get_pymupdf_pages so far)
+against the layout ordering of layout_page_text over get_text("dict"), and against the former ordering of the single
+process path (get_text("json") parsed back with json.loads and sorted by zero padded string keys).
+
+The article is a synthetic two column PDF, where the right column is written to the content stream before the left
+one (as some typesetters do), so only the layout ordering reads the columns in order. Run from the root of the project:
+
+    python -m tests.bench_pymupdf_layout
+"""
+from pdf import PYMUPDF_LAYOUT_FLAGS, layout_page_text
+from sections import SectionExtractor, SECTIONS
+import fitz
+import json
+import os
+import tempfile
+import time
+
+PAGES = 20
+LINES_PER_COLUMN = 45
+REPEAT = 3
+
+def create_article():
+    document = fitz.open()
+    for index in range(PAGES):
+        page = document.new_page()
+        if index == 0:
+            page.insert_text((72, 50), "Title of a two column article about layouts")
+            left = ["Abstract", "We order the blocks of two column pages.", ""] + \
+                ["Keywords: layout, columns", ""] + ["Left column text of the first page."] * (LINES_PER_COLUMN - 5)
+        elif index == PAGES - 1:
+            left = ["5. Conclusions", "Columns are read in order.", "", "6. Future work", "Tables and figures.", ""] + \
+                ["Left column text of the last page."] * (LINES_PER_COLUMN - 6)
+        else:
+            left = ["Left column text of page {index}.".format(index=index)] * LINES_PER_COLUMN
+        right = ["Right column text of page {index}.".format(index=index)] * LINES_PER_COLUMN
+        page.insert_text((320, 80), "\n".join(right), fontsize=9)
+        page.insert_text((50, 80), "\n".join(left), fontsize=9)
+    handle, filename = tempfile.mkstemp(suffix=".pdf")
+    os.close(handle)
+    document.save(filename)
+    document.close()
+    return filename
+
+def text_mode(page):
+    return page.get_text("text")
+
+def layout_mode(page):
+    return layout_page_text(page.get_text("dict", flags=PYMUPDF_LAYOUT_FLAGS))
+
+def legacy_json_mode(page):
+    key = lambda value: str(int(value + 0.99999)).rjust(4, "0")
+    page_dict = json.loads(page.get_text("json"))
+    output = ""
+    for block in sorted(page_dict["blocks"], key=lambda block: key(block["bbox"][1]) + key(block["bbox"][0])):
+        for line in sorted(block.get("lines", []), key=lambda line: key(line["bbox"][1])):
+            for span in sorted(line["spans"], key=lambda span: key(span["bbox"][0])):
+                output += span["text"] if output.endswith(" ") or span["text"].startswith(" ") else " " + span["text"]
+            output += "\n"
+    return output
+
+def measure(document, mode):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        text = "".join(mode(page) for page in document)
+    return (time.perf_counter() - start) / REPEAT / len(document), text
+
+def main():
+    filename = create_article()
+    document = fitz.open(filename)
+    try:
+        for name, mode in [("text", text_mode), ("legacy json", legacy_json_mode), ("layout dict", layout_mode)]:
+            page_time, text = measure(document, mode)
+            first_page = text[:text.find("page 1.")]
+            in_order = first_page.find("Left column text of the first page.") < first_page.find("Right column text of page 0.")
+            sections = SectionExtractor().extract(text)
+            found = sum(1 for section in SECTIONS if sections[section] != "N/A")
+            print(f"{name:12} {page_time * 1000:8.2f}ms per page  columns in order: {str(in_order):5}  sections {found}/4")
+    finally:
+        document.close()
+        os.remove(filename)
+
+if __name__ == "__main__":
+    main()
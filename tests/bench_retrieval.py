@@ -0,0 +1,56 @@
+"""
+Benchmark of the candidate retrieval of BestMatchWithConfidence: comparing the message against every statement (as the
+search of the chatbot does, with the same SequenceMatcher ratio as its LevenshteinDistance) against comparing it only
+with the top candidates of the TrigramIndex.
+
+The statements are synthetic domain names, in the size of the generated academic fields corpus. Run from the root of
+the project:
+
+    python -m tests.bench_retrieval
+"""
+from difflib import SequenceMatcher
+from retrieval import TrigramIndex
+import random
+import time
+
+STATEMENTS = 20000
+QUERIES = 100
+TOP_K = 20
+
+def synthetic_statements():
+    random.seed(7)
+    syllables = ["bio", "geo", "chem", "phys", "logy", "ics", "comp", "uter", "sci", "ence", "math", "stat", "neuro", \
+        "socio", "eco", "nomy", "astro", "quant", "lin", "guis", "tics", "hist", "ory", "art"]
+    words = ["".join(random.sample(syllables, random.randint(2, 3))) for _ in range(2000)]
+    return [" ".join(random.sample(words, random.randint(1, 3))) for _ in range(STATEMENTS)]
+
+def closest_by_scan(statements, query):
+    return max(statements, key=lambda statement: SequenceMatcher(None, query, statement).ratio())
+
+def closest_by_index(index, query):
+    candidates = [text for text, _ in index.search(query, TOP_K)]
+    return max(candidates, key=lambda statement: SequenceMatcher(None, query, statement).ratio())
+
+def main():
+    statements = synthetic_statements()
+    queries = [statement[:-1] for statement in random.sample(statements, QUERIES)]
+
+    start = time.perf_counter()
+    index = TrigramIndex(statements)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scanned = [closest_by_scan(statements, query) for query in queries]
+    scan_time = (time.perf_counter() - start) / QUERIES
+
+    start = time.perf_counter()
+    indexed = [closest_by_index(index, query) for query in queries]
+    index_time = (time.perf_counter() - start) / QUERIES
+
+    agreement = sum(1 for a, b in zip(scanned, indexed) if SequenceMatcher(None, a, b).ratio() == 1.0) / QUERIES
+    print(f"{len(index)} statements, index built in {build_time * 1000:.0f}ms")
+    print(f"scan  {scan_time * 1000:8.2f}ms per message")
+    print(f"index {index_time * 1000:8.2f}ms per message (top {TOP_K}), same closest match for {agreement:.0%} of the messages")
+
+if __name__ == "__main__":
+    main()
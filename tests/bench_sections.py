@@ -0,0 +1,71 @@
+"""
+Benchmark of the section extractors (single pass SectionExtractor against the RegexSectionExtractor lists).
+
+The texts are taken from the fixture corpus in tests/resources (fixture.json), and when it is not available, from
+synthetic articles. Run from the root of the project:
+
+    python -m tests.bench_sections
+"""
+from sections import SectionExtractor, RegexSectionExtractor, SECTIONS
+import json
+import os
+import time
+
+FIXTURES = "./tests/resources/fixture.json"
+REPEAT = 5
+
+def load_fixture_texts():
+    from pdf import PDFMinerEngine, PDFReadStrategyAll
+    with open(FIXTURES, encoding="utf-8") as fixtures:
+        data = json.load(fixtures)
+    texts = []
+    for fixture in data["fixtures"]:
+        if os.path.exists(fixture["filename"] + ".txt"):
+            with open(fixture["filename"] + ".txt", encoding="utf-8") as text_file:
+                texts.append((fixture["filename"], text_file.read()))
+        elif os.path.exists(fixture["filename"]):
+            text = PDFMinerEngine().get_pdf_content(fixture["filename"], 100, None, False, PDFReadStrategyAll())
+            if text is not None:
+                texts.append((fixture["filename"], text))
+    return texts
+
+def synthetic_texts():
+    paragraph = "This sentence talks about the results of the experiments in detail.\n" * 6 + \
+        "The conclusion of this experiment is left for future work.\n" * 2 + "\n"
+    body = "".join("{index}. Section {index}\n\n".format(index=index) + paragraph * 6 for index in range(2, 12))
+    article = "Title of the article\n\nAbstract\n" + paragraph + "Keywords: first, second\n\n" + body + \
+        "12. Conclusions\n" + paragraph * 2 + "13. Future work\n" + paragraph + "References\n" + "[1] a reference\n" * 200
+    # articles where some of the sections are missing make the regular expressions scan the whole text
+    without_sections = "Title\n\n" + body * 3
+    # text extracted without blank lines, where the lookaheads of the regular expressions never match and every 
+    # mention of a section backtracks until the end of the text (kept short, since it grows quadratically)
+    without_paragraphs = ("Title\nAbstract\n" + paragraph + "Keywords: first, second\n" + paragraph * 4 + \
+        "Conclusions\n" + paragraph).replace("\n\n", "\n")
+    return [("synthetic", article), ("synthetic without sections", without_sections),
+        ("synthetic without paragraphs", without_paragraphs)]
+
+def measure(extractor, text):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        sections = extractor.extract(text)
+    return (time.perf_counter() - start) / REPEAT, sections
+
+def main():
+    texts = load_fixture_texts() if os.path.exists(FIXTURES) else []
+    if len(texts) == 0:
+        print(f"No fixtures found in {FIXTURES}, using synthetic articles")
+        texts = synthetic_texts()
+
+    totals = {"segment": 0.0, "regex": 0.0}
+    for name, text in texts:
+        segment_time, segment_sections = measure(SectionExtractor(), text)
+        regex_time, regex_sections = measure(RegexSectionExtractor(), text)
+        totals["segment"] += segment_time
+        totals["regex"] += regex_time
+        found = lambda sections: sum(1 for section in SECTIONS if sections[section] != "N/A")
+        print(f"{name[:60]:60} {len(text):>8} chars  segment {segment_time * 1000:8.2f}ms ({found(segment_sections)}/4)"
+            f"  regex {regex_time * 1000:8.2f}ms ({found(regex_sections)}/4)")
+    print(f"{'total':60} {'':>14}  segment {totals['segment'] * 1000:8.2f}ms        regex {totals['regex'] * 1000:8.2f}ms")
+
+if __name__ == "__main__":
+    main()
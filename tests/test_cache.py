@@ -0,0 +1,106 @@
+from article import ArticleSummary
+from cache import TTLCache
+from engines.engine import CachedQueryEngine, ResearchQueryEngine, SearchResults
+import threading
+import time
+import unittest
+
+class CountingEngine(ResearchQueryEngine):
+    def __init__(self, results, delay=0):
+        self.results = results
+        self.delay = delay
+        self.calls = 0
+
+    def search(self, keywords, search_params):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.results
+
+class TestTTLCache(unittest.TestCase):
+    def test_expired_and_least_recently_used_entries_are_dropped(self):
+        # Arrange
+        cache = TTLCache(max_entries=2, ttl_in_seconds=0.1)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+
+        # Act
+        cache.put("c", 3)
+        evicted = cache.get("b")
+        kept = cache.get("a")
+        time.sleep(0.15)
+        expired = cache.get("a")
+
+        # Assert
+        self.assertEqual(evicted, (False, None))
+        self.assertEqual(kept, (True, 1))
+        self.assertEqual(expired, (False, None))
+
+    def test_concurrent_computations_are_coalesced(self):
+        # Arrange
+        cache = TTLCache()
+        calls = []
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "value"
+        results = []
+
+        # Act
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 5)
+        self.assertEqual(cache.stats()['coalesced'], 4)
+
+    def test_values_computed_during_invalidation_are_not_cached(self):
+        # Arrange
+        cache = TTLCache()
+        cache.put("old", 1)
+        def compute():
+            cache.invalidate()
+            return "stale"
+
+        # Act
+        value = cache.get_or_compute("key", compute)
+
+        # Assert
+        self.assertEqual(value, "stale")
+        self.assertEqual(cache.get("key"), (False, None))
+        self.assertEqual(cache.get("old"), (False, None))
+
+class TestCachedQueryEngine(unittest.TestCase):
+    def test_reordered_keywords_share_results(self):
+        # Arrange
+        engine = CountingEngine([ArticleSummary(origin="test", url="a")])
+        cached = CachedQueryEngine(engine, TTLCache())
+
+        # Act
+        first = cached.search(["Machine Learning", "vision"], SearchResults(max_search_results=10))
+        second = cached.search(["vision", " machine  learning", "vision"], SearchResults(max_search_results=10))
+        other = cached.search(["vision", "machine learning"], SearchResults(max_search_results=5))
+
+        # Assert
+        self.assertEqual(engine.calls, 2)
+        self.assertEqual([article.url for article in second], [article.url for article in first])
+        self.assertEqual(len(other), 1)
+
+    def test_empty_results_are_not_cached(self):
+        # Arrange
+        engine = CountingEngine([])
+        cached = CachedQueryEngine(engine, TTLCache())
+
+        # Act
+        cached.search(["keyword"], SearchResults())
+        cached.search(["keyword"], SearchResults())
+
+        # Assert
+        self.assertEqual(engine.calls, 2)
+
+if __name__ == '__main__':
+    unittest.main()
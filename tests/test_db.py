@@ -0,0 +1,194 @@
+from article import ArticleSummary
+from db import DB, WriteBehindPersistance
+import tempfile
+import os
+import unittest
+
+class TestDB(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DB("sqlite:///" + os.path.join(self.directory.name, "test.sqlite3"), pool_size=2, max_overflow=1)
+
+    def tearDown(self):
+        self.db.dispose()
+        self.directory.cleanup()
+
+    def test_insert_and_get_article(self):
+        # Arrange
+        article = ArticleSummary(origin="googlescholar", url="http://link.to.pdf", search_keywords="machine learning",
+            title="title", summary="summary")
+
+        # Act
+        inserted = self.db.insert_article(article)
+        duplicate = self.db.insert_article(article)
+        article_db = self.db.get_article_by_url("http://link.to.pdf")
+
+        # Assert
+        self.assertTrue(inserted)
+        self.assertFalse(duplicate)
+        self.assertEqual(article_db.title, "title")
+        self.assertEqual(article_db.summary, "summary")
+
+    def test_connections_are_returned_to_the_pool(self):
+        # Act
+        for _ in range(10):
+            self.db.get_article_by_url("http://link.to.pdf")
+            self.db.get_fields()
+        status = self.db.get_pool_status()
+
+        # Assert
+        self.assertEqual(status['checked_out'], 0)
+        self.assertEqual(status['size'], 2)
+
+    def test_insert_articles_skips_existing_urls(self):
+        # Arrange
+        self.db.insert_article(ArticleSummary(origin="googlescholar", url="http://first.pdf", title="first"))
+        articles = [ArticleSummary(origin="googlescholar", url=url, title=title) for url, title in \
+            [("http://first.pdf", "changed"), ("http://second.pdf", "second"), ("http://second.pdf", "duplicate")]]
+
+        # Act
+        inserted = self.db.insert_articles(articles)
+
+        # Assert
+        self.assertEqual(inserted, 1)
+        self.assertEqual(self.db.get_article_by_url("http://first.pdf").title, "first")
+        self.assertEqual(self.db.get_article_by_url("http://second.pdf").title, "second")
+        self.assertEqual(len(self.db.search_articles(["second"])), 1)
+        self.assertEqual(len(self.db.search_articles(["changed"])), 0)
+
+    def test_write_behind_buffers_articles_until_flushed(self):
+        # Arrange
+        buffered = WriteBehindPersistance(self.db, max_batch=100, flush_interval_in_seconds=60)
+        article = ArticleSummary(origin="googlescholar", url="http://link.to.pdf", title="title")
+
+        # Act
+        inserted = buffered.insert_article(article)
+        duplicate = buffered.insert_article(article)
+        pending = buffered.get_stats()['pending']
+        before_flush = self.db.get_article_by_url("http://link.to.pdf")
+        from_buffer = buffered.get_article_by_url("http://link.to.pdf")
+        buffered.close()
+
+        # Assert
+        self.assertTrue(inserted)
+        self.assertFalse(duplicate)
+        self.assertEqual(pending, 1)
+        self.assertIsNone(before_flush)
+        self.assertEqual(from_buffer.title, "title")
+        self.assertEqual(self.db.get_article_by_url("http://link.to.pdf").title, "title")
+        self.assertEqual(buffered.get_stats(), {'pending': 0, 'batches': 1, 'inserted': 1, 'retried': 0, 'failed': 0})
+
+    def test_write_behind_retries_failed_batches(self):
+        # Arrange
+        failures = {'batches': 2}
+        insert_articles = self.db.insert_articles
+        def flaky_insert_articles(articles):
+            if failures['batches'] > 0:
+                failures['batches'] -= 1
+                raise Exception("database is locked")
+            if any(article.url == "http://bad.pdf" for article in articles):
+                raise Exception("bad article")
+            return insert_articles(articles)
+        self.db.insert_articles = flaky_insert_articles
+        buffered = WriteBehindPersistance(self.db, max_batch=100, flush_interval_in_seconds=60, max_retries=2)
+        buffered.insert_articles([ArticleSummary(origin="googlescholar", url=url, title="title") \
+            for url in ["http://first.pdf", "http://bad.pdf", "http://second.pdf"]])
+
+        # Act
+        first_attempt = buffered.flush()
+        from_buffer = buffered.get_article_by_url("http://first.pdf")
+        second_attempt = buffered.flush()
+        third_attempt = buffered.flush()
+        buffered.close()
+
+        # Assert
+        self.assertEqual((first_attempt, second_attempt), (0, 0))
+        self.assertEqual(from_buffer.title, "title")
+        self.assertEqual(third_attempt, 2)  # written one by one, without the bad article
+        self.assertEqual(buffered.get_stats(), {'pending': 0, 'batches': 1, 'inserted': 2, 'retried': 2, 'failed': 1})
+        self.assertEqual(self.db.get_article_by_url("http://second.pdf").title, "title")
+        self.assertIsNone(self.db.get_article_by_url("http://bad.pdf"))
+
+    def test_search_articles_ranks_by_relevance(self):
+        # Arrange
+        self.db.insert_article(ArticleSummary(origin="googlescholar", url="http://first.pdf", search_keywords="football",
+            title="Recovery time of injured players", summary="we predict recovery of football players"))
+        self.db.insert_article(ArticleSummary(origin="googlescholar", url="http://second.pdf", search_keywords="football",
+            title="Predicting football results using machine learning", summary="machine learning for football"))
+        self.db.insert_article(ArticleSummary(origin="googlescholar", url="http://third.pdf", search_keywords="databases",
+            title="Relational databases", summary="storage engines"))
+
+        # Act
+        articles = self.db.search_articles(["football", "machine learning"])
+        all_football = self.db.search_articles(["football"])
+
+        # Assert
+        self.assertTrue(self.db.full_text_search)
+        self.assertEqual([article.url for article in articles], ["http://second.pdf"])
+        self.assertEqual(len(all_football), 2)
+        self.assertEqual(all_football[0].url, "http://second.pdf")
+
+    def test_search_articles_indexes_existing_articles(self):
+        # Arrange
+        self.db.insert_article(ArticleSummary(origin="googlescholar", url="http://first.pdf", title="Quantum \"computing\""))
+        with self.db.engine.begin() as connection:
+            connection.execute("DROP TABLE articles_fts")
+            connection.execute("DROP TRIGGER IF EXISTS articles_fts_insert")
+        self.db.dispose()
+
+        # Act
+        reopened = DB(self.db.database_uri)
+        articles = reopened.search_articles(['quantum "computing"'])
+        reopened.dispose()
+
+        # Assert
+        self.assertEqual([article.url for article in articles], ["http://first.pdf"])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        # Arrange
+        self.db.insert_article(ArticleSummary(origin="googlescholar", url="http://first.pdf", title="Quantum computing"))
+        self.db.insert_article(ArticleSummary(origin="googlescholar", url="http://second.pdf", title="Quantum sensing"))
+        with self.db.engine.begin() as connection:
+            # an index of a former version, with its own copy of the text
+            connection.execute("DROP TABLE articles_fts")
+            connection.execute("CREATE VIRTUAL TABLE articles_fts USING fts5(url UNINDEXED, title, keywords, "
+                "search_keywords, summary, conclusions)")
+        self.db.dispose()
+        reopened = DB(self.db.database_uri)
+
+        # Act
+        with reopened.engine.begin() as connection:
+            connection.execute("UPDATE articles SET title = 'Classical computing' WHERE url = 'http://first.pdf'")
+            connection.execute("DELETE FROM articles WHERE url = 'http://second.pdf'")
+        quantum = reopened.search_articles(["quantum"])
+        classical = reopened.search_articles(["classical"])
+        with reopened.engine.connect() as connection:
+            # raises when the index is out of sync with the articles
+            connection.execute("INSERT INTO articles_fts(articles_fts, rank) VALUES ('integrity-check', 1)")
+        reopened.dispose()
+
+        # Assert
+        self.assertEqual(quantum, [])
+        self.assertEqual([article.url for article in classical], ["http://first.pdf"])
+
+    def test_search_index_is_rebuilt_when_out_of_sync(self):
+        # Arrange
+        self.db.insert_article(ArticleSummary(origin="googlescholar", url="http://first.pdf", title="Quantum computing"))
+        with self.db.engine.begin() as connection:
+            # the entry of the article is lost (as when a vacuum renumbers the rowids of the articles)
+            connection.execute("INSERT INTO articles_fts(articles_fts, rowid, title, keywords, search_keywords, summary, "
+                "conclusions) SELECT 'delete', rowid, title, keywords, search_keywords, summary, conclusions FROM articles")
+        out_of_sync = self.db.search_articles(["quantum"])
+        self.db.dispose()
+
+        # Act
+        reopened = DB(self.db.database_uri)
+        articles = reopened.search_articles(["quantum"])
+        reopened.dispose()
+
+        # Assert
+        self.assertEqual(out_of_sync, [])
+        self.assertEqual([article.url for article in articles], ["http://first.pdf"])
+
+if __name__ == '__main__':
+    unittest.main()
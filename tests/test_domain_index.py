@@ -0,0 +1,53 @@
+from domain_index import DomainIndex
+from scrapper import Domain, Field
+import os
+import tempfile
+import unittest
+
+def create_fields():
+    computer_science = Domain("Computer science", [Domain("Artificial intelligence", [Domain("Machine learning")]), \
+        Domain("Computer vision")])
+    return [Field("Formal sciences", [computer_science, Domain("Mathematics", [Domain("Computer science")])])]
+
+class TestDomainIndex(unittest.TestCase):
+    def test_match_finds_multi_word_domains_inside_the_message(self):
+        # Arrange
+        index = DomainIndex.from_fields(create_fields())
+
+        # Act
+        captured = index.match("I like machine learning, computer vision and Computer Science!")
+
+        # Assert
+        self.assertEqual(captured, ["machine learning", "computer vision", "computer science"])
+        self.assertEqual(index.match("computer"), [])
+
+    def test_hierarchy_keeps_every_path(self):
+        # Arrange
+        index = DomainIndex.from_fields(create_fields())
+
+        # Act
+        paths = index.hierarchy("computer science")
+
+        # Assert
+        self.assertEqual(paths, [["formal sciences", "computer science"], ["formal sciences", "mathematics", "computer science"]])
+
+    def test_save_and_load(self):
+        # Arrange
+        index = DomainIndex.from_fields(create_fields())
+        directory = tempfile.TemporaryDirectory()
+        location = os.path.join(directory.name, "domain_index.json")
+
+        # Act
+        saved = index.save(location)
+        loaded = DomainIndex.load(location)
+        missing = DomainIndex.load(os.path.join(directory.name, "missing.json"))
+
+        # Assert
+        self.assertTrue(saved)
+        self.assertEqual(loaded.match("machine learning"), ["machine learning"])
+        self.assertEqual(len(loaded), len(index))
+        self.assertIsNone(missing)
+        directory.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
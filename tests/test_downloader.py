@@ -0,0 +1,78 @@
+from downloader import PDFDownloader
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import os
+import threading
+import unittest
+
+PDF_CONTENT = b"%PDF-1.4\n" + b"0" * 200000
+
+class FileHandler(BaseHTTPRequestHandler):
+    RESPONSES = {
+        "/paper.pdf": ("application/pdf", PDF_CONTENT),
+        "/paper-without-type.pdf": ("application/octet-stream", PDF_CONTENT),
+        "/login.pdf": ("text/html", b"<html>login</html>"),
+        "/fake.pdf": ("application/octet-stream", b"<html>" + b"0" * 5000),
+    }
+
+    def do_GET(self):
+        if self.path not in self.RESPONSES:
+            self.send_response(404)
+            self.end_headers()
+            return
+        content_type, content = self.RESPONSES[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestPDFDownloader(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), FileHandler)
+        cls.url = "http://127.0.0.1:{port}".format(port=cls.server.server_address[1])
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_download_pdf(self):
+        downloader = PDFDownloader()
+        for path in ["/paper.pdf", "/paper-without-type.pdf"]:
+            cont, filename = downloader.download(self.url + path)
+            self.assertTrue(cont)
+            with open(filename, 'rb') as file:
+                self.assertEqual(file.read(), PDF_CONTENT)
+            os.remove(filename)
+
+    def test_download_pdf_into_memory(self):
+        downloader = PDFDownloader()
+        self.assertEqual(downloader.download_bytes(self.url + "/paper.pdf"), (True, PDF_CONTENT))
+        self.assertEqual(downloader.download_bytes(self.url + "/login.pdf"), (False, None))
+        self.assertEqual(PDFDownloader(max_bytes=100000).download_bytes(self.url + "/paper.pdf"), (False, None))
+
+    def test_concurrent_downloads_use_different_files(self):
+        downloader = PDFDownloader()
+        _, first = downloader.download(self.url + "/paper.pdf")
+        _, second = downloader.download(self.url + "/paper.pdf")
+        self.assertNotEqual(first, second)
+        os.remove(first)
+        os.remove(second)
+
+    def test_abort_files_which_are_not_pdf(self):
+        downloader = PDFDownloader()
+        self.assertEqual(downloader.download(self.url + "/login.pdf"), (False, None))
+        self.assertEqual(downloader.download(self.url + "/fake.pdf"), (False, None))
+        self.assertEqual(downloader.download(self.url + "/missing.pdf"), (False, None))
+        self.assertEqual(downloader.download("ftp://paper.pdf"), (False, None))
+
+    def test_abort_files_which_are_too_big(self):
+        downloader = PDFDownloader(max_bytes=100000)
+        self.assertEqual(downloader.download(self.url + "/paper.pdf"), (False, None))
+
+if __name__ == '__main__':
+    unittest.main()
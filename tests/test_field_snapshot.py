@@ -0,0 +1,62 @@
+from field_snapshot import FieldSnapshot
+from scrapper import Domain, Field
+import json
+import os
+import tempfile
+import unittest
+
+def create_fields():
+    return [Field("Formal sciences", [Domain("Computer science", [Domain("Machine learning")]), Domain("Mathematics")]), \
+        Field("Natural sciences", [Domain("Physics")])]
+
+class TestFieldSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.directory.name, "fields_snapshot.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_save_and_load_keeps_the_hierarchy(self):
+        # Arrange
+        snapshot = FieldSnapshot(create_fields())
+
+        # Act
+        snapshot.save(self.location)
+        loaded = FieldSnapshot.load(self.location)
+
+        # Assert
+        self.assertEqual(loaded.digest, snapshot.digest)
+        self.assertEqual([field.name for field in loaded.fields], ["formal sciences", "natural sciences"])
+        self.assertEqual(loaded.fields[0].get_domain("machine learning")[0].name, "machine learning")
+
+    def test_digest_changes_with_the_content(self):
+        # Arrange
+        fields = create_fields()
+        changed = create_fields()
+        changed[1].domains.append(Domain("Chemistry"))
+
+        # Act
+        digests = [FieldSnapshot(fields).digest, FieldSnapshot(create_fields()).digest, FieldSnapshot(changed).digest]
+
+        # Assert
+        self.assertEqual(digests[0], digests[1])
+        self.assertNotEqual(digests[0], digests[2])
+
+    def test_corrupted_snapshot_is_not_loaded(self):
+        # Arrange
+        FieldSnapshot(create_fields()).save(self.location)
+        with open(self.location, 'r', encoding='utf-8') as file:
+            content = json.load(file)
+        content['fields'][0][0] = "changed"
+        with open(self.location, 'w', encoding='utf-8') as file:
+            json.dump(content, file)
+
+        # Act
+        loaded = FieldSnapshot.load(self.location)
+
+        # Assert
+        self.assertIsNone(loaded)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,73 @@
 from db import MockDB
-from engines.engine import GoogleScholarQueryEngine
+from engines.engine import GoogleScholarQueryEngine, SearchResults
+from pdf import PDFSummary
+import time
 import unittest
 
+class FakePDF:
+    def __init__(self, urls, download_time=0.2):
+        self.urls = urls
+        self.download_time = download_time
+        self.fetched_pages = []
+        self.prefetched_pages = []
+        self.deleted = []
+
+    def fetch_urls(self, url):
+        self.fetched_pages.append(url)
+        return self.urls if len(self.fetched_pages) == 1 else []
+
+    def prefetch_urls(self, url):
+        self.prefetched_pages.append(url)
+
+    def download(self, url):
+        time.sleep(self.download_time)
+        return (True, url + ".local")
+
+    def summarize_file(self, filename, max_pages_processed = 20):
+        return PDFSummary(summary="summary of " + filename)
+
+    def delete(self, filename):
+        self.deleted.append(filename)
+
+class FailingPDF(FakePDF):
+    def summarize_file(self, filename, max_pages_processed = 20):
+        raise Exception("the process pool is broken")
+
 class TestGoogleScholarEngine(unittest.TestCase):
     def test_compose_url(self):
-        engine = GoogleScholarQueryEngine(MockDB())
-        gs_url = engine._compose_gs_url(["M","K"], ["ba","Am","M"])
-        self.assertEquals(gs_url,engine.GS_URL+"M+Ks+ba+Am+M")
+        engine = GoogleScholarQueryEngine(MockDB(), 10, FakePDF([]))
+        gs_url = engine._compose_gs_url(["M","K"], ["ba","Am","M"], "")
+        self.assertEqual(gs_url,engine.GS_URL+"M+K+ba+Am+M")
+
+    def test_search_processes_articles_concurrently(self):
+        # Arrange
+        urls = [("http://link.to/{i}.pdf".format(i=i), "title", "authors") for i in range(6)]
+        pdf = FakePDF(urls + [urls[0]])
+        engine = GoogleScholarQueryEngine(MockDB(get_article_by_url_response=None), 10, pdf, download_concurrency=6)
+
+        # Act
+        start = time.time()
+        articles = engine.search(["football"], SearchResults(max_search_results=4))
+        elapsed = time.time() - start
+
+        # Assert
+        self.assertEqual(len(articles), 4)
+        self.assertEqual(len(set(article.url for article in articles)), 4)
+        self.assertEqual(articles[0].summary, "summary of " + articles[0].url + ".local")
+        self.assertLess(elapsed, 2 * pdf.download_time)
+        self.assertEqual(pdf.prefetched_pages, [])  # the first page covers the results
+
+    def test_files_are_deleted_when_parsing_fails(self):
+        # Arrange
+        pdf = FailingPDF([("http://link.to/0.pdf", "title", "authors")], download_time=0)
+        engine = GoogleScholarQueryEngine(MockDB(get_article_by_url_response=None), 10, pdf)
+
+        # Act
+        articles = engine.search(["football"], SearchResults(max_search_results=1))
+
+        # Assert
+        self.assertEqual(articles, [])
+        self.assertEqual(pdf.deleted, ["http://link.to/0.pdf.local"])
 
 if __name__ == '__main__':
     unittest.main()
-
@@ -0,0 +1,108 @@
+from jobs import JobManager, SharedProcessPool, ReadWriteLock, DuplicateJobException, DONE, FAILED
+import threading
+import unittest
+
+class TestJobManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = JobManager(max_workers=2)
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_job_reports_progress_and_result(self):
+        # Arrange
+        def work(job):
+            job.update("counting", counted=3)
+            return 42
+
+        # Act
+        job = self.manager.submit(work)
+        job.wait(5)
+        status = self.manager.get(job.id).to_dict()
+
+        # Assert
+        self.assertEqual(job.result, 42)
+        self.assertEqual(status['state'], DONE)
+        self.assertEqual(status['progress'], {'counted': 3})
+
+    def test_jobs_with_the_same_key_are_shared_until_finished(self):
+        # Arrange
+        release = threading.Event()
+        def work(job):
+            release.wait(5)
+            raise Exception("failed")
+
+        # Act
+        first = self.manager.submit(work, key="search")
+        second = self.manager.submit(work, key="search")
+        release.set()
+        first.wait(5)
+        third = self.manager.submit(lambda job: None, key="search")
+        third.wait(5)
+
+        # Assert
+        self.assertIs(first, second)
+        self.assertEqual(first.state, FAILED)
+        self.assertIsNot(third, first)
+
+    def test_duplicate_jobs_can_be_rejected(self):
+        # Arrange
+        release = threading.Event()
+        running = self.manager.submit(lambda job: release.wait(5), key="train", reject_duplicate=True)
+
+        # Act
+        with self.assertRaises(DuplicateJobException) as rejected:
+            self.manager.submit(lambda job: None, key="train", reject_duplicate=True)
+        release.set()
+        running.wait(5)
+
+        # Assert
+        self.assertIs(rejected.exception.job, running)
+
+class TestSharedProcessPool(unittest.TestCase):
+    def test_processes_start_on_first_use(self):
+        # Arrange
+        pool = SharedProcessPool(1)
+
+        # Act
+        started_before_use = pool.is_started()
+        result = pool.get().apply(abs, (-1,))
+        pool.close()
+
+        # Assert
+        self.assertFalse(started_before_use)
+        self.assertEqual(result, 1)
+        self.assertFalse(pool.is_started())
+
+class TestReadWriteLock(unittest.TestCase):
+    def test_writer_waits_for_readers_and_blocks_new_ones(self):
+        # Arrange
+        lock = ReadWriteLock()
+        events = []
+        writer_waiting = threading.Event()
+        def write():
+            writer_waiting.set()
+            with lock.write():
+                events.append("write")
+        def read_later():
+            with lock.read():
+                events.append("late read")
+
+        # Act
+        with lock.read(), lock.read():
+            writer = threading.Thread(target=write)
+            writer.start()
+            writer_waiting.wait()
+            while lock.waiting_writers == 0:
+                pass
+            late_reader = threading.Thread(target=read_later)
+            late_reader.start()
+            events.append("read")
+        writer.join()
+        late_reader.join()
+
+        # Assert
+        self.assertEqual(events, ["read", "write", "late read"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from corpus_creator import CorpusCreator
+from manifest import TrainingManifest
+from scrapper import Domain, Field
+import os
+import tempfile
+import unittest
+
+class TestTrainingManifest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.directory.name, "manifest.json")
+        self.corpus_path = os.path.join(self.directory.name, "databases.yml")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def create_corpus(self, domains):
+        CorpusCreator(self.directory.name)._create_yaml_file("databases", \
+            CorpusCreator(self.directory.name)._convert_to_dictionary(Field("Databases", [Domain(name) for name in domains])))
+
+    def test_only_new_conversations_are_returned(self):
+        # Arrange
+        self.create_corpus(["Relational"])
+        manifest = TrainingManifest(self.location)
+        manifest.record(manifest.changes(self.corpus_path))
+        manifest.save()
+        self.create_corpus(["Relational", "Graph"])
+
+        # Act
+        change = TrainingManifest(self.location).changes(self.corpus_path)
+
+        # Assert
+        self.assertEqual(change.categories, ["databases"])
+        self.assertEqual([conversation[0] for conversation in change.new_conversations], ["databases", "graph"])
+        self.assertEqual(change.removed_count, 1)
+
+    def test_unchanged_file_is_skipped(self):
+        # Arrange
+        self.create_corpus(["Relational"])
+        manifest = TrainingManifest(self.location)
+        first = manifest.changes(self.corpus_path)
+        manifest.record(first)
+
+        # Act
+        second = manifest.changes(self.corpus_path)
+
+        # Assert
+        self.assertEqual(len(first.new_conversations), 2)
+        self.assertEqual(second.new_conversations, [])
+
+    def test_statements_of_removed_conversations_are_returned(self):
+        # Arrange
+        self.create_corpus(["Relational", "Graph"])
+        manifest = TrainingManifest(self.location)
+        change = manifest.changes(self.corpus_path)
+        for conversation_hash, conversation in zip(change.new_hashes, change.new_conversations):
+            change.trained(conversation_hash, [[conversation[1], conversation[0]]])
+        manifest.record(change)
+        manifest.save()
+        self.create_corpus(["Relational"])
+
+        # Act
+        change = TrainingManifest(self.location).changes(self.corpus_path)
+        forgotten = TrainingManifest(self.location).forget("databases.yml")
+
+        # Assert
+        self.assertEqual(change.removed_count, 2)
+        self.assertEqual(sorted(statement[1] for statement in change.removed_statements), ["databases", "graph"])
+        self.assertEqual(len(forgotten.removed_statements), 3)
+
+if __name__ == '__main__':
+    unittest.main()
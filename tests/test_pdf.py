@@ -1,6 +1,36 @@
-from pdf import PDF, PDFReadStrategyPortion, PDFSummary,PDFReadStrategyAll
+from pdf import PDF, PDFReadStrategyPortion, PDFSummary,PDFReadStrategyAll, PDFMinerEngine, PDFMuPDFEngine, PYPDF2Engine, chunk_pages, init_pdf_worker, \
+    alternate_pages, read_pages_incrementally
+from sections import SectionExtractor
+from pdf import AdaptivePDFEngine, PDFEngine, layout_page_text, _get_worker_document
+from pdf_buffer import PDFBuffer
+from pdf_store import PDFStore
+from jobs import shared_process_pool
+from types import SimpleNamespace
 import unittest
 import json
+import fitz
+import os
+import tempfile
+
+def create_pdf(pages):
+    document = fitz.open()
+    for text in pages:
+        page = document.new_page()
+        page.insert_text((72, 72), text)
+    handle, filename = tempfile.mkstemp(suffix=".pdf")
+    os.close(handle)
+    document.save(filename)
+    document.close()
+    return filename
+
+class FixedContentEngine(PDFEngine):
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    def get_pdf_content(self, filename, max_pages_processed, pool, multiprocessing, strategy):
+        self.calls += 1
+        return self.content
 
 class TestPDF(unittest.TestCase):
     def __fetch_local_file(self,_):
@@ -12,10 +42,37 @@ class TestPDF(unittest.TestCase):
         pdf = PDF()
         urls = pdf.fetch_urls("", url_fetcher=self.__fetch_local_file)
         urls.sort()
-        expected = [('http://acikerisimarsiv.selcuk.edu.tr:8080/xmlui/bitstream/handle/123456789/14407/519636.pdf?sequence=1&isAllowed=y', 'Predicting the Dutch football competition using public data: A machine learning approach', 'N Tax, Y Joustra'), ('http://acikerisimarsiv.selcuk.edu.tr:8080/xmlui/bitstream/handle/123456789/14407/519636.pdf?sequence=1&isAllowed=y', 'Decision support system for a football team management by using machine learning techniques', 'MAM Al-Asadi'), ('https://www.scitepress.org/papers/2016/58776/58776.pdf', 'Recognizing compound events in spatio-temporal football data', 'K Richly, M Bothe, T Rohloff…'), ('https://dtai-static.cs.kuleuven.be/events/MLSA13/papers/mlsa13_submission_4.pdf', 'Predicting the Dutch football competition using public data: A machine learning approach', 'N Tax, Y Joustra'), ('https://www.academia.edu/download/38928979/Using_Machine_Learning_to_Predict_Winners_of_Football_League_for_Bookies.pdf', 'Predicting the Dutch football competition using public data: A machine learning approach', 'N Tax, Y Joustra'), ('https://www.imperial.ac.uk/media/imperial-college/faculty-of-engineering/computing/public/1718-ug-projects/Corentin-Herbinet-Using-Machine-Learning-techniques-to-predict-the-outcome-of-profressional-football-matches.pdf', 'Predicting the Dutch football competition using public data: A machine learning approach', 'N Tax, Y Joustra'), ('https://www.academia.edu/download/47098202/D017332126.pdf', 'Support vector machine–based prediction system for a football match result', 'CP Igiri'), ('https://www.academia.edu/download/56704483/1520497925_08-03-2018.pdf', 'Predicting the Dutch football competition using public data: A machine learning approach', 'N Tax, Y Joustra'), ('https://www.scitepress.org/papers/2016/58776/58776.pdf', 'Predicting the Dutch football competition using public data: A machine learning approach', 'N Tax, Y Joustra'), ('https://www.academia.edu/download/64023099/45%2015apr19%2013apr19%207des18%2017022__EditAmir.pdf', 'Comparing machine learning and ensemble learning in the field of football', 'S Khan, VB Kirubanand'), ('https://www.academia.edu/download/38920512/tkde-version_1.pdf', 'Predicting the Dutch football competition using public data: A machine learning approach', 'N Tax, Y Joustra'), ('https://www.academia.edu/download/38928979/Using_Machine_Learning_to_Predict_Winners_of_Football_League_for_Bookies.pdf', 'Using machine learning to predict winners of football league for bookies', 'EO Esumeh'), ('https://dtai-static.cs.kuleuven.be/events/MLSA13/papers/mlsa13_submission_4.pdf', 'Comparison of Machine Learning Methods for Predicting the Recovery Time of Professional Football Players After an Undiagnosed Injury.', 'S Kampakis'), ('https://www.academia.edu/download/64023099/45%2015apr19%2013apr19%207des18%2017022__EditAmir.pdf', 'Predicting the Dutch football competition using public data: A machine learning approach', 'N Tax, Y Joustra'), ('https://www.academia.edu/download/56704483/1520497925_08-03-2018.pdf', 'Prediction of football match score and decision making process', 'LK Teli, N Zaveri, P Shinde'), ('https://www.academia.edu/download/47098202/D017332126.pdf', 'Predicting the Dutch football competition using public data: A machine learning approach', 'N Tax, Y Joustra'), ('https://cs229.stanford.edu/proj2015/111_report.pdf', 'Predicting the Dutch football competition using public data: A machine learning approach', 'N Tax, Y Joustra'), ('https://www.imperial.ac.uk/media/imperial-college/faculty-of-engineering/computing/public/1718-ug-projects/Corentin-Herbinet-Using-Machine-Learning-techniques-to-predict-the-outcome-of-profressional-football-matches.pdf', 'Predicting football results using machine learning techniques', 'C Herbinet'), ('https://cs229.stanford.edu/proj2015/111_report.pdf', 'Machine learning for daily fantasy football quarterback selection', 'P Dolan, H Karaouni, A Powell')]
+        expected = [('https://www.academia.edu/download/38920512/tkde-version_1.pdf', 'Predicting the Dutch football competition using public data: A machine learning approach', 'N Tax, Y Joustra'),
+            ('https://www.academia.edu/download/64023099/45%2015apr19%2013apr19%207des18%2017022__EditAmir.pdf', 'Comparing machine learning and ensemble learning in the field of football', 'S Khan, VB Kirubanand'),
+            ('https://www.imperial.ac.uk/media/imperial-college/faculty-of-engineering/computing/public/1718-ug-projects/Corentin-Herbinet-Using-Machine-Learning-techniques-to-predict-the-outcome-of-profressional-football-matches.pdf', 'Predicting football results using machine learning techniques', 'C Herbinet'),
+            ('https://dtai-static.cs.kuleuven.be/events/MLSA13/papers/mlsa13_submission_4.pdf', 'Comparison of Machine Learning Methods for Predicting the Recovery Time of Professional Football Players After an Undiagnosed Injury.', 'S Kampakis'),
+            ('https://www.academia.edu/download/56704483/1520497925_08-03-2018.pdf', 'Prediction of football match score and decision making process', 'LK Teli, N Zaveri, P Shinde'),
+            ('http://acikerisimarsiv.selcuk.edu.tr:8080/xmlui/bitstream/handle/123456789/14407/519636.pdf?sequence=1&isAllowed=y', 'Decision support system for a football team management by using machine learning techniques', 'MAM Al-Asadi'),
+            ('https://www.academia.edu/download/47098202/D017332126.pdf', 'Support vector machine–based prediction system for a football match result', 'CP Igiri'),
+            ('https://www.academia.edu/download/38928979/Using_Machine_Learning_to_Predict_Winners_of_Football_League_for_Bookies.pdf', 'Using machine learning to predict winners of football league for bookies', 'EO Esumeh'),
+            ('https://cs229.stanford.edu/proj2015/111_report.pdf', 'Machine learning for daily fantasy football quarterback selection', 'P Dolan, H Karaouni, A Powell'),
+            ('https://www.scitepress.org/papers/2016/58776/58776.pdf', 'Recognizing compound events in spatio-temporal football data', 'K Richly, M Bothe, T Rohloff…')]
         expected.sort()
         self.assertEquals(urls, expected)
 
+    def test_fetched_urls_are_cached(self):
+        # Arrange
+        pdf = PDF(prefetch_result_pages=False)
+        fetched = []
+        def fetch_page(url):
+            fetched.append(url)
+            return self.__fetch_local_file(url)
+        pdf.downloader.get_text = fetch_page
+
+        # Act
+        first = pdf.fetch_urls("https://scholar.google.com/scholar?q=football")
+        second = pdf.fetch_urls("https://scholar.google.com/scholar?q=football")
+
+        # Assert
+        self.assertEqual(len(fetched), 1)
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 10)
+
     def ignore_download(self, url):
         return (True, url)
 
@@ -47,7 +104,159 @@ class TestPDF(unittest.TestCase):
             # self.assertEquals(summarized_pdf.summary, expect_result.summary)
             # self.assertEquals(summarized_pdf.keywords, expect_result.keywords)
 
-            
-            
+
+    def test_chunk_pages(self):
+        pairs = [(index, "file.pdf") for index in [0, 1, 2, 7, 8]]
+        self.assertEqual(chunk_pages(pairs, 2), [([0, 1, 2], "file.pdf"), ([7, 8], "file.pdf")])
+        self.assertEqual(chunk_pages(pairs, 10), [([index], "file.pdf") for index in [0, 1, 2, 7, 8]])
+        self.assertEqual(chunk_pages([], 2), [])
+
+    def test_worker_documents_keep_the_last_used(self):
+        init_pdf_worker()
+        closed = []
+        opener = lambda source: (source.key, lambda: closed.append(source.key))
+        first, second, third = [SimpleNamespace(key=key) for key in ["first", "second", "third"]]
+
+        _get_worker_document("test", first, opener)
+        _get_worker_document("test", second, opener)
+        _get_worker_document("test", first, opener)
+        _get_worker_document("test", third, opener)
+
+        self.assertEqual(closed, ["second"])
+        init_pdf_worker()
+
+    def test_alternate_pages(self):
+        pairs = [(index, "file.pdf") for index in range(5)]
+        self.assertEqual([index for index, _ in alternate_pages(pairs)], [0, 4, 1, 3, 2])
+        self.assertEqual(alternate_pages([]), [])
+
+    def test_incremental_reading_stops_once_sections_are_found(self):
+        filename = create_pdf(["Title\n\nAbstract\nShort abstract.\n\nKeywords: graphs, trees\n\n1. Introduction\nText"] + \
+            ["Body page {index}\n\nMore text".format(index=index) for index in range(1, 5)] + \
+            ["5. Conclusions\nIt works.\n\n6. Future work\nMore data.\n\nReferences\n[1] A paper"])
+        try:
+            for engine in [PDFMinerEngine(), PYPDF2Engine()]:
+                content, pages_read, pages_picked = read_pages_incrementally(engine, SectionExtractor(), filename, 100, \
+                    PDFReadStrategyAll())
+                full_content = engine.get_pdf_content(filename, 100, None, False, PDFReadStrategyAll())
+                self.assertEqual((pages_read, pages_picked), (2, 6), type(engine).__name__)
+                self.assertEqual(SectionExtractor().extract(content), SectionExtractor().extract(full_content), \
+                    type(engine).__name__)
+
+            summary = PDF(multiprocessing=False, engine=PDFMinerEngine(), incremental=True).summarize_file(filename)
+            self.assertEqual(summary.summary, "Short abstract.")
+            self.assertEqual(summary.future_work, "More data.")
+        finally:
+            os.remove(filename)
+
+    def test_incremental_reading_checks_the_text_once_all_headings_were_seen(self):
+        pages = ["Abstract\nShort abstract.\n\nKey"] + ["Body page {index}".format(index=index) for index in range(1, 7)] + \
+            ["words: graphs\n\n5. Conclusions\nIt works.\n\n6. Future work\nMore data.\n\nReferences"]
+        reader = SimpleNamespace(page_count=len(pages), read_page=lambda index: pages[index], close=lambda: None)
+        engine = SimpleNamespace(open_pages=lambda filename: reader)
+        extractor = SectionExtractor()
+        checked = []
+        is_complete = extractor.is_complete
+        extractor.is_complete = lambda text, gap=None: checked.append(text) or is_complete(text, gap)
+
+        content, pages_read, pages_picked = read_pages_incrementally(engine, extractor, "file.pdf", 100, PDFReadStrategyAll())
+
+        self.assertEqual((pages_read, pages_picked), (2, 8))
+        self.assertEqual(len(checked), 1)
+        self.assertEqual(content, pages[0] + pages[-1])
+
+    def test_incremental_text_is_kept_in_the_store(self):
+        directory = tempfile.TemporaryDirectory()
+        try:
+            store = PDFStore(directory.name)
+            filename = store.put_file("https://example.com/paper.pdf", \
+                create_pdf(["Abstract\nShort abstract.\n\nKeywords: graphs, trees\n\nBody"]))
+            pdf = PDF(multiprocessing=False, engine=PDFMinerEngine(), store=store, incremental=True)
+
+            first = pdf.summarize_file(filename, 100)
+            pdf.engine.open_pages = None # the text is not extracted again
+            second = pdf.summarize_file(filename, 100)
+
+            self.assertIsNotNone(store.get_text(store.digest_of(filename), "PDFMinerEngine.all.100.incremental.SectionExtractor"))
+            self.assertEqual(second.keywords, "graphs, trees")
+            self.assertEqual(first, second)
+        finally:
+            directory.cleanup()
+
+    def test_adaptive_engine_falls_back_on_invalid_content(self):
+        article = "Abstract\nShort abstract.\n\nKeywords: graphs\n\nBody"
+        for content, expected_outcome in [(None, "empty"), ("(cid:12)(cid:7)(cid:9) 12 ##", "garbled"), \
+            ("no headings at all", "no_sections"), (article, "success")]:
+            fast, slow = FixedContentEngine(content), FixedContentEngine(article)
+            engine = AdaptivePDFEngine([fast, slow])
+
+            result = engine.get_pdf_content("file.pdf", 10, None, False, PDFReadStrategyAll())
+
+            self.assertEqual(result, article, expected_outcome)
+            self.assertEqual(slow.calls, 0 if expected_outcome == "success" else 1, expected_outcome)
+            self.assertEqual(engine.stats()["FixedContentEngine"]["outcomes"][expected_outcome], 1, expected_outcome)
+
+    def test_adaptive_engine_keeps_content_when_every_engine_fails(self):
+        engine = AdaptivePDFEngine([FixedContentEngine(None), FixedContentEngine("no headings at all")])
+        self.assertEqual(engine.get_pdf_content("file.pdf", 10, None, False, PDFReadStrategyAll()), "no headings at all")
+
+    def test_layout_reads_columns_in_order(self):
+        def block(x0, y0, x1, y1, lines):
+            return {"type": 0, "bbox": (x0, y0, x1, y1), "lines": [{"bbox": (x0, y0 + 10 * index, x1, y0 + 10 * (index + 1)), \
+                "spans": [{"bbox": (x0, y0 + 10 * index, x1, y0 + 10 * (index + 1)), "text": text}]} for index, text in enumerate(lines)]}
+        page = {"width": 600, "blocks": [block(320, 100, 550, 200, ["right top"]), block(50, 40, 550, 60, ["title"]),
+            block(50, 100, 280, 200, ["left top", "left second"]), block(50, 300, 280, 400, ["left bottom"]),
+            block(50, 500, 550, 520, ["footer"])]}
+
+        text = layout_page_text(page)
+
+        self.assertEqual(text, "title\n\nleft top\nleft second\n\nleft bottom\n\nright top\n\nfooter\n\n")
+
+    def test_pymupdf_single_process_layout(self):
+        filename = create_pdf(["Abstract\nShort abstract.\n\nKeywords: graphs, trees\n\nBody"])
+        try:
+            content = PDFMuPDFEngine().get_pdf_content(filename, 100, None, False, PDFReadStrategyAll())
+            self.assertEqual(SectionExtractor().extract(content)["keywords"], "graphs, trees")
+        finally:
+            os.remove(filename)
+
+    def test_multiprocessing_content_is_ordered(self):
+        filename = create_pdf(["page number {index}".format(index=index) for index in range(7)])
+        pdf = PDF(processes_per_search=3)
+        try:
+            for engine in [PDFMinerEngine(), PYPDF2Engine(), PDFMuPDFEngine()]:
+                content = engine.get_pdf_content(filename, 100, pdf.pool, True, PDFReadStrategyAll())
+                positions = [content.find("page number {index}".format(index=index)) for index in range(7)]
+                self.assertTrue(all(position >= 0 for position in positions), type(engine).__name__)
+                self.assertEqual(positions, sorted(positions), type(engine).__name__)
+            self.assertIs(PDF(processes_per_search=3).pool, pdf.pool)
+        finally:
+            shared_process_pool(3, init_pdf_worker).close()
+            os.remove(filename)
+
+    def test_in_memory_documents(self):
+        filename = create_pdf(["Abstract\nShort abstract.\n\nKeywords: graphs, trees\n\nBody"] + \
+            ["page number {index}".format(index=index) for index in range(1, 5)])
+        pdf = PDF(processes_per_search=3)
+        try:
+            with open(filename, 'rb') as file:
+                buffer = PDFBuffer(file.read(), "https://example.com/paper.pdf")
+            for engine in [PDFMinerEngine(), PYPDF2Engine(), PDFMuPDFEngine()]:
+                for multiprocessing in [False, True]:
+                    pool = pdf.pool if multiprocessing else None
+                    expected = engine.get_pdf_content(filename, 100, pool, multiprocessing, PDFReadStrategyAll())
+                    content = engine.get_pdf_content(buffer, 100, pool, multiprocessing, PDFReadStrategyAll())
+                    self.assertEqual(content, expected, type(engine).__name__)
+            self.assertIsNotNone(buffer.segment)
+
+            summary = PDF(multiprocessing=True, processes_per_search=3, engine=PDFMinerEngine(), incremental=True).summarize_file(buffer)
+            self.assertEqual(summary.keywords, "graphs, trees")
+
+            pdf.delete(buffer)
+            self.assertIsNone(buffer.segment)
+        finally:
+            shared_process_pool(3, init_pdf_worker).close()
+            os.remove(filename)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
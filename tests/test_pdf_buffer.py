@@ -0,0 +1,41 @@
+from pdf_buffer import PDFBuffer, MemoryViewReader
+import io
+import unittest
+
+class TestPDFBuffer(unittest.TestCase):
+    def test_reader_reads_and_seeks_like_a_file(self):
+        # Arrange
+        reader = MemoryViewReader(memoryview(b"%PDF-1.4 content %%EOF"))
+
+        # Act
+        header = reader.read(8)
+        reader.seek(-5, io.SEEK_END)
+        trailer = reader.read()
+        end = reader.read(10)
+        reader.seek(9)
+        line = reader.readline()
+
+        # Assert
+        self.assertEqual(header, b"%PDF-1.4")
+        self.assertEqual(trailer, b"%%EOF")
+        self.assertEqual(end, b"")
+        self.assertEqual(line, b"content %%EOF")
+
+    def test_shared_buffer_is_read_in_place(self):
+        # Arrange
+        buffer = PDFBuffer(b"%PDF-1.4 shared", "https://example.com/paper.pdf")
+        shared = buffer.share()
+
+        # Act
+        stream = shared.open_stream()
+        content = stream.read()
+        stream.close()
+        buffer.close()
+
+        # Assert
+        self.assertEqual(content, b"%PDF-1.4 shared")
+        self.assertEqual(str(shared), "https://example.com/paper.pdf")
+        self.assertIsNone(buffer.segment)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+from pdf_store import PDFStore
+import os
+import tempfile
+import time
+import unittest
+
+class TestPDFStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.directory.name, "store")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _download(self, content):
+        handle, filename = tempfile.mkstemp(dir=self.directory.name, suffix=".pdf")
+        os.write(handle, content)
+        os.close(handle)
+        return filename
+
+    def test_put_and_get_file_by_url_and_content(self):
+        # Arrange
+        store = PDFStore(self.location)
+
+        # Act
+        first = store.put_file("http://first.pdf", self._download(b"%PDF-same"))
+        second = store.put_file("http://second.pdf", self._download(b"%PDF-same"))
+        store.put_text(store.digest_of(first), "engine.all.10", "extracted text")
+
+        # Assert
+        self.assertEqual(first, second)
+        self.assertEqual(store.get_file("http://second.pdf"), first)
+        self.assertTrue(store.owns(first))
+        self.assertIsNone(store.get_file("http://unknown.pdf"))
+        self.assertEqual(store.get_text(store.digest_of(first), "engine.all.10"), "extracted text")
+        self.assertIsNone(store.get_text(store.digest_of(first), "other.all.10"))
+
+    def test_index_is_persisted(self):
+        # Arrange
+        store = PDFStore(self.location)
+        stored = store.put_file("http://first.pdf", self._download(b"%PDF-first"))
+        store.put_text(store.digest_of(stored), "engine.all.10", "extracted text")
+
+        # Act
+        reopened = PDFStore(self.location)
+
+        # Assert
+        self.assertEqual(reopened.get_file("http://first.pdf"), stored)
+        self.assertEqual(reopened.get_text(reopened.digest_of(stored), "engine.all.10"), "extracted text")
+
+    def test_least_recently_used_files_are_evicted(self):
+        # Arrange
+        store = PDFStore(self.location, max_bytes=25)
+        first = store.put_file("http://first.pdf", self._download(b"%PDF-first"))
+        time.sleep(0.01)
+        store.put_file("http://second.pdf", self._download(b"%PDF-second"))
+        time.sleep(0.01)
+        store.get_file("http://first.pdf")
+
+        # Act
+        store.put_file("http://third.pdf", self._download(b"%PDF-third"))
+
+        # Assert
+        self.assertEqual(store.get_file("http://first.pdf"), first)
+        self.assertIsNone(store.get_file("http://second.pdf"))
+        self.assertIsNotNone(store.get_file("http://third.pdf"))
+        self.assertLessEqual(store.size(), 25)
+
+    def test_pinned_files_are_not_evicted(self):
+        # Arrange
+        store = PDFStore(self.location, max_bytes=15)
+        first = store.put_file("http://first.pdf", self._download(b"%PDF-first"), pin=True)
+        time.sleep(0.01)
+
+        # Act
+        second = store.put_file("http://second.pdf", self._download(b"%PDF-second"))
+        pinned_exists = os.path.exists(first)
+        store.release(first)
+
+        # Assert
+        self.assertTrue(pinned_exists)
+        self.assertFalse(os.path.exists(first))
+        self.assertIsNone(store.get_file("http://first.pdf"))
+        self.assertEqual(store.get_file("http://second.pdf"), second)
+        self.assertLessEqual(store.size(), 15)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+from permission import DatabasePermission, NoRestrictionsPermission, PermissionFactory, SlidingWindowPermission
+from permission_store import DatabaseCounterStore
+from multiprocessing import Pool
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+class TestSlidingWindowPermission(unittest.TestCase):
+    def test_searches_are_limited_in_a_window(self):
+        # Arrange
+        permission = SlidingWindowPermission(ttl_in_seconds=60, attempts_in_window=2, sweep_interval_in_seconds=0)
+
+        # Act
+        first = permission.can_search("1.1.1.1")
+        second = permission.can_search("1.1.1.1")
+        third = permission.can_search("1.1.1.1")
+        ask = permission.can_ask("1.1.1.1")
+        other = permission.can_search("2.2.2.2")
+
+        # Assert
+        self.assertTrue(first.can_perform)
+        self.assertTrue(second.can_perform)
+        self.assertFalse(third.can_perform)
+        self.assertEqual(third.operation_name, "search")
+        self.assertTrue(0 < third.ttl_left <= 120)
+        self.assertFalse(ask.can_perform)
+        self.assertTrue(other.can_perform)
+
+    def test_attempts_are_allowed_again_once_the_window_slides(self):
+        # Arrange
+        permission = SlidingWindowPermission(ttl_in_seconds=0.1, attempts_in_window=1, sweep_interval_in_seconds=0)
+        permission.can_search("1.1.1.1")
+
+        # Act
+        denied = permission.can_search("1.1.1.1")
+        time.sleep(0.25)
+        allowed = permission.can_search("1.1.1.1")
+
+        # Assert
+        self.assertFalse(denied.can_perform)
+        self.assertTrue(allowed.can_perform)
+
+    def test_idle_clients_are_swept(self):
+        # Arrange
+        permission = SlidingWindowPermission(ttl_in_seconds=0.05, attempts_in_window=1, sweep_interval_in_seconds=0)
+        for client in range(100):
+            permission.can_search(str(client))
+        permission.can_ask("asking only")
+
+        # Act
+        time.sleep(0.15)
+        forgotten = permission.sweep()
+
+        # Assert
+        self.assertEqual(forgotten, 100)
+        self.assertEqual(permission.clients_count(), 0)
+
+    def test_concurrent_searches_never_exceed_the_attempts(self):
+        # Arrange
+        permission = SlidingWindowPermission(ttl_in_seconds=60, attempts_in_window=5, sweep_interval_in_seconds=0)
+        results = []
+
+        # Act
+        threads = [threading.Thread(target=lambda: results.append(permission.can_search("1.1.1.1").can_perform)) \
+            for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(results.count(True), 5)
+
+def search_in_another_process(database_uri):
+    permission = DatabasePermission(60, 5, database_uri=database_uri, read_cache_in_seconds=0)
+    return [permission.can_search("1.1.1.1").can_perform for _ in range(5)]
+
+class TestDatabasePermission(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_uri = "sqlite:///" + os.path.join(self.directory.name, "permissions.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_attempts_are_shared_between_processes(self):
+        # Arrange
+        DatabaseCounterStore(self.database_uri).dispose()
+
+        # Act
+        with Pool(3) as pool:
+            results = pool.map(search_in_another_process, [self.database_uri] * 3)
+        asked = DatabasePermission(60, 5, database_uri=self.database_uri).can_ask("1.1.1.1")
+
+        # Assert
+        self.assertEqual(sum(result.count(True) for result in results), 5)
+        self.assertFalse(asked.can_perform)
+        self.assertEqual(asked.current_attempts, 5)
+
+    def test_expired_counters_are_purged(self):
+        # Arrange
+        store = DatabaseCounterStore(self.database_uri)
+        permission = DatabasePermission(60, 1, store=store, purge_interval_in_seconds=0)
+        store.increment_if_below("1.1.1.1", 0, 0, 1)
+
+        # Act
+        searched = permission.can_search("1.1.1.1")
+        denied = permission.can_search("1.1.1.1")
+
+        # Assert
+        self.assertTrue(searched.can_perform)
+        self.assertFalse(denied.can_perform)
+        self.assertEqual(store.get("1.1.1.1", [0]), {})
+        store.dispose()
+
+class TestPermissionFactory(unittest.TestCase):
+    def test_permission_is_created_by_name(self):
+        # Act
+        permission = PermissionFactory().create("SlidingWindowPermission", 60, 3)
+        unrestricted = PermissionFactory().create("NoRestrictionsPermission", 60, 3, database_uri="sqlite://")
+        permission.stop()
+
+        # Assert
+        self.assertIsInstance(permission, SlidingWindowPermission)
+        self.assertEqual(permission.attempts_in_window, 3)
+        self.assertIsInstance(unrestricted, NoRestrictionsPermission)
+        self.assertEqual(unrestricted.can_search("1.1.1.1").operation_name, "search")
+
+if __name__ == '__main__':
+    unittest.main()
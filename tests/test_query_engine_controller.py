@@ -0,0 +1,108 @@
+from article import ArticleSummary
+from db import MockDB
+from engines.engine import HistoricalQueryEngine, QueryEngineController, ResearchQueryEngine, SearchResults
+import time
+import unittest
+
+def articles(*urls):
+    return [ArticleSummary(origin="test", url=url) for url in urls]
+
+class SlowEngine(ResearchQueryEngine):
+    def __init__(self, results, delay):
+        self.results = results
+        self.delay = delay
+        self.cancelled = None
+
+    def search(self, keywords, search_params):
+        time.sleep(self.delay)
+        self.cancelled = search_params.is_cancelled()
+        return self.results
+
+class TestQueryEngineController(unittest.TestCase):
+    def create_controller(self, execution_type, historical, slow_engine, deadline=5):
+        controller = QueryEngineController(MockDB(), execution_type, pdf=None, engine_deadline_seconds=deadline)
+        controller.engines = [HistoricalQueryEngine(MockDB(search_articles_response=historical)), slow_engine]
+        return controller
+
+    def test_parallel_merges_and_dedupes_by_url(self):
+        # Arrange
+        controller = self.create_controller("parallel", articles("a", "b"), SlowEngine(articles("b", "c"), 0.1))
+
+        # Act
+        results = controller.search(["keyword"], SearchResults(max_search_results=10))
+
+        # Assert
+        self.assertEqual([article.url for article in results], ["a", "b", "c"])
+
+    def test_parallel_abandons_engines_after_deadline(self):
+        # Arrange
+        slow_engine = SlowEngine(articles("c"), 1)
+        controller = self.create_controller("parallel", articles("a"), slow_engine, deadline=0.2)
+
+        # Act
+        start = time.time()
+        results = controller.search(["keyword"], SearchResults(max_search_results=10))
+        elapsed = time.time() - start
+
+        # Assert
+        self.assertEqual([article.url for article in results], ["a"])
+        self.assertLess(elapsed, 0.9)
+
+    def test_hedged_returns_sufficient_historical_results(self):
+        # Arrange
+        slow_engine = SlowEngine(articles("c"), 1)
+        controller = self.create_controller("hedged", articles("a", "b"), slow_engine)
+        search_params = SearchResults(max_search_results=2)
+
+        # Act
+        start = time.time()
+        results = controller.search(["keyword"], search_params)
+        elapsed = time.time() - start
+        time.sleep(1.2)
+
+        # Assert
+        self.assertEqual([article.url for article in results], ["a", "b"])
+        self.assertLess(elapsed, 0.9)
+        self.assertTrue(slow_engine.cancelled)
+        self.assertFalse(search_params.is_cancelled())
+
+    def test_hedged_waits_for_other_engines_when_insufficient(self):
+        # Arrange
+        controller = self.create_controller("hedged", articles("a"), SlowEngine(articles("c", "d"), 0.1))
+
+        # Act
+        results = controller.search(["keyword"], SearchResults(max_search_results=2))
+
+        # Assert
+        self.assertEqual([article.url for article in results], ["a", "c"])
+
+    def test_stream_yields_historical_results_before_slower_engines(self):
+        # Arrange
+        controller = self.create_controller("parallel", articles("a"), SlowEngine(articles("a", "c"), 0.5))
+
+        # Act
+        start = time.time()
+        stream = controller.search_iter(["keyword"], SearchResults(max_search_results=10))
+        first = next(stream)
+        first_elapsed = time.time() - start
+        rest = list(stream)
+
+        # Assert
+        self.assertEqual(first.url, "a")
+        self.assertLess(first_elapsed, 0.4)
+        self.assertEqual([article.url for article in rest], ["c"])
+
+    def test_priority_stream_stops_at_max_results(self):
+        # Arrange
+        slow_engine = SlowEngine(articles("c"), 0.1)
+        controller = self.create_controller("priority", articles("a", "b"), slow_engine)
+
+        # Act
+        results = list(controller.search_iter(["keyword"], SearchResults(max_search_results=2)))
+
+        # Assert
+        self.assertEqual([article.url for article in results], ["a", "b"])
+        self.assertIsNone(slow_engine.cancelled)
+
+if __name__ == '__main__':
+    unittest.main()
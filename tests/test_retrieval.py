@@ -0,0 +1,56 @@
+from retrieval import TrigramIndex
+import unittest
+
+class TestTrigramIndex(unittest.TestCase):
+    def test_search_ranks_the_closest_texts_first(self):
+        # Arrange
+        index = TrigramIndex(["computer science", "computer vision", "political science", "history", "computer science"])
+
+        # Act
+        results = index.search("Computer  Sciences", k=3)
+
+        # Assert
+        self.assertEqual(len(index), 4)
+        self.assertEqual(results[0][0], "computer science")
+        self.assertGreater(results[0][1], results[1][1])
+        self.assertNotIn("history", [text for text, _ in results])
+
+    def test_exact_text_scores_one(self):
+        # Arrange
+        index = TrigramIndex(["machine learning", "learning theory"])
+
+        # Act
+        results = index.search("machine learning", k=1)
+
+        # Assert
+        self.assertEqual(results[0][0], "machine learning")
+        self.assertAlmostEqual(results[0][1], 1.0)
+
+    def test_unrelated_query_finds_nothing(self):
+        # Arrange
+        index = TrigramIndex(["machine learning"])
+
+        # Act
+        results = index.search("xyz", k=5)
+
+        # Assert
+        self.assertEqual(results, [])
+
+    def test_added_texts_are_searched(self):
+        # Arrange
+        index = TrigramIndex(["computer science", "political science"])
+
+        # Act
+        added = index.add("machine learning")
+        duplicate = index.add("computer science")
+        results = index.search("machine learning", k=1)
+
+        # Assert
+        self.assertTrue(added)
+        self.assertFalse(duplicate)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(results[0][0], "machine learning")
+        self.assertAlmostEqual(results[0][1], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
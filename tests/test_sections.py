@@ -0,0 +1,86 @@
+from sections import SectionExtractor, RegexSectionExtractor, NOT_APPLICABLE
+import unittest
+
+ARTICLE = """Predicting football results using machine learning
+C Herbinet
+
+Abstract
+We predict the outcome of football matches
+using public data.
+
+Keywords: football, machine learning, prediction
+
+1. Introduction
+In conclusion of the introduction, football is popular.
+
+5. Conclusions
+Our model beats the bookmakers.
+
+It works on three leagues.
+
+6. Future work
+Adding player level data.
+
+References
+[1] A paper
+"""
+
+class TestSectionExtractor(unittest.TestCase):
+    def test_extract_sections(self):
+        # Act
+        sections = SectionExtractor().extract(ARTICLE)
+
+        # Assert
+        self.assertEqual(sections["summary"], "We predict the outcome of football matches\nusing public data.")
+        self.assertEqual(sections["keywords"], "football, machine learning, prediction")
+        self.assertEqual(sections["conclusions"], "Our model beats the bookmakers.\n\nIt works on three leagues.")
+        self.assertEqual(sections["future_work"], "Adding player level data.")
+
+    def test_inline_headings(self):
+        # Act
+        sections = SectionExtractor().extract("Title\n\nAbstract—Short abstract.\nIndex Terms—graphs, trees\n\nBody")
+
+        # Assert
+        self.assertEqual(sections["summary"], "Short abstract.")
+        self.assertEqual(sections["keywords"], "graphs, trees")
+        self.assertEqual(sections["conclusions"], NOT_APPLICABLE)
+        self.assertEqual(sections["future_work"], NOT_APPLICABLE)
+
+    def test_open_sections_at_end_of_text(self):
+        # Act
+        spans = SectionExtractor().extract_spans("Abstract\nThe abstract continues on the next page")
+
+        # Assert
+        self.assertFalse(spans["summary"].closed)
+        self.assertNotIn("conclusions", spans)
+
+    def test_is_complete_once_all_sections_are_closed_headings(self):
+        # Arrange
+        extractor = SectionExtractor()
+        gap_inside_abstract = ARTICLE.index("using public data")
+
+        # Act
+        complete = extractor.is_complete(ARTICLE)
+        open_abstract = extractor.is_complete(ARTICLE, gap=gap_inside_abstract)
+        mentioned_future_work = extractor.is_complete(ARTICLE.replace("6. Future work\n", "In future work\n"))
+
+        # Assert
+        self.assertTrue(complete)
+        self.assertFalse(open_abstract)
+        self.assertFalse(mentioned_future_work)
+        self.assertFalse(RegexSectionExtractor().is_complete(ARTICLE))
+
+    def test_heading_sections_are_found_in_a_part_of_the_text(self):
+        # Act
+        sections = SectionExtractor().find_heading_sections("5. Conclusions\nIt works.\n\n6. Future\nwork\nMore data.")
+
+        # Assert
+        self.assertEqual(sections, {"conclusions", "future_work"})
+        self.assertEqual(RegexSectionExtractor().find_heading_sections(ARTICLE), set())
+
+    def test_regex_extractor_finds_same_abstract(self):
+        self.assertEqual(RegexSectionExtractor().extract(ARTICLE)["summary"].strip(),
+            SectionExtractor().extract(ARTICLE)["summary"])
+
+if __name__ == '__main__':
+    unittest.main()